@@ -0,0 +1,197 @@
+"""
+Admission control: per-route-class thread pools, load shedding and per-session rate limits.
+
+Sync routes used to share Starlette's default threadpool, so a burst of /chat calls (each holding a
+thread for seconds while the LLM answers) starved /reports and /geo/tracts. Each route class now
+runs on its own bounded pool:
+
+    llm   /chat                                   LLM_WORKERS, LLM_QUEUE
+    db    /reports, /incidents, /updates/timeline DB_WORKERS,  DB_QUEUE
+    gis   /geo/tracts                             GIS_WORKERS, GIS_QUEUE
+
+A request that finds workers + queue slots of its class taken is shed right away with 503 and a
+Retry-After estimated from the class's recent service time, instead of waiting behind the backlog.
+
+    @router.get("")
+    @admission.limited("db")
+    def reports(...): ...                 # runs on the db pool; FastAPI sees the original signature
+
+Chat turns and report creation are also rate limited per session (token buckets, 429 +
+Retry-After). The session id is client supplied, so each client address also gets a much larger
+bucket of its own; behind a proxy that doesn't forward client addresses that bucket is a site-wide
+cap.
+Metrics: admission_queue_wait_seconds, admission_in_flight, admission_rejected_total,
+rate_limited_total.
+Every uvicorn worker has its own pools and buckets.
+"""
+from __future__ import annotations
+import asyncio, contextvars, functools, math, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import metrics
+from .config.settings import settings
+
+class Overloaded(Exception):
+    """Shed by admission control; main.py answers 503 with Retry-After."""
+    def __init__(self, route_class: str, retry_after: int) -> None:
+        super().__init__(f"{route_class} capacity exhausted, retry in {retry_after}s")
+        self.route_class, self.retry_after = route_class, retry_after
+
+class RateLimited(Exception):
+    """Over a per-session or per-address limit; main.py answers 429 with Retry-After."""
+    def __init__(self, kind: str, retry_after: int) -> None:
+        super().__init__(f"too many {kind} requests, retry in {retry_after}s")
+        self.kind, self.retry_after = kind, retry_after
+
+class RouteClass:
+    """A bounded pool: `workers` run at once, up to `queue` more wait, the rest are rejected."""
+    def __init__(self, name: str, workers: int, queue: int) -> None:
+        self.name, self.workers, self.queue = name, max(1, workers), max(0, queue)
+        self._lock = threading.Lock()
+        self._pending = 0           # running + queued
+        self._service = 0.5         # EWMA of run time (s), for Retry-After
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers,
+                                                thread_name_prefix=f"admission-{self.name}")
+        return self._executor
+
+    def retry_after(self) -> int:
+        backlog = max(1, self._pending - self.workers + 1)
+        return min(60, max(1, math.ceil(self._service * backlog / self.workers)))
+
+    def _set_pending(self, delta: int) -> None:
+        self._pending += delta
+        metrics.gauge("admission_in_flight").set(self._pending, route_class=self.name)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            if self._pending >= self.workers + self.queue:
+                metrics.inc("admission_rejected_total", route_class=self.name)
+                raise Overloaded(self.name, self.retry_after())
+            pool = self._pool()
+            self._set_pending(1)
+        queued_at = time.perf_counter()
+        ctx = contextvars.copy_context()  # profiling spans and request-scoped vars follow the call
+
+        def job() -> Any:
+            start = time.perf_counter()
+            metrics.observe("admission_queue_wait_seconds", start - queued_at,
+                            route_class=self.name)
+            try:
+                return ctx.run(fn, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._service = 0.8 * self._service + 0.2 * (time.perf_counter() - start)
+
+        fut = pool.submit(job)
+        # runs once the job finished, or right away if a disconnected client cancelled it while
+        # queued
+        fut.add_done_callback(lambda _: self._done())
+        return fut
+
+    def _done(self) -> None:
+        with self._lock:
+            self._set_pending(-1)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+CLASSES: Dict[str, RouteClass] = {
+    "llm": RouteClass("llm", settings.LLM_WORKERS, settings.LLM_QUEUE),
+    "db": RouteClass("db", settings.DB_WORKERS, settings.DB_QUEUE),
+    "gis": RouteClass("gis", settings.GIS_WORKERS, settings.GIS_QUEUE),
+}
+
+async def run(route_class: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking call on the pool of `route_class`; raises Overloaded when it is full."""
+    return await CLASSES[route_class].run(fn, *args, **kwargs)
+
+def limited(route_class: str) -> Callable[[Callable], Callable]:
+    """Decorator turning a sync endpoint into an async one that runs on the route class's pool."""
+    cls = CLASSES[route_class]
+
+    def deco(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        async def wrap(*a, **kw):
+            return await cls.run(fn, *a, **kw)
+        return wrap
+    return deco
+
+def shutdown() -> None:
+    for cls in CLASSES.values():
+        cls.shutdown()
+
+class RateLimiter:
+    """
+    Token bucket per key: `per_minute` sustained, bursts up to `burst`; per_minute <= 0 = off.
+    "ip:" keys (see client_keys) use their own `address_per_minute` / `address_burst`, since one
+    address can carry many users (a NAT, or a proxy that doesn't forward client addresses).
+    """
+    def __init__(self, kind: str, per_minute: float, burst: int,
+                 address_per_minute: float = 0.0, address_burst: int = 1,
+                 max_keys: int = 100_000) -> None:
+        self.kind, self.max_keys = kind, max_keys
+        # key prefix -> (tokens per second, burst)
+        self._limits = {"session": (per_minute / 60.0, max(1, burst)),
+                        "ip": (address_per_minute / 60.0, max(1, address_burst))}
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, tuple[float, float]] = {}  # key -> (tokens, last refill)
+
+    def _limit(self, key: str) -> Tuple[float, int]:
+        return self._limits.get(key.partition(":")[0], self._limits["session"])
+
+    def check(self, *keys: str) -> None:
+        """Take one token from every key's bucket, or none of them and raise RateLimited."""
+        keys = tuple(k for k in keys if self._limit(k)[0] > 0)
+        if not keys:
+            return
+        now = time.monotonic()
+        with self._lock:
+            refilled = {}
+            for key in keys:
+                _, burst = self._limit(key)
+                tokens, last = self._buckets.get(key, (float(burst), now))
+                refilled[key] = min(float(burst), tokens + (now - last) * self._limit(key)[0])
+            low = min(refilled, key=refilled.__getitem__)
+            # a rejected call spends nothing, so a drained session can't drain its address too
+            spend = 0.0 if refilled[low] < 1.0 else 1.0
+            for key, tokens in refilled.items():
+                self._buckets[key] = (tokens - spend, now)
+            wait = (math.ceil((1.0 - refilled[low]) / self._limit(low)[0])
+                    if refilled[low] < 1.0 else 0)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        if wait:
+            metrics.inc("rate_limited_total", kind=self.kind)
+            raise RateLimited(self.kind, wait)
+
+    def _prune(self, now: float) -> None:
+        # a bucket that has refilled completely is the same as no bucket
+        for k, (_, last) in list(self._buckets.items()):
+            rate, burst = self._limit(k)
+            if rate <= 0 or now - last >= burst / rate:
+                del self._buckets[k]
+
+CHAT_LIMIT = RateLimiter("chat", settings.CHAT_RATE_PER_MINUTE, settings.CHAT_BURST,
+                         settings.CHAT_ADDR_RATE_PER_MINUTE, settings.CHAT_ADDR_BURST)
+REPORT_LIMIT = RateLimiter("report", settings.REPORT_RATE_PER_MINUTE, settings.REPORT_BURST,
+                           settings.REPORT_ADDR_RATE_PER_MINUTE, settings.REPORT_ADDR_BURST)
+
+# limiter keys of the chat turn being served (see client_keys), for limits checked deeper down
+# (the add_report tool)
+SESSION: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("admission_session",
+                                                                          default=())
+
+def client_keys(address: Optional[str], session_id: Optional[str]) -> Tuple[str, ...]:
+    """Limiter keys for a caller: always its address, plus its session when it sent one."""
+    keys: Tuple[str, ...] = (f"ip:{address or 'unknown'}",)
+    return keys + (f"session:{session_id}",) if session_id else keys
@@ -2,9 +2,12 @@
 from __future__ import annotations
 from typing import Optional
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, FewShotChatMessagePromptTemplate
 from ..config.settings import settings
+from functools import lru_cache
+from .llm import chat_model, record_usage
+from ..metrics import timed
+from ..singleflight import coalesce
 
 class ReportClassification(BaseModel):
     category: str = Field(..., description="taxonomy id like 'crime.gunshot'")
@@ -47,7 +50,19 @@ prompt = ChatPromptTemplate.from_messages([
   ("human", "{text}"),
 ])
 
-_model = ChatOpenAI(model=settings.OPENAI_MODEL_CLASSIFIER, temperature=0).with_structured_output(ReportClassification)
+@lru_cache(maxsize=1)
+@coalesce("init")
+def get_chain():
+    # include_raw keeps the AIMessage (and its usage_metadata) next to the parsed result
+    model = chat_model(settings.OPENAI_MODEL_CLASSIFIER, temperature=0)
+    return prompt | model.with_structured_output(ReportClassification, include_raw=True)
 
+@timed("llm_call_seconds", model=settings.OPENAI_MODEL_CLASSIFIER, kind="classifier")
 def classify_report_text(text: str) -> ReportClassification:
-    return (prompt | _model).invoke({"text": text})
+    out = get_chain().invoke({"text": text})
+    record_usage(out.get("raw"), settings.OPENAI_MODEL_CLASSIFIER)
+    if out.get("parsing_error") is not None:
+        raise out["parsing_error"]
+    if out.get("parsed") is None:
+        raise ValueError("classifier returned no structured output")
+    return out["parsed"]
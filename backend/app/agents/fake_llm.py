@@ -0,0 +1,124 @@
+"""
+Deterministic stand-in for ChatOpenAI, selected with LLM_PROVIDER=fake.
+
+It follows the same protocol the graph and classifier rely on (bind_tools, tool calls,
+with_structured_output) using keyword rules, and sleeps FAKE_LLM_FIRST_TOKEN_MS plus
+FAKE_LLM_TOKEN_LATENCY_MS per output token so load tests see realistic holding times.
+"""
+import json, re, time
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+_NEARBY = re.compile(r"\b(near|nearby|around|close|what'?s happening|any reports|updates)\b", re.I)
+_LOC = re.compile(r"lat=(-?\d+(?:\.\d+)?), lon=(-?\d+(?:\.\d+)?)")
+_PHOTO = re.compile(r"Photo URL available: (\S+)")
+
+_RULES = [
+    (("gun", "shot"), "crime.gunshot", "Gunshots reported", "high"),
+    (("robbery", "stolen", "mugged"), "crime.robbery", "Robbery reported", "high"),
+    (("crash", "accident", "collision"), "incident.car_accident", "Car accident", "medium"),
+    (("flood", "water"), "road.flood", "Flooding", "medium"),
+    (("blocked", "closed", "traffic"), "road.blocked", "Road blocked", "low"),
+    (("construction", "roadwork"), "road.construction", "Construction", "low"),
+    (("missing",), "incident.missing_person", "Missing person", "high"),
+    (("lost",), "incident.lost_item", "Lost item", "low"),
+    (("ambulance", "medical", "injured"), "incident.medical", "Medical emergency", "high"),
+]
+
+def _classify(text: str) -> Dict[str, Any]:
+    t = text.lower()
+    for words, cat, label, sev in _RULES:
+        if any(w in t for w in words):
+            return {"category": cat, "label": label, "description": text.strip()[:200],
+                    "severity": sev, "confidence": 0.9}
+    return {"category": "other.unknown", "label": "Report", "description": text.strip()[:200],
+            "severity": None, "confidence": 0.4}
+
+def _sleep_for(tokens: int, first_ms: float, per_token_ms: float) -> None:
+    delay = (first_ms + per_token_ms * tokens) / 1000
+    if delay > 0:
+        time.sleep(delay)
+
+class FakeChatModel(BaseChatModel):
+    first_token_ms: float = 0.0
+    token_latency_ms: float = 0.0
+    tool_names: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "pulsemap-fake"
+
+    def bind_tools(self, tools: List[Any], **kwargs: Any) -> "FakeChatModel":
+        names = [getattr(t, "name", None) or getattr(t, "__name__", str(t)) for t in tools]
+        return FakeChatModel(first_token_ms=self.first_token_ms,
+                             token_latency_ms=self.token_latency_ms,
+                             tool_names=names)
+
+    def with_structured_output(self, schema: Any, *, include_raw: bool = False, **kwargs: Any):
+        def run(prompt: Any) -> Any:
+            msgs = prompt.to_messages() if hasattr(prompt, "to_messages") else prompt
+            text = next((m.content for m in reversed(msgs) if isinstance(m, HumanMessage)), "")
+            out = _classify(str(text))
+            raw = json.dumps(out)
+            _sleep_for(len(raw) // 4, self.first_token_ms, self.token_latency_ms)
+            parsed = schema(**out) if isinstance(schema, type) else out
+            if not include_raw:
+                return parsed
+            msg = AIMessage(content=raw)
+            n_in = sum(len(str(m.content)) // 4 for m in msgs)
+            msg.usage_metadata = {"input_tokens": n_in, "output_tokens": len(raw) // 4,
+                                  "total_tokens": n_in + len(raw) // 4}
+            return {"raw": msg, "parsed": parsed, "parsing_error": None}
+        return RunnableLambda(run)
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        system = "\n".join(str(m.content) for m in messages if isinstance(m, SystemMessage))
+        last = messages[-1] if messages else HumanMessage(content="")
+        if isinstance(last, ToolMessage):
+            try:
+                res = json.loads(last.content) if isinstance(last.content, str) else last.content
+            except ValueError:
+                res = {}
+            if "count" in res:
+                n = res["count"]
+                text = (f"I looked around your spot and found {n} update{'s' if n != 1 else ''}."
+                        if n else "I didn't find any reports in the last 48 hours within 25 miles.")
+            else:
+                props = (res.get("feature") or {}).get("properties") or {}
+                title = props.get("title") or "report"
+                text = f"Thanks, I added your {title.lower()} to the map."
+            return AIMessage(content=text)
+
+        human = str(last.content)
+        loc = _LOC.search(system)
+        if loc and self.tool_names:
+            lat, lon = float(loc.group(1)), float(loc.group(2))
+            if _NEARBY.search(human) and "find_reports_near" in self.tool_names:
+                call = {"name": "find_reports_near",
+                        "args": {"lat": lat, "lon": lon, "radius_km": 40.0, "limit": 10}}
+            elif "add_report" in self.tool_names:
+                args: Dict[str, Any] = {"lat": lat, "lon": lon, "text": human}
+                if (ph := _PHOTO.search(system)):
+                    args["photo_url"] = ph.group(1)
+                call = {"name": "add_report", "args": args}
+            else:
+                call = None
+            if call:
+                call_id = f"call_{uuid4().hex[:12]}"
+                return AIMessage(content="", tool_calls=[{**call, "id": call_id}])
+        return AIMessage(content="Could you share your location so I can help?")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        msg = self._reply(messages)
+        tokens = max(1, len(str(msg.content)) // 4) + 20 * len(msg.tool_calls or [])
+        _sleep_for(tokens, self.first_token_ms, self.token_latency_ms)
+        prompt = sum(len(str(m.content)) // 4 for m in messages)
+        msg.usage_metadata = {"input_tokens": prompt, "output_tokens": tokens,
+                              "total_tokens": prompt + tokens}
+        return ChatResult(generations=[ChatGeneration(message=msg)])
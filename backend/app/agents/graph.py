@@ -3,13 +3,16 @@ from typing import Annotated, Dict, List, Optional, TypedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 from langgraph.graph.message import add_messages
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, BaseMessage, ToolMessage
 from langgraph.checkpoint.sqlite import SqliteSaver
+from functools import lru_cache
 import sqlite3
 
+from .llm import chat_model, record_usage
 from .tools import TOOLS
 from ..config.settings import settings
+from .. import metrics
+from ..singleflight import coalesce
 
 SYSTEM_PROMPT = """
 You are PulseMap Agent — a calm, friendly assistant inside a live community map.  
@@ -40,15 +43,17 @@ You help people add reports and discover what’s happening around them.
 - Never invent reports — only describe what the tools or feeds provide.  
 """
 
-# Long-lived sessions DB (same filename as before)
-conn = sqlite3.connect(str(settings.SESSIONS_DB), check_same_thread=False)
-
-model = ChatOpenAI(
-    model=settings.OPENAI_MODEL_AGENT,
-    temperature=0.2,
-    openai_api_key=settings.OPENAI_API_KEY,
-    streaming=True,
-).bind_tools(TOOLS)
+# Model, sessions DB and compiled graph are built on first use (or by the lifespan warm-up),
+# so importing this module stays cheap and workers without /chat never pay for them.
+@lru_cache(maxsize=1)
+@coalesce("init")  # lru_cache alone lets concurrent first callers each build it
+def _model():
+    return chat_model(
+        settings.OPENAI_MODEL_AGENT,
+        temperature=0.2,
+        openai_api_key=settings.OPENAI_API_KEY,
+        streaming=True,
+    ).bind_tools(TOOLS)
 
 class AgentState(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]
@@ -62,7 +67,9 @@ def model_call(state: AgentState, config=None) -> AgentState:
     photo_hint = f"Photo URL available: {photo}" if photo else "No photo URL in context."
     system = SystemMessage(content=SYSTEM_PROMPT + "\n" + loc_hint + "\n" + photo_hint + "\nOnly call another tool if the user asks for more.")
     msgs = [system, *state["messages"]]
-    ai_msg: AIMessage = model.invoke(msgs)
+    with metrics.timed("llm_call_seconds", model=settings.OPENAI_MODEL_AGENT, kind="agent"):
+        ai_msg: AIMessage = _model().invoke(msgs)
+    record_usage(ai_msg, settings.OPENAI_MODEL_AGENT)
     return {"messages": [ai_msg]}
 
 def should_continue(state: AgentState) -> str:
@@ -71,12 +78,17 @@ def should_continue(state: AgentState) -> str:
         return "continue"
     return "end"
 
-graph = StateGraph(AgentState)
-graph.add_node("agent", model_call)
-graph.add_node("tools", ToolNode(tools=TOOLS))
-graph.add_edge(START, "agent")
-graph.add_conditional_edges("agent", should_continue, {"continue": "tools", "end": END})
-graph.add_edge("tools", "agent")
+@lru_cache(maxsize=1)
+@coalesce("init")
+def get_app():
+    """Compiled agent graph with the long-lived sessions checkpointer."""
+    graph = StateGraph(AgentState)
+    graph.add_node("agent", model_call)
+    graph.add_node("tools", ToolNode(tools=TOOLS))
+    graph.add_edge(START, "agent")
+    graph.add_conditional_edges("agent", should_continue, {"continue": "tools", "end": END})
+    graph.add_edge("tools", "agent")
 
-checkpointer = SqliteSaver(conn)
-APP = graph.compile(checkpointer=checkpointer)
+    conn = sqlite3.connect(str(settings.SESSIONS_DB), check_same_thread=False)
+    _model()
+    return graph.compile(checkpointer=SqliteSaver(conn))
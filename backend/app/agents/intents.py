@@ -0,0 +1,118 @@
+"""
+Deterministic fast path in front of the agent graph.
+
+"What's happening near me?" with a known user_location needs no model: the graph would spend one
+LLM call choosing find_reports_near and another summarizing its result. match_nearby() accepts
+only whole-message phrasings of that lookup (optionally with "within N miles/km"); anything else,
+including a place name, an incident description or a photo, goes to the agent. The reply is
+rendered from a template in the same voice the system prompt asks the model for.
+"""
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from ..config.settings import settings
+
+_FILLER = r"(?:(?:hey|hi|hello|ok|okay|so|please|pulsemap)[, ]+)*"
+_HERE = r"(?:near me|nearby|around me|around here|near here|close to me|in my area|here|around)"
+_WHAT = r"(?:reports|updates|incidents|alerts|events|news|activity)"
+_RADIUS = re.compile(r" (?:within|in) (?P<n>\d+(?:\.\d+)?) ?(?P<unit>miles?|mi|kilometers?|km)\b")
+_WHEN = r"(?: (?:right now|now|today|tonight|lately|currently))?"
+
+_NEARBY = [re.compile(rf"^{_FILLER}{p}{_WHEN}$") for p in (
+    rf"(?:what'?s|what is|whats) (?:happening|going on)(?: {_HERE})?",
+    rf"(?:is there |are there )?(?:any|anything)(?: new)?(?: {_WHAT}(?: {_HERE})?| {_HERE})",
+    rf"(?:what'?s|what is|whats) (?:new )?{_HERE}",
+    rf"(?:show|list|give)(?: me)?(?: the)? (?:nearby |local |recent )*{_WHAT}(?: {_HERE})?",
+    rf"(?:nearby|local|recent) {_WHAT}",
+    rf"what {_WHAT} are there(?: {_HERE})?",
+)]
+
+@dataclass
+class NearbyIntent:
+    lat: float
+    lon: float
+    radius_km: float
+
+def _normalize(message: str) -> str:
+    t = message.lower().replace("’", "'")
+    t = re.sub(r"[?!.]+", " ", t)
+    return re.sub(r"\s+", " ", t).strip(" ,")
+
+def match_nearby(message: str, user_location: Optional[Dict[str, Any]],
+                 photo_url: Optional[str] = None) -> Optional[NearbyIntent]:
+    """A nearby lookup we can answer without the model, or None to fall through to the agent."""
+    if photo_url or not isinstance(user_location, dict):
+        return None
+    try:
+        lat, lon = float(user_location["lat"]), float(user_location["lon"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    text = _normalize(message)
+    km = settings.DEFAULT_RADIUS_KM
+    r = _RADIUS.search(text)
+    if r:
+        n = float(r.group("n"))
+        km = n if r.group("unit").startswith("k") else n * 1.609344
+        text = (text[:r.start()] + text[r.end():]).strip()
+    if not any(rx.match(text) for rx in _NEARBY):
+        return None
+    if not 0 < km <= 500:
+        return None
+    return NearbyIntent(lat, lon, km)
+
+def _ago(iso: Optional[str], now: datetime) -> str:
+    try:
+        t = datetime.fromisoformat(iso)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return "recently"
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    mins = int((now - t).total_seconds() // 60)
+    if mins < 2:
+        return "just now"
+    if mins < 60:
+        return f"{mins} minutes ago"
+    hours = mins // 60
+    if hours < 48:
+        return "about an hour ago" if hours == 1 else f"about {hours} hours ago"
+    return f"{hours // 24} days ago"
+
+def _sentence(props: Dict[str, Any], now: datetime) -> str:
+    title = (props.get("title") or props.get("text") or "Report").rstrip(".")
+    if title.lower().endswith("reported"):
+        title = title[: -len("reported")].rstrip()
+    out = f"{title} reported {_ago(props.get('reported_at'), now)}."
+    n = props.get("incident_reports")
+    if isinstance(n, int) and n > 1:
+        out += f" {n} people reported this."
+    details = []
+    if props.get("severity"):
+        details.append(f"Severity {props['severity']}")
+    if isinstance(props.get("confidence"), (int, float)):
+        details.append(f"confidence {props['confidence']:g}")
+    if details:
+        out += " " + ", ".join(details) + "."
+    out += " Photo attached." if props.get("photo_url") else ""
+    return out
+
+def _span(km: float) -> str:
+    miles = km / 1.609344
+    return f"{miles:.0f} miles" if miles >= 1.5 else f"{km:g} km"
+
+def render_nearby(intent: NearbyIntent, results: List[Dict[str, Any]], max_age_hours: int) -> str:
+    """Summary first, then one sentence per report, newest first."""
+    if not results:
+        return (f"I didn't find any reports in the last {max_age_hours} hours within "
+                f"{_span(intent.radius_km)}. Would you like me to widen the search?")
+    now = datetime.now(timezone.utc)
+    props = sorted((f.get("properties") or {} for f in results),
+                   key=lambda p: p.get("reported_at") or "", reverse=True)
+    n = len(props)
+    head = (f"I looked within {_span(intent.radius_km)} of your spot and found "
+            f"{n} update{'s' if n != 1 else ''}.")
+    return " ".join([head, *(_sentence(p, now) for p in props)])
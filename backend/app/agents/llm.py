@@ -0,0 +1,20 @@
+from __future__ import annotations
+from typing import Any
+from ..config.settings import settings
+
+def chat_model(model: str, **kwargs: Any):
+    """ChatOpenAI, or the offline FakeChatModel when LLM_PROVIDER=fake."""
+    if settings.LLM_PROVIDER == "fake":
+        from .fake_llm import FakeChatModel
+        return FakeChatModel(first_token_ms=settings.FAKE_LLM_FIRST_TOKEN_MS,
+                             token_latency_ms=settings.FAKE_LLM_TOKEN_LATENCY_MS)
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(model=model, **kwargs)
+
+def record_usage(message: Any, model: str) -> None:
+    """Add an AIMessage's usage_metadata to llm_tokens_total."""
+    from .. import metrics
+    usage = getattr(message, "usage_metadata", None) or {}
+    for direction, key in (("input", "input_tokens"), ("output", "output_tokens")):
+        if usage.get(key):
+            metrics.inc("llm_tokens_total", usage[key], model=model, direction=direction)
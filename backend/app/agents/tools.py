@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 from typing import Optional
 from langchain.tools import tool
 from .classifier import classify_report_text, CATEGORY_TO_ICON
+from .. import admission
 from ..services.reports import add_report, find_reports_near
 
 @tool("add_report")
@@ -11,6 +12,14 @@ def add_report_tool(lat: float, lon: float, text: str = "User report", photo_url
     Add a user report as a map point (GeoJSON Feature).
     Returns a JSON string: {"ok": true, "feature": ...}
     """
+    keys = admission.SESSION.get()
+    if keys:
+        try:
+            admission.REPORT_LIMIT.check(*keys)
+        except admission.RateLimited as e:
+            err = ("Too many reports from this session or address; "
+                   f"try again in {e.retry_after} seconds.")
+            return json.dumps({"ok": False, "error": err})
     cls = classify_report_text(text or "User report")
     icon_name = CATEGORY_TO_ICON.get(cls.category, "3d-info")
     props = {
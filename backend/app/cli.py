@@ -0,0 +1,78 @@
+"""
+Maintenance commands.
+
+    python -m backend.app.cli import-reports in.ndjson --format ndjson [--classify] [--keep-indexes]
+    python -m backend.app.cli export-reports out.geojson --format geojson
+    python -m backend.app.cli prune-reports [--hours 168]
+    python -m backend.app.cli vacuum-reports
+"""
+from __future__ import annotations
+import argparse, sys
+from pathlib import Path
+
+def _fmt_from(path: str, fmt: str | None) -> str:
+    if fmt:
+        return fmt
+    ext = Path(path).suffix.lower().lstrip(".")
+    return {"json": "geojson", "jsonl": "ndjson"}.get(ext, ext)
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="pulsemap")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    imp = sub.add_parser("import-reports",
+                         help="bulk-load reports from GeoJSON/NDJSON/CSV ('-' = stdin)")
+    imp.add_argument("path")
+    imp.add_argument("--format", choices=["ndjson", "geojson", "csv"])
+    imp.add_argument("--classify", action="store_true",
+                     help="run the LLM classifier on rows without a category")
+    imp.add_argument("--batch-size", type=int, default=5000)
+    imp.add_argument("--keep-indexes", action="store_true",
+                     help="don't drop indexes during the load "
+                          "(use while the API is serving this store)")
+
+    exp = sub.add_parser("export-reports", help="stream all reports to a file ('-' = stdout)")
+    exp.add_argument("path")
+    exp.add_argument("--format", choices=["ndjson", "geojson", "csv"])
+
+    prn = sub.add_parser("prune-reports",
+                         help="run one retention pass (archive old reports, vacuum)")
+    prn.add_argument("--hours", type=int, help="override RETENTION_HOURS")
+
+    sub.add_parser("vacuum-reports",
+                   help="switch the SQLite reports file to incremental auto-vacuum (one full "
+                        "VACUUM that blocks writers; run it with the API stopped)")
+
+    args = ap.parse_args(argv)
+    from .services.bulk import import_reports, export_reports
+
+    if args.cmd == "import-reports":
+        fmt = _fmt_from(args.path, args.format)
+        opts = dict(classify=args.classify, batch_size=args.batch_size,
+                    rebuild_indexes=not args.keep_indexes)
+        if args.path == "-":
+            res = import_reports(sys.stdin, fmt, **opts)
+        else:
+            with open(args.path, encoding="utf-8-sig", newline="") as fh:
+                res = import_reports(fh, fmt, **opts)
+        print(f"inserted={res['inserted']} skipped={res['skipped']}")
+    elif args.cmd == "export-reports":
+        fmt = _fmt_from(args.path, args.format)
+        out = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+        try:
+            for chunk in export_reports(fmt):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+    elif args.cmd == "prune-reports":
+        import asyncio
+        from .services.retention import run_retention_once
+        print(asyncio.run(run_retention_once(args.hours)))
+    elif args.cmd == "vacuum-reports":
+        from .data.store import incremental_vacuum
+        print(f"free_pages={incremental_vacuum(convert=True)}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
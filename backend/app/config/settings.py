@@ -26,19 +26,128 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str | None = None
     OPENAI_MODEL_AGENT: str = "gpt-4o"
     OPENAI_MODEL_CLASSIFIER: str = "gpt-4o-mini"
+    # "openai" or "fake" (deterministic offline model for load tests, see agents/fake_llm.py)
+    LLM_PROVIDER: str = "openai"
+    FAKE_LLM_TOKEN_LATENCY_MS: float = 0.0
+    FAKE_LLM_FIRST_TOKEN_MS: float = 0.0
+    # Answer plain "what's near me?" chats (with user_location) from a template, without the agent
+    CHAT_FASTPATH: bool = True
+
+    # Upstream feeds (point these at the load-test stub server to run offline)
+    USGS_URL: str = "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/all_hour.geojson"
+    NWS_ALERTS_URL: str = "https://api.weather.gov/alerts/active"
+    EONET_URL: str = "https://eonet.gsfc.nasa.gov/api/v3/events/geojson?status=open&days=7"
+    FIRMS_API_BASE: str = "https://firms.modaps.eosdis.nasa.gov/api/area/csv"
 
     # Paths (env may override with absolute or relative; we resolve below)
     DATA_DIR: Path = Field(default_factory=_default_data_dir)
     REPORTS_DB: Path = Field(default_factory=lambda: _default_data_dir() / "pulsemaps_reports.db")
     SESSIONS_DB: Path = Field(default_factory=lambda: _default_data_dir() / "pulsemap_sessions.db")
+    ARCHIVE_DB: Path = Field(default_factory=lambda: _default_data_dir() / "pulsemaps_archive.db")
+    ZONES_DB: Path = Field(default_factory=lambda: _default_data_dir() / "nws_zones.db")
     UPLOADS_DIR: Path = Field(default_factory=_default_uploads_dir)
     FRONTEND_DIST: Path = Field(default_factory=_default_frontend_dist)
 
+    # Report storage: "sqlite" (the REPORTS_DB file, one host) or "postgis" (REPORTS_DSN, shared by
+    # several API nodes; needs the postgis extra: pip install -e ".[postgis]")
+    REPORTS_BACKEND: str = "sqlite"
+    REPORTS_DSN: str | None = None
+    REPORTS_POOL_SIZE: int = 10
+
+    # Which routers this process serves: "all", "feeds" (feeds/updates/reports, no LLM or GIS)
+    # or "tiles" (/geo only). Run role-specific workers behind a path-routing proxy.
+    API_ROLE: str = "all"
+    # Build the agent graph and tract index in the background right after startup
+    WARM_SUBSYSTEMS: bool = True
+
     # Defaults
     DEFAULT_RADIUS_KM: float = 40.0
     DEFAULT_LIMIT: int = 10
     MAX_AGE_HOURS: int = 48
 
+    # Feed snapshots are shared by all requests for this long before re-fetching upstream; after a
+    # failed fetch the stale snapshot is served for FEED_RETRY_SECONDS before the next attempt
+    FEED_TTL_SECONDS: int = 60
+    FEED_RETRY_SECONDS: int = 15
+    # Multi-worker deployments: one process (flock in FEED_SHARED_DIR) fetches every feed and
+    # publishes mmap-able snapshot files; all workers serve from those instead of fetching
+    # themselves
+    FEED_SHARED: bool = False
+    FEED_SHARED_DIR: Path = Field(default_factory=lambda: _default_data_dir() / "feeds")
+    # Right after startup /feeds/<name> waits up to this long for the owner's first publish (503
+    # after that); /updates and watches never wait, they leave an unpublished feed out
+    FEED_SHARED_WAIT_SECONDS: float = 10.0
+    # Max unknown NWS zone shapes fetched per NWS refresh (the rest resolve on later refreshes)
+    NWS_ZONE_FETCH_LIMIT: int = 200
+
+    # Geofence watches (POST /watch): dropped after this long without a poll; circles and polygons
+    # must fit in WATCH_MAX_RADIUS_KM, and past WATCH_MAX_ACTIVE live watches per worker new ones
+    # get 503 + Retry-After
+    WATCH_TTL_SECONDS: int = 600
+    WATCH_QUEUE_MAX: int = 200
+    WATCH_MAX_RADIUS_KM: float = 200.0
+    WATCH_MAX_ACTIVE: int = 10_000
+
+    # Incidents: a classified report joins the nearest incident of its category within this radius
+    # that got a report in the last INCIDENT_WINDOW_MINUTES (either set to 0 disables consolidation)
+    INCIDENT_RADIUS_KM: float = 0.5
+    INCIDENT_WINDOW_MINUTES: int = 120
+
+    # Activity rollups (/updates/timeline): hourly counts kept this long; feed event keys are
+    # remembered ROLLUP_EVENT_KEY_HOURS so a row still in the feed is never counted twice
+    ROLLUP_RETENTION_DAYS: int = 90
+    ROLLUP_EVENT_KEY_HOURS: int = 24 * 14
+
+    # Retention: reports older than this move to ARCHIVE_DB (0 disables the background task)
+    RETENTION_HOURS: int = 24 * 7
+    RETENTION_INTERVAL_SECONDS: int = 3600
+    RETENTION_BATCH: int = 5000
+
+    # Admission control: each route class (llm = /chat, db = /reports, /incidents,
+    # /updates/timeline, gis = /geo/tracts) runs on its own pool of *_WORKERS threads with up to
+    # *_QUEUE waiting; past that, requests get 503 + Retry-After instead of queueing behind the
+    # backlog
+    LLM_WORKERS: int = 8
+    LLM_QUEUE: int = 16
+    DB_WORKERS: int = 8
+    DB_QUEUE: int = 64
+    GIS_WORKERS: int = 4
+    GIS_QUEUE: int = 32
+    # Token buckets per session (sustained rate per minute, burst) and, much larger, per client
+    # address; a rate of 0 disables the limit. Behind a proxy, run uvicorn with --proxy-headers and
+    # --forwarded-allow-ips so addresses are the clients', not the proxy's
+    CHAT_RATE_PER_MINUTE: int = 20
+    CHAT_BURST: int = 5
+    CHAT_ADDR_RATE_PER_MINUTE: int = 600
+    CHAT_ADDR_BURST: int = 100
+    REPORT_RATE_PER_MINUTE: int = 6
+    REPORT_BURST: int = 3
+    REPORT_ADDR_RATE_PER_MINUTE: int = 120
+    REPORT_ADDR_BURST: int = 30
+
+    # Precompressed responses (feeds, updates/global, reports, tracts): compressed bodies kept per
+    # content hash up to this size; smaller bodies than COMPRESS_MIN_BYTES are sent as is
+    RESPONSE_CACHE_MB: int = 64
+    COMPRESS_MIN_BYTES: int = 1024
+
+    # POST /reports/bulk (admin only): bodies over this are rejected with 413
+    BULK_IMPORT_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Photo uploads
+    MAX_UPLOAD_BYTES: int = 5 * 1024 * 1024
+    IMAGE_DISPLAY_PX: int = 1600
+    IMAGE_THUMB_PX: int = 320
+    IMAGE_WORKERS: int = 2
+
+    # Profiling: requests slower than PROFILE_SLOW_MS keep stack samples + span timings (0 disables;
+    # so does an unset ADMIN_TOKEN)
+    PROFILE_SLOW_MS: int = 2000
+    PROFILE_SAMPLE_MS: float = 10.0
+    PROFILE_RING_SIZE: int = 50
+    # /admin/* and on-demand profiling (?profile=1 / X-Profile: 1) require X-Admin-Token;
+    # unset = both off
+    ADMIN_TOKEN: str | None = None
+
     # Optional extras you had in .env
     firms_map_key: str | None = None
     gdacs_rss_url: str | None = "https://www.gdacs.org/xml/rss.xml"
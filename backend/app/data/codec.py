@@ -0,0 +1,24 @@
+from __future__ import annotations
+from typing import Any, Iterable
+import orjson
+
+# Non-str dict keys show up in some upstream payloads; numpy scalars come from the tract frame.
+_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(obj: Any) -> bytes:
+    """Encode to compact UTF-8 JSON bytes."""
+    return orjson.dumps(obj, option=_OPTS)
+
+def loads(data: bytes | str) -> Any:
+    return orjson.loads(data)
+
+def join_array(parts: Iterable[bytes]) -> bytes:
+    """Join already-encoded JSON values into a JSON array."""
+    return b"[" + b",".join(parts) + b"]"
+
+def feature_collection(features: Iterable[bytes]) -> bytes:
+    return b'{"type":"FeatureCollection","features":' + join_array(features) + b"}"
+
+def wrap(key: str, encoded: bytes) -> bytes:
+    """{"<key>": <encoded>} without decoding the inner value."""
+    return b"{" + dumps(key) + b":" + encoded + b"}"
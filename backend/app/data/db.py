@@ -1,7 +1,9 @@
 import sqlite3
-from . import store  # ensure tables are created on import (store does CREATE TABLE)
+from .store import STORE
 
 def get_reports_conn() -> sqlite3.Connection:
-    # store.py already keeps a module-level connection; this is a placeholder
-    from .store import _CONN as REPORTS_CONN  # type: ignore
-    return REPORTS_CONN
+    # only the SQLite store has a single shared connection
+    conn = getattr(STORE, "conn", None)
+    if conn is None:
+        raise RuntimeError(f"REPORTS_BACKEND={STORE.name} has no SQLite connection")
+    return conn
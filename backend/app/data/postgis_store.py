@@ -0,0 +1,475 @@
+"""
+PostGIS report store (REPORTS_BACKEND=postgis), for several API nodes sharing one database.
+
+Needs psycopg 3 and psycopg_pool (`pip install -e ".[postgis]"`) and a PostgreSQL database
+where the postgis extension exists or can be created. Tables mirror the SQLite store; points are
+geography(Point, 4326) with GiST indexes, so radius queries are one ST_DWithin index scan (no
+2000-row candidate cap) and bbox queries use &&. Incident matching is serialized per category
+with a transaction-level advisory lock, which holds across nodes the way BEGIN IMMEDIATE does
+across workers sharing a SQLite file.
+
+created_at / first_at / last_at are timestamptz; the session runs in UTC and rows are returned
+with isoformat strings, so Features look exactly like the SQLite store's.
+"""
+from __future__ import annotations
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import codec
+from ..metrics import timed
+from .report_store import (
+    BBox, ReportStore, Row, _INCIDENT_COLS, _new_feature, _report_rollups, _row_to_feature,
+    rollup_key,
+)
+
+_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS postgis SCHEMA public",
+    """
+    CREATE TABLE IF NOT EXISTS reports (
+      id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+      lat DOUBLE PRECISION NOT NULL,
+      lon DOUBLE PRECISION NOT NULL,
+      geom geography(Point, 4326) NOT NULL,
+      text TEXT NOT NULL,
+      props_json TEXT,  -- kept as text (not jsonb) so props come back byte for byte
+      created_at TIMESTAMPTZ NOT NULL,
+      incident_id BIGINT
+    )""",
+    """
+    CREATE TABLE IF NOT EXISTS incidents (
+      id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+      category TEXT NOT NULL,
+      title TEXT,
+      emoji TEXT,
+      lat DOUBLE PRECISION NOT NULL,
+      lon DOUBLE PRECISION NOT NULL,
+      geom geography(Point, 4326) NOT NULL,
+      first_at TIMESTAMPTZ NOT NULL,
+      last_at TIMESTAMPTZ NOT NULL,
+      report_count INTEGER NOT NULL,
+      last_report_id BIGINT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_incidents_geom ON incidents USING GIST (geom)",
+    "CREATE INDEX IF NOT EXISTS idx_incidents_category ON incidents (category, last_at)",
+    "CREATE INDEX IF NOT EXISTS idx_incidents_last_at ON incidents (last_at)",
+    """
+    CREATE TABLE IF NOT EXISTS rollups (
+      hour INTEGER NOT NULL,
+      cell_y INTEGER NOT NULL,
+      cell_x INTEGER NOT NULL,
+      source TEXT NOT NULL,
+      category TEXT NOT NULL,
+      n BIGINT NOT NULL,
+      PRIMARY KEY (hour, cell_y, cell_x, source, category)
+    )""",
+    "CREATE TABLE IF NOT EXISTS rollup_events (key TEXT PRIMARY KEY, hour INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_rollup_events_hour ON rollup_events (hour)",
+    # bumped with every delete, so other nodes' feature caches notice rows went away
+    "CREATE TABLE IF NOT EXISTS report_deletes"
+    " (id INTEGER PRIMARY KEY CHECK (id = 1), generation BIGINT NOT NULL)",
+    "INSERT INTO report_deletes (id, generation) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+    # bumped by every transaction that adds or removes reports (see _BUMP_VERSION)
+    "CREATE TABLE IF NOT EXISTS report_version"
+    " (id INTEGER PRIMARY KEY CHECK (id = 1), version BIGINT NOT NULL)",
+    "INSERT INTO report_version (id, version) VALUES (1, 0) ON CONFLICT (id) DO NOTHING",
+    """
+    CREATE TABLE IF NOT EXISTS reports_archive (
+      id BIGINT PRIMARY KEY,
+      lat DOUBLE PRECISION NOT NULL,
+      lon DOUBLE PRECISION NOT NULL,
+      text TEXT NOT NULL,
+      props_json TEXT,
+      created_at TIMESTAMPTZ NOT NULL,
+      archived_at TIMESTAMPTZ NOT NULL
+    )""",
+)
+
+_INDEXES = {
+    "idx_reports_geom": "CREATE INDEX IF NOT EXISTS idx_reports_geom ON reports USING GIST (geom)",
+    "idx_reports_created_at":
+        "CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports (created_at)",
+    # newest report per incident for the collapsed views
+    "idx_reports_incident":
+        "CREATE INDEX IF NOT EXISTS idx_reports_incident ON reports (incident_id, id)",
+}
+
+_POINT = "ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326)::geography"
+_ENVELOPE = "ST_MakeEnvelope(%(minx)s, %(miny)s, %(maxx)s, %(maxy)s, 4326)::geography"
+_ROW_COLS = "id, lat, lon, text, props_json, created_at"
+# Last statement of each transaction that changes reports. MAX(id) can't version the data:
+# sequence ids commit out of order, so a reader may see id 101 before id 100 commits. The row lock
+# held from this UPDATE to COMMIT orders the bumps like the commits, so a reader that sees
+# version v sees every change up to v.
+_BUMP_VERSION = "UPDATE report_version SET version = version + 1"
+# every report that is not part of an incident, plus the newest report of each incident
+_COLLAPSED = ("(incident_id IS NULL OR id IN"
+              " (SELECT MAX(id) FROM reports WHERE incident_id IS NOT NULL GROUP BY incident_id))")
+
+def _iso(v: Any) -> Any:
+    return v.isoformat() if isinstance(v, datetime) else v
+
+def _row(r: tuple) -> Row:
+    return (r[0], r[1], r[2], r[3], r[4], _iso(r[5]))
+
+def _incident_row(r: tuple) -> tuple:
+    return (*r[:6], _iso(r[6]), _iso(r[7]), *r[8:])
+
+def _ewkt(lat: float, lon: float) -> str:
+    return f"SRID=4326;POINT({float(lon)!r} {float(lat)!r})"
+
+class PostgisReportStore(ReportStore):
+    name = "postgis"
+
+    def __init__(self, dsn: str, schema: Optional[str] = None, pool_size: int = 10) -> None:
+        try:
+            from psycopg import sql
+            from psycopg_pool import ConnectionPool
+        except ImportError as e:
+            raise RuntimeError("REPORTS_BACKEND=postgis needs psycopg and psycopg_pool: "
+                               "pip install -e '.[postgis]'") from e
+        super().__init__()
+        self.schema = schema
+        self._sql = sql
+        self._pool = ConnectionPool(dsn, min_size=1, max_size=pool_size, configure=self._configure,
+                                    open=True, name="pulsemap-reports")
+        with self._pool.connection() as conn:
+            for ddl in _DDL:
+                conn.execute(ddl)
+            for ddl in _INDEXES.values():
+                conn.execute(ddl)
+
+    def _configure(self, conn: Any) -> None:
+        conn.execute("SET TIME ZONE 'UTC'")
+        if self.schema:
+            schema = self._sql.Identifier(self.schema)
+            conn.execute(self._sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(schema))
+            conn.execute(self._sql.SQL("SET search_path TO {}, public").format(schema))
+        conn.commit()
+
+    def _bump(self, cur: Any, counts: Counter) -> None:
+        if counts:
+            cur.executemany(
+                "INSERT INTO rollups (hour, cell_y, cell_x, source, category, n)"
+                " VALUES (%s,%s,%s,%s,%s,%s)"
+                " ON CONFLICT (hour, cell_y, cell_x, source, category)"
+                " DO UPDATE SET n = rollups.n + excluded.n",
+                [(*k, n) for k, n in counts.items()],
+            )
+
+    # ---------- reports ----------
+
+    def _attach(self, cur: Any, lat: float, lon: float, now: datetime, props: dict,
+                category: str, radius_km: float, window_minutes: int) -> tuple[int, int]:
+        """
+        Find or open the incident for a new report (inside the insert transaction). Returns
+        (id, report_count).
+        """
+        # one writer per category at a time, on every node, so two nearby first reports
+        # can't both open one
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", ("incident:" + category,))
+        p = {"lat": lat, "lon": lon, "cat": category, "m": radius_km * 1000.0,
+             "since": now - timedelta(minutes=window_minutes)}
+        hit = cur.execute(
+            f"SELECT id, lat, lon, report_count FROM incidents"
+            " WHERE category = %(cat)s AND last_at >= %(since)s"
+            f" AND ST_DWithin(geom, {_POINT}, %(m)s)"
+            f" ORDER BY ST_Distance(geom, {_POINT}) LIMIT 1",
+            p,
+        ).fetchone()
+        if hit is None:
+            iid = cur.execute(
+                "INSERT INTO incidents (category, title, emoji, lat, lon, geom, first_at, last_at,"
+                " report_count)"
+                f" VALUES (%(cat)s, %(title)s, %(emoji)s, %(lat)s, %(lon)s, {_POINT}, %(now)s,"
+                " %(now)s, 1) RETURNING id",
+                {**p, "title": props.get("title"), "emoji": props.get("emoji"), "now": now},
+            ).fetchone()[0]
+            return iid, 1
+        iid, ilat, ilon, n = hit
+        # running centroid, so a spreading event keeps collecting reports near its middle
+        clat, clon = (ilat * n + lat) / (n + 1), (ilon * n + lon) / (n + 1)
+        cur.execute(
+            f"UPDATE incidents SET lat = %(lat)s, lon = %(lon)s, geom = {_POINT},"
+            " last_at = %(now)s,"
+            f" report_count = %(n)s WHERE id = %(id)s",
+            {"lat": clat, "lon": clon, "now": now, "n": n + 1, "id": iid},
+        )
+        return iid, n + 1
+
+    @timed("db_query_seconds", op="add_report")
+    def add_report(self, lat: float, lon: float, text: str = "User report",
+                   props: dict | None = None,
+                   incident: Optional[tuple[str, float, int]] = None) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        lat, lon = float(lat), float(lon)
+        props = dict(props or {})
+        bucket = rollup_key(lat, lon, int(now.timestamp()) // 3600, "report",
+                            props.get("category") or "other.unknown")
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            iid = None
+            if incident is not None:
+                iid, count = self._attach(cur, lat, lon, now, props, *incident)
+                props["incident_id"] = str(iid)
+                props["incident_reports"] = count
+            rid = cur.execute(
+                f"INSERT INTO reports (lat, lon, geom, text, props_json, created_at, incident_id)"
+                f" VALUES (%(lat)s, %(lon)s, {_POINT}, %(text)s, %(props)s, %(now)s, %(iid)s)"
+                " RETURNING id",
+                {"lat": lat, "lon": lon, "text": text, "props": codec.dumps(props).decode(),
+                 "now": now, "iid": iid},
+            ).fetchone()[0]
+            if iid is not None:
+                cur.execute("UPDATE incidents SET last_report_id = %s WHERE id = %s", (rid, iid))
+            self._bump(cur, Counter({bucket: 1}))
+            cur.execute(_BUMP_VERSION)
+        return _new_feature(rid, lat, lon, text, now.isoformat(), props)
+
+    @timed("db_query_seconds", op="feature_collection")
+    def get_feature_collection(self, collapse: bool = False) -> Dict[str, Any]:
+        sql = f"SELECT {_ROW_COLS} FROM reports"
+        if collapse:
+            sql += f" WHERE {_COLLAPSED}"
+        with self._pool.connection() as conn:
+            rows = conn.execute(sql + " ORDER BY id DESC").fetchall()
+        return {"type": "FeatureCollection", "features": [_row_to_feature(_row(r)) for r in rows]}
+
+    def report_ids(self, collapse: bool = False, bbox: Optional[BBox] = None,
+                   since_iso: Optional[str] = None,
+                   limit: Optional[int] = None) -> List[int]:
+        sql, p = "SELECT id FROM reports WHERE TRUE", {}
+        if bbox is not None:
+            minx, miny, maxx, maxy = bbox
+            # && is the GiST prefilter; the lat/lon test keeps the edges exact
+            # (geography boxes bulge)
+            sql += (f" AND geom && {_ENVELOPE}"
+                    " AND lat BETWEEN %(miny)s AND %(maxy)s AND lon BETWEEN %(minx)s AND %(maxx)s")
+            p.update(minx=minx, miny=miny, maxx=maxx, maxy=maxy)
+        if since_iso is not None:
+            sql += " AND created_at >= %(since)s"
+            p["since"] = datetime.fromisoformat(since_iso)
+        if collapse:
+            sql += f" AND {_COLLAPSED}"
+        sql += " ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT %(limit)s"
+            p["limit"] = int(limit)
+        with self._pool.connection() as conn:
+            return [r[0] for r in conn.execute(sql, p)]
+
+    def rows_by_ids(self, ids: List[int]) -> List[Row]:
+        if not ids:
+            return []
+        with self._pool.connection() as conn:
+            rows = conn.execute(f"SELECT {_ROW_COLS} FROM reports WHERE id = ANY(%s)",
+                                (list(ids),)).fetchall()
+        return [_row(r) for r in rows]
+
+    def page_reports(self, after_id: int = 0, limit: int = 5000) -> List[Row]:
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {_ROW_COLS} FROM reports WHERE id > %s ORDER BY id LIMIT %s",
+                (after_id, limit),
+            ).fetchall()
+        return [_row(r) for r in rows]
+
+    @timed("db_query_seconds", op="find_near")
+    def find_reports_near(self, lat: float, lon: float, radius_km: float = 10.0, limit: int = 20,
+                          max_age_hours: Optional[int] = None,
+                          collapse: bool = False) -> List[Dict[str, Any]]:
+        p: Dict[str, Any] = {"lat": lat, "lon": lon, "m": radius_km * 1000.0,
+                             "limit": max(1, limit)}
+        where = f"ST_DWithin(geom, {_POINT}, %(m)s)"
+        if max_age_hours is not None:
+            where += " AND created_at >= %(since)s"
+            p["since"] = datetime.now(timezone.utc) - timedelta(hours=int(max_age_hours))
+        inner = f"SELECT {_ROW_COLS}, ST_Distance(geom, {_POINT}) AS d FROM reports WHERE {where}"
+        if collapse:
+            # newest in-range report per incident; reports outside incidents are their own group
+            inner = (f"SELECT DISTINCT ON (COALESCE(incident_id, -id)) {_ROW_COLS},"
+                     f" ST_Distance(geom, {_POINT}) AS d"
+                     f" FROM reports WHERE {where} ORDER BY COALESCE(incident_id, -id), id DESC")
+        with self._pool.connection() as conn:
+            rows = conn.execute(f"SELECT {_ROW_COLS} FROM ({inner}) s ORDER BY d LIMIT %(limit)s",
+                                p).fetchall()
+        return [_row_to_feature(_row(r)) for r in rows]
+
+    @timed("db_query_seconds", op="bulk_insert")
+    def bulk_insert(self, rows: Iterable[tuple], batch_size: int = 5000,
+                    rebuild_indexes: bool = True) -> int:
+        """Batches are streamed with COPY, one transaction each."""
+        n = 0
+        if rebuild_indexes:
+            with self._pool.connection() as conn:
+                for name in _INDEXES:
+                    conn.execute(f"DROP INDEX IF EXISTS {name}")
+        try:
+            batch: List[tuple] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    self._copy_batch(batch)
+                    n += len(batch)
+                    batch = []
+            if batch:
+                self._copy_batch(batch)
+                n += len(batch)
+        finally:
+            if rebuild_indexes:
+                with self._pool.connection() as conn:
+                    for ddl in _INDEXES.values():
+                        conn.execute(ddl)
+                    conn.execute("ANALYZE reports")
+        return n
+
+    def _copy_batch(self, batch: List[tuple]) -> None:
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            copy_sql = "COPY reports (lat, lon, geom, text, props_json, created_at) FROM STDIN"
+            with cur.copy(copy_sql) as cp:
+                for lat, lon, text, props_json, created_at in batch:
+                    cp.write_row((lat, lon, _ewkt(lat, lon), text, props_json, created_at))
+            self._bump(cur, _report_rollups(batch))
+            cur.execute(_BUMP_VERSION)
+
+    @timed("db_query_seconds", op="clear")
+    def clear_reports(self) -> dict[str, Any]:
+        with self._pool.connection() as conn:
+            conn.execute("TRUNCATE reports, incidents")
+            conn.execute("DELETE FROM rollups WHERE source = 'report'")
+            conn.execute("UPDATE report_deletes SET generation = generation + 1")
+            conn.execute(_BUMP_VERSION)
+        self._forget()
+        return {"ok": True, "message": "All reports cleared."}
+
+    def data_version(self) -> Tuple[int, int]:
+        with self._pool.connection() as conn:
+            return conn.execute(
+                "SELECT (SELECT version FROM report_version),"
+                " (SELECT generation FROM report_deletes)"
+            ).fetchone()
+
+    # ---------- retention ----------
+
+    @timed("db_query_seconds", op="archive")
+    def archive_reports_before(self, cutoff_iso: str, archive_db: str,
+                               batch_size: int = 5000) -> List[int]:
+        """
+        Archived rows go to reports_archive in the same database (archive_db is a SQLite path and
+        is ignored here). SKIP LOCKED lets retention run on every node without waiting on each
+        other.
+        """
+        cutoff = datetime.fromisoformat(cutoff_iso)
+        with self._pool.connection() as conn:
+            ids = [r[0] for r in conn.execute(
+                """
+                WITH moved AS (
+                  DELETE FROM reports WHERE id IN (
+                    SELECT id FROM reports WHERE created_at < %(cutoff)s ORDER BY created_at
+                    LIMIT %(limit)s FOR UPDATE SKIP LOCKED)
+                  RETURNING id, lat, lon, text, props_json, created_at
+                )
+                INSERT INTO reports_archive
+                  (id, lat, lon, text, props_json, created_at, archived_at)
+                SELECT id, lat, lon, text, props_json, created_at, now() FROM moved
+                ON CONFLICT (id) DO UPDATE SET archived_at = excluded.archived_at
+                RETURNING id
+                """,
+                {"cutoff": cutoff, "limit": int(batch_size)},
+            )]
+            if not ids:
+                # every report of an incident last updated before the cutoff is archived by now
+                conn.execute("DELETE FROM incidents WHERE last_at < %s", (cutoff,))
+                return []
+            conn.execute("UPDATE report_deletes SET generation = generation + 1")
+            conn.execute(_BUMP_VERSION)
+        self._forget(ids)
+        return ids
+
+    def incremental_vacuum(self, pages: int = 1000, convert: bool = False) -> int:
+        """Autovacuum reclaims archived rows on PostgreSQL; nothing to do here."""
+        return 0
+
+    # ---------- rollups ----------
+
+    @timed("db_query_seconds", op="rollup_feed")
+    def record_feed_events(self, events: Iterable[Tuple[str, float, float, int, str, str]],
+                           keep_hours: int) -> int:
+        by_key = {e[0]: e for e in events}
+        counts: Counter = Counter()
+        now_hour = int(datetime.now(timezone.utc).timestamp()) // 3600
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            if by_key:
+                new = cur.execute(
+                    "INSERT INTO rollup_events (key, hour)"
+                    " SELECT * FROM unnest(%s::text[], %s::int[])"
+                    " ON CONFLICT DO NOTHING RETURNING key",
+                    (list(by_key), [e[3] for e in by_key.values()]),
+                ).fetchall()
+                for (key,) in new:
+                    _, lat, lon, hour, source, category = by_key[key]
+                    counts[rollup_key(lat, lon, hour, source, category)] += 1
+                self._bump(cur, counts)
+            cur.execute("DELETE FROM rollup_events WHERE hour < %s", (now_hour - keep_hours,))
+        return sum(counts.values())
+
+    @timed("db_query_seconds", op="rollup_query")
+    def rollup_counts(self, hour_from: int, hour_to: int,
+                      cells: Optional[Tuple[int, int, int, int]] = None,
+                      source: Optional[str] = None, category: Optional[str] = None) -> List[tuple]:
+        sql = ("SELECT hour, source, category, SUM(n)::bigint FROM rollups"
+               " WHERE hour BETWEEN %s AND %s")
+        params: list[Any] = [hour_from, hour_to]
+        if cells is not None:
+            sql += " AND cell_y BETWEEN %s AND %s AND cell_x BETWEEN %s AND %s"
+            params += list(cells)
+        if source:
+            sql += " AND source = %s"
+            params.append(source)
+        if category:
+            sql += " AND category = %s"
+            params.append(category)
+        with self._pool.connection() as conn:
+            return conn.execute(sql + " GROUP BY hour, source, category", params).fetchall()
+
+    def prune_rollups(self, before_hour: int) -> int:
+        with self._pool.connection() as conn:
+            return conn.execute("DELETE FROM rollups WHERE hour < %s", (before_hour,)).rowcount
+
+    # ---------- incidents ----------
+
+    @timed("db_query_seconds", op="incidents")
+    def find_incidents(self, bbox: Optional[BBox] = None, category: Optional[str] = None,
+                       since_iso: Optional[str] = None, limit: int = 500) -> List[tuple]:
+        sql, p = f"SELECT {_INCIDENT_COLS} FROM incidents WHERE TRUE", {}
+        if bbox is not None:
+            minx, miny, maxx, maxy = bbox
+            sql += (f" AND geom && {_ENVELOPE}"
+                    " AND lat BETWEEN %(miny)s AND %(maxy)s AND lon BETWEEN %(minx)s AND %(maxx)s")
+            p.update(minx=minx, miny=miny, maxx=maxx, maxy=maxy)
+        if category:
+            sql += " AND category = %(cat)s"
+            p["cat"] = category
+        if since_iso:
+            sql += " AND last_at >= %(since)s"
+            p["since"] = datetime.fromisoformat(since_iso)
+        sql += " ORDER BY last_at DESC LIMIT %(limit)s"
+        p["limit"] = int(limit)
+        with self._pool.connection() as conn:
+            return [_incident_row(r) for r in conn.execute(sql, p)]
+
+    @timed("db_query_seconds", op="incident")
+    def get_incident(self, iid: int,
+                     limit: int = 50) -> Optional[tuple[tuple, List[Dict[str, Any]]]]:
+        with self._pool.connection() as conn:
+            row = conn.execute(f"SELECT {_INCIDENT_COLS} FROM incidents WHERE id = %s",
+                               (iid,)).fetchone()
+            if row is None:
+                return None
+            reports = conn.execute(
+                f"SELECT {_ROW_COLS} FROM reports WHERE incident_id = %s ORDER BY id DESC LIMIT %s",
+                (iid, int(limit)),
+            ).fetchall()
+        return _incident_row(row), [_row_to_feature(_row(r)) for r in reports]
+
+    def close(self) -> None:
+        self._pool.close()
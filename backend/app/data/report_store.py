@@ -0,0 +1,309 @@
+"""
+Report storage interface.
+
+data/store.py exposes one ReportStore, picked by settings.REPORTS_BACKEND:
+
+  sqlite   SqliteReportStore (data/sqlite_store.py): one file at REPORTS_DB. The default; any
+           number of workers on one host.
+  postgis  PostgisReportStore (data/postgis_store.py): PostgreSQL + PostGIS at REPORTS_DSN, so
+           several API nodes share reports, incidents and rollups.
+
+Both use the same row shape, (id, lat, lon, text, props_json, created_at) with created_at a UTC
+isoformat string, and return the same Features. backend/bench/store_conformance.py runs one set
+of checks against each backend.
+"""
+from __future__ import annotations
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from math import cos, floor, radians
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import codec
+from ..metrics import cache_result, timed
+
+Row = Tuple[int, float, float, str, Optional[str], str]
+BBox = Tuple[float, float, float, float]  # (minLon, minLat, maxLon, maxLat)
+
+# incident grid cells are INCIDENT_CELL_DEG degrees of lat and lon (~1.1 km north-south)
+INCIDENT_CELL_DEG = 0.01
+
+def _cell(v: float) -> int:
+    return floor(v / INCIDENT_CELL_DEG)
+
+def _bbox_deg(lat: float, radius_km: float) -> tuple[float, float]:
+    return radius_km / 111.32, radius_km / (111.32 * max(cos(radians(lat)), 0.01))
+
+# rollup cells are ROLLUP_CELL_DEG degrees of lat and lon (~5.5 km north-south)
+ROLLUP_CELL_DEG = 0.05
+
+RollupKey = Tuple[int, int, int, str, str]  # (hour, cell_y, cell_x, source, category)
+
+def rollup_key(lat: float, lon: float, hour: int, source: str, category: str) -> RollupKey:
+    return hour, floor(lat / ROLLUP_CELL_DEG), floor(lon / ROLLUP_CELL_DEG), source, category
+
+def _report_rollups(rows: Iterable[tuple]) -> Counter:
+    """Rollup counts for (lat, lon, text, props_json, created_at) insert tuples."""
+    counts: Counter = Counter()
+    for lat, lon, _, props_json, created_at in rows:
+        try:
+            hour = int(datetime.fromisoformat(created_at).timestamp()) // 3600
+            cat = (codec.loads(props_json) if props_json else {}).get("category")
+        except Exception:
+            continue
+        counts[rollup_key(float(lat), float(lon), hour, "report", cat or "other.unknown")] += 1
+    return counts
+
+_INCIDENT_COLS = ("id, category, title, emoji, lat, lon, first_at, last_at, report_count,"
+                  " last_report_id")
+
+def _row_to_feature(row: tuple) -> Dict[str, Any]:
+    _id, lat, lon, text, props_json, created_at = row
+    props = {"type": "user_report", "text": text, "reported_at": created_at}
+    if props_json:
+        try:
+            props.update(codec.loads(props_json))
+        except Exception:
+            props["raw_props"] = props_json
+    # ✅ ensure a stable id is present on every returned feature
+    props.setdefault("rid", str(_id))
+    props.setdefault("id", str(_id))      # optional mirror
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": props,
+    }
+
+def _new_feature(rid: int, lat: float, lon: float, text: str, created_at: str,
+                 props: dict) -> Dict[str, Any]:
+    # include rid in the immediate response so the UI can show counts instantly
+    out_props = {"type": "user_report", "text": text, "reported_at": created_at, **props}
+    out_props.setdefault("rid", str(rid))
+    out_props.setdefault("id", str(rid))
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [float(lon), float(lat)]},
+        "properties": out_props,
+    }
+
+class ReportStore(ABC):
+    """Reports, incidents and activity rollups. Methods are safe to call from any thread."""
+    name = ""
+
+    def __init__(self) -> None:
+        # rid -> encoded Feature bytes. Rows are never updated in place and ids are never reused,
+        # so entries only go stale when a row is deleted (see _sync_cache).
+        self._feature_bytes: Dict[int, bytes] = {}
+        # rid -> to_row(feature) for get_report_updates, same lifetime as _feature_bytes
+        self._update_rows: Dict[int, Any] = {}
+        self._feature_lock = threading.Lock()
+        self._cache_generation: Optional[int] = None  # delete generation the caches were checked at
+
+    # ---------- reports ----------
+
+    @abstractmethod
+    def add_report(self, lat: float, lon: float, text: str = "User report",
+                   props: dict | None = None,
+                   incident: Optional[tuple[str, float, int]] = None) -> Dict[str, Any]:
+        """
+        Insert one report. With incident=(category, radius_km, window_minutes) it joins the nearest
+        incident of that category updated within the window (or opens one) in the same transaction;
+        the report's props then carry incident_id and incident_reports (the count including it).
+        """
+
+    @abstractmethod
+    def find_reports_near(self, lat: float, lon: float, radius_km: float = 10.0, limit: int = 20,
+                          max_age_hours: Optional[int] = None,
+                          collapse: bool = False) -> List[Dict[str, Any]]:
+        """Reports within radius_km, nearest first; with collapse, the newest per incident."""
+
+    @abstractmethod
+    def report_ids(self, collapse: bool = False, bbox: Optional[BBox] = None,
+                   since_iso: Optional[str] = None,
+                   limit: Optional[int] = None) -> List[int]:
+        """Report ids, newest first; with collapse, reports outside incidents plus each newest."""
+
+    @abstractmethod
+    def rows_by_ids(self, ids: List[int]) -> List[Row]:
+        """Rows for ids, in no particular order; unknown ids are skipped."""
+
+    @abstractmethod
+    def page_reports(self, after_id: int = 0, limit: int = 5000) -> List[Row]:
+        """Up to `limit` rows with id > after_id, in id order (keyset pagination)."""
+
+    @abstractmethod
+    def bulk_insert(self, rows: Iterable[tuple], batch_size: int = 5000,
+                    rebuild_indexes: bool = True) -> int:
+        """
+        Insert (lat, lon, text, props_json, created_at) tuples, one transaction per batch; returns
+        how many. With rebuild_indexes secondary indexes are dropped first and rebuilt once at the
+        end.
+        """
+
+    @abstractmethod
+    def clear_reports(self) -> dict[str, Any]:
+        """Delete every report and incident, and the report rollups."""
+
+    @abstractmethod
+    def data_version(self) -> Tuple[int, int]:
+        """
+        (insert version, delete generation). Every delete (archive, clear) bumps the generation in
+        the same transaction, so the pair changes whenever the set of reports does, on any worker
+        or node. A reader that sees a version also sees every insert it covers: SQLite's writers
+        are serialized, so its highest id will do; PostGIS keeps a commit counter.
+        """
+
+    @abstractmethod
+    def get_feature_collection(self, collapse: bool = False) -> Dict[str, Any]:
+        """All reports, newest first; with collapse, one (the newest) per incident."""
+
+    @timed("db_query_seconds", op="find_bbox")
+    def find_reports_in_bbox(self, bbox: BBox, limit: int = 500,
+                             max_age_hours: Optional[int] = None,
+                             collapse: bool = False) -> List[Dict[str, Any]]:
+        """Reports inside bbox (minLon, minLat, maxLon, maxLat), newest first."""
+        since = None
+        if max_age_hours is not None:
+            since = _hours_ago_iso(max_age_hours)
+        ids = self.report_ids(collapse, bbox, since, max(1, int(limit)))
+        return [_row_to_feature(r) for r in self._ordered_rows(ids)]
+
+    def iter_report_rows(self, batch_size: int = 5000) -> Iterator[Row]:
+        """All rows in id order via keyset pagination, so memory stays bounded by batch_size."""
+        last = 0
+        while True:
+            rows = self.page_reports(last, batch_size)
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1][0]
+
+    def _ordered_rows(self, ids: List[int]) -> List[Row]:
+        by_id: Dict[int, Row] = {}
+        for i in range(0, len(ids), 500):
+            by_id.update((r[0], r) for r in self.rows_by_ids(ids[i:i + 500]))
+        return [by_id[i] for i in ids if i in by_id]
+
+    def _encoded_feature(self, row: tuple) -> bytes:
+        rid = row[0]
+        b = self._feature_bytes.get(rid)
+        if b is None:
+            b = codec.dumps(_row_to_feature(row))
+            with self._feature_lock:
+                self._feature_bytes[rid] = b
+        return b
+
+    def _sync_cache(self) -> None:
+        """Drop cached encodings of reports deleted since the last check, here or elsewhere."""
+        _, generation = self.data_version()
+        if generation == self._cache_generation:
+            return
+        # a delete after the version read bumps the generation again, so the next call catches it
+        live = set(self.report_ids())
+        with self._feature_lock:
+            for cache in (self._feature_bytes, self._update_rows):
+                for k in [k for k in cache if k not in live]:
+                    del cache[k]
+            self._cache_generation = generation
+
+    def _forget(self, ids: Optional[Iterable[int]] = None) -> None:
+        """Drop cached encodings for ids (all of them when ids is None)."""
+        with self._feature_lock:
+            if ids is None:
+                self._feature_bytes.clear()
+                self._update_rows.clear()
+            else:
+                for i in ids:
+                    self._feature_bytes.pop(i, None)
+                    self._update_rows.pop(i, None)
+
+    @timed("db_query_seconds", op="feature_collection_bytes")
+    def get_feature_collection_bytes(self, collapse: bool = False,
+                                     bbox: Optional[BBox] = None) -> bytes:
+        """Same payload as get_feature_collection(collapse), built from cached per-report bytes."""
+        self._sync_cache()
+        ids = self.report_ids(collapse, bbox)
+        missing = [i for i in ids if i not in self._feature_bytes]
+        cache_result("report_feature_bytes", True, len(ids) - len(missing))
+        cache_result("report_feature_bytes", False, len(missing))
+        # only decode/encode rows we have not seen yet
+        for i in range(0, len(missing), 500):
+            for r in self.rows_by_ids(missing[i:i + 500]):
+                self._encoded_feature(r)
+        cached = self._feature_bytes
+        return codec.feature_collection(cached[i] for i in ids if i in cached)
+
+    @timed("db_query_seconds", op="report_updates")
+    def get_report_updates(self, to_row: Callable[[Dict[str, Any]], Any],
+                           collapse: bool = False) -> List[Any]:
+        """
+        to_row(feature) for every report, newest first (one per incident with collapse). Results are
+        cached per report like the feature bytes, so to_row must be the same function on every call.
+        """
+        self._sync_cache()
+        ids = self.report_ids(collapse)
+        cached = self._update_rows
+        missing = [i for i in ids if i not in cached]
+        cache_result("report_update_rows", True, len(ids) - len(missing))
+        cache_result("report_update_rows", False, len(missing))
+        for r in self.rows_by_ids(missing):
+            v = to_row(_row_to_feature(r))
+            with self._feature_lock:
+                cached[r[0]] = v
+        return [cached[i] for i in ids if i in cached]
+
+    # ---------- retention ----------
+
+    @abstractmethod
+    def archive_reports_before(self, cutoff_iso: str, archive_db: str,
+                               batch_size: int = 5000) -> List[int]:
+        """
+        Move up to batch_size reports with created_at < cutoff_iso into reports_archive, in one
+        transaction. Returns the moved ids; call repeatedly until it returns [].
+        """
+
+    @abstractmethod
+    def incremental_vacuum(self, pages: int = 1000, convert: bool = False) -> int:
+        """
+        Give freed space back after archiving; returns what is still reclaimable (0 if nothing).
+        convert allows a one-off, blocking rewrite of the store to make later calls cheap.
+        """
+
+    # ---------- rollups ----------
+
+    @abstractmethod
+    def record_feed_events(self, events: Iterable[Tuple[str, float, float, int, str, str]],
+                           keep_hours: int) -> int:
+        """
+        Count (key, lat, lon, hour, source, category) feed events whose key was not counted before,
+        and forget keys older than keep_hours. Returns how many were new.
+        """
+
+    @abstractmethod
+    def rollup_counts(self, hour_from: int, hour_to: int,
+                      cells: Optional[Tuple[int, int, int, int]] = None,
+                      source: Optional[str] = None, category: Optional[str] = None) -> List[tuple]:
+        """(hour, source, category, n) summed over cells = (y0, y1, x0, x1), hour_from..hour_to."""
+
+    @abstractmethod
+    def prune_rollups(self, before_hour: int) -> int:
+        """Delete rollup rows older than before_hour; returns how many."""
+
+    # ---------- incidents ----------
+
+    @abstractmethod
+    def find_incidents(self, bbox: Optional[BBox] = None, category: Optional[str] = None,
+                       since_iso: Optional[str] = None, limit: int = 500) -> List[tuple]:
+        """Incident rows (see _INCIDENT_COLS), most recently updated first."""
+
+    @abstractmethod
+    def get_incident(self, iid: int,
+                     limit: int = 50) -> Optional[tuple[tuple, List[Dict[str, Any]]]]:
+        """(incident row, its newest `limit` reports as Features), or None."""
+
+    def close(self) -> None:
+        pass
+
+def _hours_ago_iso(hours: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(hours=int(hours))).isoformat()
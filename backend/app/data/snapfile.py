@@ -0,0 +1,119 @@
+"""
+Immutable columnar snapshot files, shared between processes through mmap.
+
+    magic "PMSNAP02" | u32 rows | u32 reserved | f64 fetched_at | 12 x (u64 offset, u64 length)
+    lat f64[rows] | lon f64[rows] | ts f64[rows] (NaN = unknown)
+    time_off u64[rows+1] | time blob          (utf-8 sort keys)
+    key_off u64[rows+1] | key blob            (utf-8 upstream row identity)
+    item_off u64[rows+1] | item blob          (one encoded JSON value per row)
+    geom_off u64[rows+1] | geom blob          (WKB per row, empty = none)
+    payload                                   (one encoded JSON document)
+
+Writers build a temp file next to the target and os.replace() it, so a published file never
+changes: readers that still map the previous one keep a valid view until they drop it.
+Sections are 8-byte aligned and stored in native byte order (little-endian on every target we run).
+"""
+from __future__ import annotations
+import mmap, os, struct
+from array import array
+from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple
+
+MAGIC = b"PMSNAP02"
+_SECTIONS = ("lat", "lon", "ts", "time_off", "time", "key_off", "key",
+             "item_off", "item", "geom_off", "geom", "payload")
+_HEAD = struct.Struct("<8sIId" + "QQ" * len(_SECTIONS))
+
+def _offsets(parts: Sequence[bytes]) -> array:
+    off = array("Q", [0])
+    for p in parts:
+        off.append(off[-1] + len(p))
+    return off
+
+def write(path: Path, *, fetched_at: float, lats: Sequence[float], lons: Sequence[float],
+          ts: Sequence[float], times: Sequence[bytes], keys: Sequence[bytes],
+          items: Sequence[bytes], geoms: Sequence[bytes], payload: bytes) -> None:
+    """Write a snapshot to a temp file and atomically replace `path` with it."""
+    n = len(items)
+    if not (len(lats) == len(lons) == len(ts) == len(times) == len(keys) == len(geoms) == n):
+        raise ValueError("snapshot columns must all have one entry per row")
+    blobs = {
+        "lat": array("d", lats).tobytes(), "lon": array("d", lons).tobytes(),
+        "ts": array("d", ts).tobytes(),
+        "time_off": _offsets(times).tobytes(), "time": b"".join(times),
+        "key_off": _offsets(keys).tobytes(), "key": b"".join(keys),
+        "item_off": _offsets(items).tobytes(), "item": b"".join(items),
+        "geom_off": _offsets(geoms).tobytes(), "geom": b"".join(geoms),
+        "payload": payload,
+    }
+    table: List[int] = []
+    pos = _HEAD.size
+    for name in _SECTIONS:
+        pos += -pos % 8
+        table += [pos, len(blobs[name])]
+        pos += len(blobs[name])
+
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(_HEAD.pack(MAGIC, n, 0, fetched_at, *table))
+        for i, name in enumerate(_SECTIONS):
+            fh.write(b"\0" * (table[2 * i] - fh.tell()))
+            fh.write(blobs[name])
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+class Column(Sequence):
+    """Row i of a variable-length section as a zero-copy memoryview (or str when text=True)."""
+    def __init__(self, offsets: memoryview, blob: memoryview, text: bool = False) -> None:
+        self._off, self._blob, self._text = offsets, blob, text
+
+    def __len__(self) -> int:
+        return len(self._off) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        v = self._blob[self._off[i]:self._off[i + 1]]
+        return str(v, "utf-8") if self._text else v
+
+    def __iter__(self) -> Iterator:
+        for i in range(len(self)):
+            yield self[i]
+
+class SnapshotFile:
+    """Read-only mapping of one published file; `key` identifies the generation on disk."""
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as fh:
+            st = os.fstat(fh.fileno())
+            self.key: Tuple[int, int] = (st.st_ino, st.st_mtime_ns)
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        head = _HEAD.unpack_from(buf)
+        if head[0] != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        self.rows: int = head[1]
+        self.fetched_at: float = head[3]
+        sec = {name: buf[head[4 + 2 * i]:head[4 + 2 * i] + head[5 + 2 * i]]
+               for i, name in enumerate(_SECTIONS)}
+        self.lat = sec["lat"].cast("d")
+        self.lon = sec["lon"].cast("d")
+        self.ts = sec["ts"].cast("d")
+        self.times = Column(sec["time_off"].cast("Q"), sec["time"], text=True)
+        self.keys = Column(sec["key_off"].cast("Q"), sec["key"], text=True)
+        self.items = Column(sec["item_off"].cast("Q"), sec["item"])
+        self.geoms = Column(sec["geom_off"].cast("Q"), sec["geom"])
+        self.payload = sec["payload"]
+
+def peek_fetched_at(path: Path) -> float | None:
+    """fetched_at from the header without mapping the file (None if missing/unreadable)."""
+    try:
+        with open(path, "rb") as fh:
+            head = fh.read(_HEAD.size)
+    except OSError:
+        return None
+    if len(head) < _HEAD.size or head[:8] != MAGIC:
+        return None
+    return _HEAD.unpack(head)[3]
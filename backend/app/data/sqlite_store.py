@@ -0,0 +1,486 @@
+"""
+SQLite report store (REPORTS_BACKEND=sqlite, the default).
+
+One connection per process, shared by all threads; _write_lock serializes writers so a bulk
+batch is never committed by someone else. Radius queries prefilter on a lat/lon bbox index and
+finish with haversine; incidents are matched on an INCIDENT_CELL_DEG grid. Several workers on
+one host can share the file (incident matching takes BEGIN IMMEDIATE), but not several hosts:
+use the PostGIS store for that.
+"""
+from __future__ import annotations
+import sqlite3, threading
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..data.geo import haversine_km
+from . import codec
+from ..metrics import timed
+from .report_store import (
+    BBox, ReportStore, Row, _INCIDENT_COLS, _bbox_deg, _cell, _new_feature, _report_rollups,
+    _row_to_feature, rollup_key,
+)
+
+_ROW_COLS = "id, lat, lon, text, props_json, created_at"
+
+_INDEXES = {
+    # created_at is always stored as UTC isoformat, so string order == time order
+    "idx_reports_created_at":
+        "CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports(created_at)",
+    # lat/lon bbox prefilter for radius queries
+    "idx_reports_lat_lon": "CREATE INDEX IF NOT EXISTS idx_reports_lat_lon ON reports(lat, lon)",
+    # newest report per incident for the collapsed views
+    "idx_reports_incident":
+        "CREATE INDEX IF NOT EXISTS idx_reports_incident ON reports(incident_id, id)",
+}
+
+# every report that is not part of an incident, plus the newest report of each incident
+_COLLAPSED_IDS = ("SELECT id FROM reports WHERE incident_id IS NULL"
+                  " UNION ALL SELECT MAX(id) FROM reports WHERE incident_id IS NOT NULL"
+                  " GROUP BY incident_id")
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    # only takes effect on a new, empty file; existing files are converted by `cli vacuum-reports`
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS reports (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      lat REAL NOT NULL,
+      lon REAL NOT NULL,
+      text TEXT NOT NULL,
+      props_json TEXT,
+      created_at TEXT NOT NULL
+    )
+    """)
+    # reports of one real-world event (same category, close in space and time) share an incident
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS incidents (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      category TEXT NOT NULL,
+      title TEXT,
+      emoji TEXT,
+      lat REAL NOT NULL,
+      lon REAL NOT NULL,
+      cell_y INTEGER NOT NULL,
+      cell_x INTEGER NOT NULL,
+      first_at TEXT NOT NULL,
+      last_at TEXT NOT NULL,
+      report_count INTEGER NOT NULL,
+      last_report_id INTEGER
+    )
+    """)
+    if "incident_id" not in {r[1] for r in conn.execute("PRAGMA table_info(reports)")}:
+        conn.execute("ALTER TABLE reports ADD COLUMN incident_id INTEGER")
+    for ddl in _INDEXES.values():
+        conn.execute(ddl)
+    # grid lookup of open incidents: one range scan per (category, cell row)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_incidents_cell"
+                 " ON incidents(category, cell_y, cell_x, last_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_incidents_last_at ON incidents(last_at)")
+    # hourly activity counts per grid cell, source and category (see services/rollups.py)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS rollups (
+      hour INTEGER NOT NULL,
+      cell_y INTEGER NOT NULL,
+      cell_x INTEGER NOT NULL,
+      source TEXT NOT NULL,
+      category TEXT NOT NULL,
+      n INTEGER NOT NULL,
+      PRIMARY KEY (hour, cell_y, cell_x, source, category)
+    ) WITHOUT ROWID
+    """)
+    # feed events already counted, so a refresh (or another worker) never counts one twice
+    conn.execute("CREATE TABLE IF NOT EXISTS rollup_events"
+                 " (key TEXT PRIMARY KEY, hour INTEGER NOT NULL) WITHOUT ROWID")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_rollup_events_hour ON rollup_events(hour)")
+    # bumped with every delete, so other workers' feature caches notice rows went away
+    conn.execute("CREATE TABLE IF NOT EXISTS report_deletes"
+                 " (id INTEGER PRIMARY KEY CHECK (id = 1), generation INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO report_deletes (id, generation) VALUES (1, 0)")
+    conn.commit()
+
+class SqliteReportStore(ReportStore):
+    name = "sqlite"
+
+    def __init__(self, path: str | Path) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        _migrate(self.conn)
+        self._write_lock = threading.Lock()
+
+    # ---------- incidents (write lock and transaction held) ----------
+
+    def _match_incident(self, lat: float, lon: float, category: str, since_iso: str,
+                        radius_km: float) -> Optional[tuple]:
+        """Nearest open incident of `category` within radius_km: (id, lat, lon, report_count)."""
+        dlat, dlon = _bbox_deg(lat, radius_km)
+        rows = self.conn.execute(
+            "SELECT id, lat, lon, report_count FROM incidents"
+            " WHERE category = ? AND cell_y BETWEEN ? AND ? AND cell_x BETWEEN ? AND ?"
+            " AND last_at >= ?",
+            (category, _cell(lat - dlat), _cell(lat + dlat), _cell(lon - dlon), _cell(lon + dlon),
+             since_iso),
+        ).fetchall()
+        best = None
+        for r in rows:
+            d = haversine_km((lat, lon), (r[1], r[2]))
+            if d <= radius_km and (best is None or d < best[0]):
+                best = (d, r)
+        return best[1] if best else None
+
+    def _attach(self, lat: float, lon: float, created_at: str, props: dict,
+                category: str, radius_km: float, window_minutes: int) -> tuple[int, int]:
+        """Find or open the incident for a new report. Returns (id, report_count)."""
+        since = (datetime.fromisoformat(created_at) - timedelta(minutes=window_minutes)).isoformat()
+        hit = self._match_incident(lat, lon, category, since, radius_km)
+        if hit is None:
+            cur = self.conn.execute(
+                "INSERT INTO incidents (category, title, emoji, lat, lon, cell_y, cell_x, first_at,"
+                " last_at, report_count)"
+                " VALUES (?,?,?,?,?,?,?,?,?,1)",
+                (category, props.get("title"), props.get("emoji"), lat, lon, _cell(lat), _cell(lon),
+                 created_at, created_at),
+            )
+            return cur.lastrowid, 1
+        iid, ilat, ilon, n = hit
+        # running centroid, so a spreading event keeps collecting reports near its middle
+        clat, clon = (ilat * n + lat) / (n + 1), (ilon * n + lon) / (n + 1)
+        self.conn.execute(
+            "UPDATE incidents SET lat = ?, lon = ?, cell_y = ?, cell_x = ?, last_at = ?,"
+            " report_count = ? WHERE id = ?",
+            (clat, clon, _cell(clat), _cell(clon), created_at, n + 1, iid),
+        )
+        return iid, n + 1
+
+    def _bump(self, counts: Counter) -> None:
+        """Add counts to their rollup rows (write lock and transaction held)."""
+        self.conn.executemany(
+            "INSERT INTO rollups (hour, cell_y, cell_x, source, category, n) VALUES (?,?,?,?,?,?)"
+            " ON CONFLICT (hour, cell_y, cell_x, source, category)"
+            " DO UPDATE SET n = n + excluded.n",
+            [(*k, n) for k, n in counts.items()],
+        )
+
+    # ---------- reports ----------
+
+    @timed("db_query_seconds", op="add_report")
+    def add_report(self, lat: float, lon: float, text: str = "User report",
+                   props: dict | None = None,
+                   incident: Optional[tuple[str, float, int]] = None) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        created_at = now.isoformat()
+        props = dict(props or {})
+        bucket = rollup_key(float(lat), float(lon), int(now.timestamp()) // 3600, "report",
+                            props.get("category") or "other.unknown")
+        conn = self.conn
+        with self._write_lock:
+            iid = None
+            try:
+                if incident is not None:
+                    if not conn.in_transaction:
+                        # other workers can't open a duplicate incident meanwhile
+                        conn.execute("BEGIN IMMEDIATE")
+                    iid, count = self._attach(float(lat), float(lon), created_at, props, *incident)
+                    props["incident_id"] = str(iid)
+                    props["incident_reports"] = count
+                cur = conn.execute(
+                    "INSERT INTO reports (lat, lon, text, props_json, created_at, incident_id)"
+                    " VALUES (?,?,?,?,?,?)",
+                    (float(lat), float(lon), text, codec.dumps(props).decode(), created_at, iid)
+                )
+                if iid is not None:
+                    conn.execute("UPDATE incidents SET last_report_id = ? WHERE id = ?",
+                                 (cur.lastrowid, iid))
+                self._bump(Counter({bucket: 1}))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return _new_feature(cur.lastrowid, lat, lon, text, created_at, props)
+
+    @timed("db_query_seconds", op="feature_collection")
+    def get_feature_collection(self, collapse: bool = False) -> Dict[str, Any]:
+        sql = f"SELECT {_ROW_COLS} FROM reports"
+        if collapse:
+            sql += f" WHERE id IN ({_COLLAPSED_IDS})"
+        cur = self.conn.execute(sql + " ORDER BY id DESC")
+        feats = [_row_to_feature(r) for r in cur.fetchall()]
+        return {"type": "FeatureCollection", "features": feats}
+
+    def report_ids(self, collapse: bool = False, bbox: Optional[BBox] = None,
+                   since_iso: Optional[str] = None,
+                   limit: Optional[int] = None) -> List[int]:
+        if collapse and bbox is None and since_iso is None:
+            sql, params = f"SELECT id FROM ({_COLLAPSED_IDS})", []
+        else:
+            sql, params = "SELECT id FROM reports WHERE 1 = 1", []
+            if bbox is not None:
+                minx, miny, maxx, maxy = bbox
+                sql += " AND lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?"
+                params += [miny, maxy, minx, maxx]
+            if since_iso is not None:
+                sql += " AND created_at >= ?"
+                params.append(since_iso)
+            if collapse:
+                sql += f" AND id IN ({_COLLAPSED_IDS})"
+        sql += " ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [r[0] for r in self.conn.execute(sql, params)]
+
+    def rows_by_ids(self, ids: List[int]) -> List[Row]:
+        out: List[Row] = []
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            q = ",".join("?" * len(chunk))
+            out += self.conn.execute(
+                f"SELECT {_ROW_COLS} FROM reports WHERE id IN ({q})", chunk
+            ).fetchall()
+        return out
+
+    def page_reports(self, after_id: int = 0, limit: int = 5000) -> List[Row]:
+        return self.conn.execute(
+            f"SELECT {_ROW_COLS} FROM reports WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit),
+        ).fetchall()
+
+    @timed("db_query_seconds", op="find_near")
+    def find_reports_near(self, lat: float, lon: float, radius_km: float = 10.0, limit: int = 20,
+                          max_age_hours: Optional[int] = None,
+                          collapse: bool = False) -> List[Dict[str, Any]]:
+        dlat, dlon = _bbox_deg(lat, radius_km)
+        params: list[Any] = [lat - dlat, lat + dlat, lon - dlon, lon + dlon]
+        sql = ("SELECT id, lat, lon, text, props_json, created_at, incident_id FROM reports"
+               " WHERE lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?")
+        if max_age_hours is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(hours=int(max_age_hours))
+            sql += " AND created_at >= ?"
+            params.append(cutoff.isoformat())
+        sql += " ORDER BY id DESC LIMIT 2000"
+        cur = self.conn.execute(sql, params)
+
+        center = (lat, lon)
+        cand = []
+        seen: set[int] = set()
+        for *r, iid in cur.fetchall():
+            _, lat2, lon2, *_ = r
+            d = haversine_km(center, (lat2, lon2))
+            if d > radius_km:
+                continue
+            if collapse and iid is not None:
+                if iid in seen:
+                    # rows come newest first, so the first one in range represents the incident
+                    continue
+                seen.add(iid)
+            cand.append((d, tuple(r)))
+        cand.sort(key=lambda x: x[0])
+        return [_row_to_feature(r) for _, r in cand[:max(1, limit)]]
+
+    @timed("db_query_seconds", op="bulk_insert")
+    def bulk_insert(self, rows: Iterable[tuple], batch_size: int = 5000,
+                    rebuild_indexes: bool = True) -> int:
+        sql = "INSERT INTO reports (lat, lon, text, props_json, created_at) VALUES (?,?,?,?,?)"
+        conn = self.conn
+        n = 0
+        if rebuild_indexes:
+            with self._write_lock:
+                for name in _INDEXES:
+                    conn.execute(f"DROP INDEX IF EXISTS {name}")
+                conn.commit()
+        try:
+            batch: List[tuple] = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    self._insert_batch(sql, batch)
+                    n += len(batch)
+                    batch = []
+            if batch:
+                self._insert_batch(sql, batch)
+                n += len(batch)
+        finally:
+            if rebuild_indexes:
+                with self._write_lock:
+                    for ddl in _INDEXES.values():
+                        conn.execute(ddl)
+                    conn.commit()
+        return n
+
+    def _insert_batch(self, sql: str, batch: List[tuple]) -> None:
+        with self._write_lock:
+            try:
+                self.conn.executemany(sql, batch)
+                self._bump(_report_rollups(batch))
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    @timed("db_query_seconds", op="clear")
+    def clear_reports(self) -> dict[str, Any]:
+        with self._write_lock:
+            self.conn.execute("DELETE FROM reports")
+            self.conn.execute("DELETE FROM incidents")
+            self.conn.execute("DELETE FROM rollups WHERE source = 'report'")
+            self.conn.execute("UPDATE report_deletes SET generation = generation + 1")
+            self.conn.commit()
+        self._forget()
+        return {"ok": True, "message": "All reports cleared."}
+
+    def data_version(self) -> Tuple[int, int]:
+        return self.conn.execute(
+            "SELECT (SELECT COALESCE(MAX(id), 0) FROM reports),"
+            " (SELECT generation FROM report_deletes)"
+        ).fetchone()
+
+    # ---------- retention ----------
+
+    @timed("db_query_seconds", op="archive")
+    def archive_reports_before(self, cutoff_iso: str, archive_db: str,
+                               batch_size: int = 5000) -> List[int]:
+        """archive_db is a SQLite file, attached to the reports connection on first use."""
+        conn = self.conn
+        with self._write_lock:
+            attached = {r[1] for r in conn.execute("PRAGMA database_list")}
+            if "archive" not in attached:
+                conn.execute("ATTACH DATABASE ? AS archive", (archive_db,))
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS archive.reports_archive (
+                  id INTEGER PRIMARY KEY,
+                  lat REAL NOT NULL,
+                  lon REAL NOT NULL,
+                  text TEXT NOT NULL,
+                  props_json TEXT,
+                  created_at TEXT NOT NULL,
+                  archived_at TEXT NOT NULL
+                )""")
+                conn.commit()
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM reports WHERE created_at < ? ORDER BY created_at LIMIT ?",
+                (cutoff_iso, batch_size),
+            )]
+            if not ids:
+                # every report of an incident last updated before the cutoff is archived by now
+                conn.execute("DELETE FROM incidents WHERE last_at < ?", (cutoff_iso,))
+                conn.commit()
+                return []
+            q = ",".join("?" * len(ids))
+            now = datetime.now(timezone.utc).isoformat()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO archive.reports_archive"
+                    " (id, lat, lon, text, props_json, created_at, archived_at)"
+                    f" SELECT {_ROW_COLS}, ? FROM reports WHERE id IN ({q})",
+                    [now, *ids],
+                )
+                conn.execute(f"DELETE FROM reports WHERE id IN ({q})", ids)
+                conn.execute("UPDATE report_deletes SET generation = generation + 1")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self._forget(ids)
+        return ids
+
+    def incremental_vacuum(self, pages: int = 1000, convert: bool = False) -> int:
+        """
+        Return up to `pages` free pages to the OS; returns the remaining freelist size. Files
+        created before auto_vacuum=INCREMENTAL are left alone unless convert is set, which rewrites
+        the whole file with VACUUM while holding the write lock (the CLI's vacuum-reports, not the
+        retention loop).
+        """
+        conn = self.conn
+        with self._write_lock:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                if not convert:
+                    return conn.execute("PRAGMA freelist_count").fetchone()[0]
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    # ---------- rollups ----------
+
+    @timed("db_query_seconds", op="rollup_feed")
+    def record_feed_events(self, events: Iterable[Tuple[str, float, float, int, str, str]],
+                           keep_hours: int) -> int:
+        counts: Counter = Counter()
+        conn = self.conn
+        with self._write_lock:
+            try:
+                for key, lat, lon, hour, source, category in events:
+                    if conn.execute("INSERT OR IGNORE INTO rollup_events (key, hour) VALUES (?,?)",
+                                    (key, hour)).rowcount:
+                        counts[rollup_key(lat, lon, hour, source, category)] += 1
+                self._bump(counts)
+                now_hour = int(datetime.now(timezone.utc).timestamp()) // 3600
+                conn.execute("DELETE FROM rollup_events WHERE hour < ?", (now_hour - keep_hours,))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return sum(counts.values())
+
+    @timed("db_query_seconds", op="rollup_query")
+    def rollup_counts(self, hour_from: int, hour_to: int,
+                      cells: Optional[Tuple[int, int, int, int]] = None,
+                      source: Optional[str] = None, category: Optional[str] = None) -> List[tuple]:
+        sql = "SELECT hour, source, category, SUM(n) FROM rollups WHERE hour BETWEEN ? AND ?"
+        params: list[Any] = [hour_from, hour_to]
+        if cells is not None:
+            sql += " AND cell_y BETWEEN ? AND ? AND cell_x BETWEEN ? AND ?"
+            params += list(cells)
+        if source:
+            sql += " AND source = ?"
+            params.append(source)
+        if category:
+            sql += " AND category = ?"
+            params.append(category)
+        return self.conn.execute(sql + " GROUP BY hour, source, category", params).fetchall()
+
+    def prune_rollups(self, before_hour: int) -> int:
+        with self._write_lock:
+            n = self.conn.execute("DELETE FROM rollups WHERE hour < ?", (before_hour,)).rowcount
+            self.conn.commit()
+        return n
+
+    # ---------- incidents ----------
+
+    @timed("db_query_seconds", op="incidents")
+    def find_incidents(self, bbox: Optional[BBox] = None, category: Optional[str] = None,
+                       since_iso: Optional[str] = None, limit: int = 500) -> List[tuple]:
+        sql = f"SELECT {_INCIDENT_COLS} FROM incidents WHERE 1 = 1"
+        params: list[Any] = []
+        if bbox is not None:
+            minx, miny, maxx, maxy = bbox
+            sql += " AND lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?"
+            params += [miny, maxy, minx, maxx]
+        if category:
+            sql += " AND category = ?"
+            params.append(category)
+        if since_iso:
+            sql += " AND last_at >= ?"
+            params.append(since_iso)
+        sql += " ORDER BY last_at DESC LIMIT ?"
+        params.append(int(limit))
+        return self.conn.execute(sql, params).fetchall()
+
+    @timed("db_query_seconds", op="incident")
+    def get_incident(self, iid: int,
+                     limit: int = 50) -> Optional[tuple[tuple, List[Dict[str, Any]]]]:
+        row = self.conn.execute(f"SELECT {_INCIDENT_COLS} FROM incidents WHERE id = ?",
+                                (iid,)).fetchone()
+        if row is None:
+            return None
+        reports = self.conn.execute(
+            f"SELECT {_ROW_COLS} FROM reports WHERE incident_id = ? ORDER BY id DESC LIMIT ?",
+            (iid, int(limit)),
+        ).fetchall()
+        return row, [_row_to_feature(r) for r in reports]
+
+    def close(self) -> None:
+        self.conn.close()
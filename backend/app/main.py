@@ -1,12 +1,87 @@
-from fastapi import FastAPI
+import asyncio, importlib, logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
 from .config.settings import settings
+from . import admission, metrics, profiling
+from .routers.responses import ImmutableStaticFiles
 
-app = FastAPI(title="PulseMap Agent – API", version="0.2.0")
+log = logging.getLogger(__name__)
 
+# Routers served per API_ROLE. Heavy stacks load on first use: only chat pulls in
+# langchain/langgraph/openai and only geo pulls in geopandas, so "feeds" and "tiles" workers
+# stay small.
+ROLE_ROUTERS = {
+    "all": ("chat", "reports", "incidents", "feeds", "watch", "uploads", "geo", "reactions",
+            "config", "admin"),
+    "feeds": ("reports", "incidents", "feeds", "watch", "uploads", "reactions", "config", "admin"),
+    "tiles": ("geo", "config", "admin"),
+}
+if settings.API_ROLE not in ROLE_ROUTERS:
+    raise ValueError(f"API_ROLE must be one of {sorted(ROLE_ROUTERS)}, got {settings.API_ROLE!r}")
+ROUTERS = ROLE_ROUTERS[settings.API_ROLE]
+
+def _warm_agent() -> None:
+    from .agents.graph import get_app
+    from .agents.classifier import get_chain
+    get_app()
+    get_chain()
+
+def _warm_tracts() -> None:
+    from .services.tracts import warm
+    warm()
+
+async def _warm_up() -> None:
+    """Build the agent graph / tract index in a thread after startup instead of at import."""
+    jobs = [("agent", _warm_agent)] if "chat" in ROUTERS else []
+    jobs += [("tracts", _warm_tracts)] if "geo" in ROUTERS else []
+    for name, fn in jobs:
+        try:
+            with metrics.timed("warmup_seconds", subsystem=name):
+                await asyncio.to_thread(fn)
+        except Exception as e:
+            # first request retries the load and surfaces the error there
+            log.warning("warm-up of %s failed: %s", name, e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks: list[asyncio.Task] = [asyncio.create_task(metrics.loop_lag_monitor())]
+    if settings.RETENTION_HOURS > 0 and "reports" in ROUTERS:
+        from .services.retention import retention_loop
+        tasks.append(asyncio.create_task(retention_loop()))
+    if settings.FEED_SHARED and "feeds" in ROUTERS:
+        from .services.feedshare import ingest_loop
+        tasks.append(asyncio.create_task(ingest_loop()))
+    if settings.WARM_SUBSYSTEMS:
+        tasks.append(asyncio.create_task(_warm_up()))
+    yield
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if "uploads" in ROUTERS:
+        from .services.uploads import shutdown_pool
+        shutdown_pool()
+    admission.shutdown()
+
+app = FastAPI(title="PulseMap Agent – API", version="0.2.0",
+              default_response_class=ORJSONResponse, lifespan=lifespan)
+
+@app.exception_handler(admission.Overloaded)
+async def _overloaded(request: Request, exc: admission.Overloaded):
+    return ORJSONResponse({"detail": str(exc)}, status_code=503,
+                          headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(admission.RateLimited)
+async def _rate_limited(request: Request, exc: admission.RateLimited):
+    return ORJSONResponse({"detail": str(exc)}, status_code=429,
+                          headers={"Retry-After": str(exc.retry_after)})
+
+app.add_middleware(profiling.ProfilingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -17,22 +92,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
-# Static uploads
-app.mount("/uploads", StaticFiles(directory=str(settings.UPLOADS_DIR)), name="uploads")
+# Static uploads (content-addressed names, safe to cache forever)
+if "uploads" in ROUTERS:
+    app.mount("/uploads", ImmutableStaticFiles(directory=str(settings.UPLOADS_DIR)), name="uploads")
 
 # Routers
-from .routers import chat, reports, feeds, uploads, geo, reactions, config  # noqa
-from .routers.feeds import updates as updates_router
-app.include_router(chat.router)
-app.include_router(reports.router)
-app.include_router(feeds.router)
-app.include_router(updates_router)  
-app.include_router(uploads.router)
-app.include_router(geo.router)
-app.include_router(reactions.router)
-app.include_router(config.router)
+for _name in ROUTERS:
+    _mod = importlib.import_module(f".routers.{_name}", __package__)
+    app.include_router(_mod.router)
+    if _name == "feeds":
+        app.include_router(_mod.updates)
+
+# registered before the SPA mount so "/" does not shadow it
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 if settings.FRONTEND_DIST.exists():
     app.mount("/", StaticFiles(directory=str(settings.FRONTEND_DIST), html=True), name="spa")
@@ -0,0 +1,255 @@
+"""
+In-process metrics with Prometheus text exposition (served at GET /metrics).
+
+    from ..metrics import timed, inc, observe
+
+    @timed("upstream_fetch_seconds", feed="usgs")      # sync or async functions
+    async def fetch(): ...
+
+    with timed("db_query_seconds", op="near"):
+        ...
+
+Each uvicorn worker keeps its own registry; scrape every worker (or run one) for totals.
+"""
+from __future__ import annotations
+import asyncio, functools, inspect, threading, time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+_LOCK = threading.Lock()
+
+# Per-request span list set by profiling.ProfilingMiddleware; timed() appends
+# (name, labels, start, seconds).
+SPANS: ContextVar[Optional[List[Tuple[str, Dict[str, Any], float, float]]]] = ContextVar(
+    "metrics_spans", default=None)
+
+def _key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _fmt_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str) -> None:
+        self.name, self.doc = name, doc
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        k = _key(labels)
+        with _LOCK:
+            self.values[k] = self.values.get(k, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        return [f"{self.name}{_fmt_labels(k)} {v}" for k, v in sorted(self.values.items())]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        with _LOCK:
+            self.values[_key(labels)] = float(value)
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name, self.doc, self.buckets = name, doc, tuple(buckets)
+        # label key -> [per-bucket counts..., +Inf count], sum
+        self.values: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        k = _key(labels)
+        i = bisect_left(self.buckets, value)
+        with _LOCK:
+            counts, total = self.values.setdefault(k, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[i] += 1
+            total[0] += value
+
+    def expose(self) -> List[str]:
+        out: List[str] = []
+        for k, (counts, total) in sorted(self.values.items()):
+            acc = 0
+            for le, c in zip(self.buckets, counts):
+                acc += c
+                out.append(f"{self.name}_bucket{_fmt_labels(k, [('le', repr(float(le)))])} {acc}")
+            acc += counts[-1]
+            out.append(f"{self.name}_bucket{_fmt_labels(k, [('le', '+Inf')])} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(k)} {total[0]}")
+            out.append(f"{self.name}_count{_fmt_labels(k)} {acc}")
+        return out
+
+_REGISTRY: Dict[str, Any] = {}
+
+def _get(cls, name: str, doc: str, **kw):
+    m = _REGISTRY.get(name)
+    if m is None:
+        with _LOCK:
+            m = _REGISTRY.setdefault(name, cls(name, doc, **kw))
+    return m
+
+def counter(name: str, doc: str = "") -> Counter:
+    return _get(Counter, name, doc)
+
+def gauge(name: str, doc: str = "") -> Gauge:
+    return _get(Gauge, name, doc)
+
+def histogram(name: str, doc: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return _get(Histogram, name, doc, buckets=buckets)
+
+def inc(name: str, amount: float = 1.0, **labels: Any) -> None:
+    counter(name).inc(amount, **labels)
+
+def observe(name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+            **labels: Any) -> None:
+    histogram(name, buckets=buckets).observe(value, **labels)
+
+def cache_result(cache: str, hit: bool, n: int = 1) -> None:
+    """cache_requests_total{cache, result="hit"|"miss"}; hit ratio = hit / (hit + miss)."""
+    if n:
+        inc("cache_requests_total", n, cache=cache, result="hit" if hit else "miss")
+
+class timed:
+    """
+    Context manager / decorator recording elapsed seconds into histogram `name`.
+    Exceptions are counted in `<name minus _seconds>_errors_total` with the same labels.
+    """
+    def __init__(self, name: str, **labels: Any) -> None:
+        self.name, self.labels = name, labels
+        self._t0 = 0.0
+
+    def _record(self, elapsed: float, failed: bool) -> None:
+        observe(self.name, elapsed, **self.labels)
+        spans = SPANS.get()
+        if spans is not None:
+            spans.append((self.name, self.labels, time.perf_counter() - elapsed, elapsed))
+        if failed:
+            inc(self.name.removesuffix("_seconds") + "_errors_total", **self.labels)
+
+    def __enter__(self) -> "timed":
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._record(time.perf_counter() - self._t0, exc_type is not None)
+
+    def __call__(self, fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrap(*a, **kw):
+                t0 = time.perf_counter()
+                try:
+                    res = await fn(*a, **kw)
+                except BaseException:
+                    self._record(time.perf_counter() - t0, True)
+                    raise
+                self._record(time.perf_counter() - t0, False)
+                return res
+            return awrap
+
+        @functools.wraps(fn)
+        def wrap(*a, **kw):
+            t0 = time.perf_counter()
+            try:
+                res = fn(*a, **kw)
+            except BaseException:
+                self._record(time.perf_counter() - t0, True)
+                raise
+            self._record(time.perf_counter() - t0, False)
+            return res
+        return wrap
+
+def render() -> str:
+    lines: List[str] = []
+    for name in sorted(_REGISTRY):
+        m = _REGISTRY[name]
+        if m.doc:
+            lines.append(f"# HELP {name} {m.doc}")
+        lines.append(f"# TYPE {name} {m.kind}")
+        lines.extend(m.expose())
+    return "\n".join(lines) + "\n"
+
+async def loop_lag_monitor(interval: float = 0.5) -> None:
+    """Sample how late the event loop wakes up from a sleep; that delay is time no request ran."""
+    h = histogram("event_loop_lag_seconds", "Event-loop wakeup delay",
+                  buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+    g = gauge("event_loop_lag_last_seconds", "Most recent event-loop wakeup delay")
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - t0 - interval)
+        h.observe(lag)
+        g.set(lag)
+
+# help text for metrics created implicitly via timed()/observe()/inc()
+for _n, _d in [
+    ("http_request_duration_seconds", "Request latency by route template"),
+    ("upstream_fetch_seconds", "Upstream feed fetch time"),
+    ("upstream_parse_seconds", "Feed normalize+encode time per snapshot"),
+    ("db_query_seconds", "SQLite query time by operation"),
+    ("llm_call_seconds", "LLM call latency"),
+    ("tracts_query_seconds", "Census tract bbox query time"),
+    ("updates_stage_seconds", "/updates/local and /updates/global time per stage"),
+    ("chat_seconds", "Chat turn time by route (fastpath = answered without the agent graph)"),
+    ("admission_queue_wait_seconds",
+     "Time a request waited for a worker of its route class (llm, db, gis)"),
+    ("compress_seconds",
+     "Response body compression time by content coding (once per distinct body)"),
+]:
+    histogram(_n, _d)
+histogram("http_response_size_bytes", "Response body size by route template", buckets=SIZE_BUCKETS)
+counter("llm_tokens_total", "LLM tokens by model and direction")
+counter("cache_requests_total", "Cache lookups by cache and result")
+counter("chat_route_total", "Chat turns by route; fastpath / total is the pre-router hit rate")
+counter("singleflight_calls_total",
+        "Coalesced calls: role=leader ran it, role=follower waited for it")
+counter("admission_rejected_total",
+        "Requests shed with 503 because their route class was at workers + queue")
+counter("rate_limited_total",
+        "Requests over a per-session or per-address limit by kind (chat, report)")
+gauge("admission_in_flight", "Running + queued requests per route class")
+counter("precompressed_requests_total",
+        "Cached-body responses by result (hit, miss, not_modified, identity) and coding")
+
+class MetricsMiddleware:
+    """ASGI middleware: latency and body size per route template (not raw path: bounded labels)."""
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        state = {"status": 500, "size": 0}
+
+        async def _send(message) -> None:
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None)
+            if path is None:
+                path = "/uploads/*" if scope["path"].startswith("/uploads/") else "<unmatched>"
+            labels = {"route": path, "method": scope["method"], "status": state["status"]}
+            observe("http_request_duration_seconds", time.perf_counter() - t0, **labels)
+            observe("http_response_size_bytes", state["size"], buckets=SIZE_BUCKETS, route=path)
@@ -0,0 +1,180 @@
+"""
+Precompressed, content-addressed response bodies.
+
+/feeds/*, /updates/global, /reports and /geo/tracts send large JSON bodies that only change when
+their data does, to clients that poll them. Each distinct body is hashed once (blake2b; the hash
+is its strong ETag) and compressed at most once per content coding; later requests are served
+the cached bytes, or a 304 when If-None-Match already names that body.
+
+When the caller knows a version for the body (a feed snapshot's fetch time, the reports' data
+version, the loaded tract data plus bbox), version -> hash is remembered too, so a repeat request
+neither rebuilds nor rehashes the body. gzip is always available; br and zstd when the brotli /
+zstandard packages are installed.
+
+    res = BODIES.resolve(("feed", name, snap.fetched_at), build, if_none_match, accept_encoding)
+"""
+from __future__ import annotations
+import gzip, hashlib, re, threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from . import metrics
+from .config.settings import settings
+from .singleflight import SingleFlight
+
+def _codecs() -> Dict[str, Callable[[bytes], bytes]]:
+    # levels favour ratio: each body is compressed once per data change, not once per request
+    out: Dict[str, Callable[[bytes], bytes]] = {
+        "gzip": lambda b: gzip.compress(b, compresslevel=6, mtime=0)}
+    try:
+        import brotli
+        out["br"] = lambda b: brotli.compress(b, quality=6)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        out["zstd"] = lambda b: zstandard.ZstdCompressor(level=9).compress(b)
+    except ImportError:
+        pass
+    return out
+
+CODECS = _codecs()
+# server preference among codings the client accepts with equal q
+PREFERENCE = ("br", "zstd", "gzip")
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Best available content coding for an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    q: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        m = re.search(r"q\s*=\s*([0-9.]+)", params)
+        try:
+            q[name.strip()] = float(m.group(1)) if m else 1.0
+        except ValueError:
+            continue
+    best, best_q = None, 0.0
+    for enc in PREFERENCE:
+        v = q.get(enc, q.get("*", 0.0))
+        if enc in CODECS and v > best_q:
+            best, best_q = enc, v
+    return best
+
+def _etag(digest: str, encoding: Optional[str]) -> str:
+    # a strong ETag names exact bytes, so each coding of a body gets its own
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+def _matches(if_none_match: Optional[str], digest: str) -> bool:
+    """If-None-Match uses weak comparison: any coding of the same body counts as a match."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        tag = tag.removeprefix("W/").strip('"')
+        if tag == digest or tag.rsplit("-", 1)[0] == digest:
+            return True
+    return False
+
+class Resolved(NamedTuple):
+    status: int                  # 200 or 304
+    etag: str
+    encoding: Optional[str]      # Content-Encoding, None for identity
+    body: bytes                  # b"" for 304
+
+class BodyCache:
+    """LRU of hash -> {coding: bytes} within max_bytes, plus version -> hash for versioned ones."""
+    def __init__(self, max_bytes: int, max_versions: int = 4096) -> None:
+        self.max_bytes, self.max_versions = max_bytes, max_versions
+        self._lock = threading.Lock()
+        self._bodies: "OrderedDict[str, Dict[str, bytes]]" = OrderedDict()
+        # version -> (hash, identity length); the length picks the coding without the body
+        self._versions: "OrderedDict[Hashable, Tuple[str, int]]" = OrderedDict()
+        self._size = 0
+        self._compress = SingleFlight("compress")
+
+    def _digest_for(self, version: Hashable) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            known = self._versions.get(version)
+            if known is not None:
+                self._versions.move_to_end(version)
+            return known
+
+    def _store(self, digest: str, coding: str, data: bytes) -> None:
+        with self._lock:
+            entry = self._bodies.setdefault(digest, {})
+            if coding not in entry:
+                entry[coding] = data
+                self._size += len(data)
+            self._bodies.move_to_end(digest)
+            while self._size > self.max_bytes and len(self._bodies) > 1:
+                _, old = self._bodies.popitem(last=False)
+                self._size -= sum(len(b) for b in old.values())
+
+    def _get(self, digest: str, coding: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._bodies.get(digest)
+            if entry is None or coding not in entry:
+                return None
+            self._bodies.move_to_end(digest)
+            return entry[coding]
+
+    def add(self, body: bytes, version: Optional[Hashable] = None) -> str:
+        """Hash body, keep it as the identity coding, remember version -> hash; returns the hash."""
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._store(digest, "identity", body)
+        if version is not None:
+            with self._lock:
+                self._versions[version] = (digest, len(body))
+                self._versions.move_to_end(version)
+                while len(self._versions) > self.max_versions:
+                    self._versions.popitem(last=False)
+        return digest
+
+    def resolve(self, version: Optional[Hashable], build: Callable[[], bytes],
+                if_none_match: Optional[str], accept_encoding: Optional[str]) -> Resolved:
+        """
+        The response for a body: 304 when If-None-Match names it, else its bytes in the best
+        coding the client accepts. build() runs only when the version is unknown (or evicted).
+        Blocking (hashing, compression); call it from a worker thread in async routes.
+        """
+        known = self._digest_for(version) if version is not None else None
+        body = None
+        if known is None:
+            body = build()
+            known = (self.add(body, version), len(body))
+        digest, size = known
+        # small bodies go out as identity, so their 304 must carry the identity ETag too
+        enc = negotiate(accept_encoding) if size >= settings.COMPRESS_MIN_BYTES else None
+        if _matches(if_none_match, digest):
+            metrics.inc("precompressed_requests_total", result="not_modified",
+                        encoding=enc or "identity")
+            return Resolved(304, _etag(digest, enc), enc, b"")
+
+        identity = self._get(digest, "identity")
+        if identity is None:
+            identity = body if body is not None else build()
+            digest = self.add(identity, version)
+        if enc is None:
+            metrics.inc("precompressed_requests_total", result="identity", encoding="identity")
+            return Resolved(200, _etag(digest, None), None, identity)
+
+        data = self._get(digest, enc)
+        metrics.inc("precompressed_requests_total", result="hit" if data is not None else "miss",
+                    encoding=enc)
+        if data is None:
+            # concurrent misses for the same body share one compression
+            data = self._compress.do((digest, enc), self._encode, digest, enc, identity)
+        return Resolved(200, _etag(digest, enc), enc, data)
+
+    def _encode(self, digest: str, enc: str, identity: bytes) -> bytes:
+        data = self._get(digest, enc)
+        if data is None:
+            with metrics.timed("compress_seconds", encoding=enc):
+                data = CODECS[enc](identity)
+            self._store(digest, enc, data)
+        return data
+
+BODIES = BodyCache(settings.RESPONSE_CACHE_MB * 1024 * 1024)
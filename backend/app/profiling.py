@@ -0,0 +1,211 @@
+"""
+Request profiling: slow-request capture and on-demand sampling profiles.
+
+- Every request collects a span list (anything wrapped in metrics.timed: upstream fetch/parse,
+  SQLite, LLM, tracts, updates stages) for a timing breakdown.
+- While requests are in flight a background thread samples Python stacks every PROFILE_SAMPLE_MS.
+- A request slower than PROFILE_SLOW_MS, or one sent with ?profile=1 / X-Profile: 1, is kept in a
+  ring of PROFILE_RING_SIZE entries with its spans and the stacks sampled during it; on-demand
+  requests get an X-Profile-Id header and sample at 1 ms. Browse them at /admin/profiles.
+- Profiles hold query strings (locations, session ids), so /admin/* and on-demand profiling need
+  X-Admin-Token. While ADMIN_TOKEN is unset, profiling is off entirely: no spans, no sampler.
+
+Samples are process-wide (event loop + threadpool), so under concurrency a profile also shows
+other requests' work; spans are always per-request.
+"""
+from __future__ import annotations
+import hmac, itertools, os, sys, threading, time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from .config.settings import settings
+from . import metrics
+
+# leaf frames that mean "parked, not working" (event loop select, idle pool workers, lock waits)
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py")
+_IDLE_FUNCS = {("thread.py", "_worker")}  # concurrent.futures worker blocked on its C queue
+_MAX_DEPTH = 64
+
+@lru_cache(maxsize=4096)
+def _short(path: str) -> str:
+    i = path.rfind("site-packages" + os.sep)
+    if i >= 0:
+        return path[i + len("site-packages" + os.sep):]
+    i = path.rfind(os.sep + "backend" + os.sep)
+    if i >= 0:
+        return path[i + 1:]
+    return os.path.basename(path)
+
+def _fold(frame) -> Optional[str]:
+    """root;...;leaf as `file:function` entries, or None if the thread is idle."""
+    code = frame.f_code
+    if (code.co_filename.endswith(_IDLE_FILES)
+            or (os.path.basename(code.co_filename), code.co_name) in _IDLE_FUNCS):
+        return None
+    parts: List[str] = []
+    while frame is not None and len(parts) < _MAX_DEPTH:
+        parts.append(f"{_short(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+class StackSampler:
+    """Samples all threads' stacks while at least one request is active; idle otherwise."""
+
+    def __init__(self, interval_s: float, fast_interval_s: float = 0.001,
+                 keep: int = 50_000) -> None:
+        self.interval_s, self.fast_interval_s = interval_s, fast_interval_s
+        self.samples: Deque[Tuple[float, str]] = deque(maxlen=keep)  # (perf_counter, folded stack)
+        self._active = 0
+        self._fast = 0
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def enter(self, fast: bool = False) -> None:
+        with self._cv:
+            self._active += 1
+            self._fast += fast
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+            self._cv.notify()
+
+    def exit(self, fast: bool = False) -> None:
+        with self._cv:
+            self._active -= 1
+            self._fast -= fast
+
+    def window(self, t0: float, t1: float) -> List[str]:
+        return [s for t, s in list(self.samples) if t0 <= t <= t1]
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._cv:
+                while self._active <= 0:
+                    self._cv.wait()
+                interval = self.fast_interval_s if self._fast > 0 else self.interval_s
+            now = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                folded = _fold(frame)
+                if folded:
+                    self.samples.append((now, f"{names.get(tid, tid)};{folded}"))
+            time.sleep(interval)
+
+_SAMPLER = StackSampler(settings.PROFILE_SAMPLE_MS / 1000)
+_RING: Deque[Dict[str, Any]] = deque(maxlen=settings.PROFILE_RING_SIZE)
+_IDS = itertools.count(1)
+
+def token_ok(token: Optional[str]) -> bool:
+    """Admin token check; fails closed, so with no ADMIN_TOKEN configured nothing passes."""
+    if not settings.ADMIN_TOKEN or token is None:
+        return False
+    return hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+
+def authorized(headers: Dict[str, str]) -> bool:
+    return token_ok(headers.get("x-admin-token"))
+
+def _wants_profile(scope, headers: Dict[str, str]) -> bool:
+    flag = headers.get("x-profile")
+    if flag is None:
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        flag = (query.get("profile") or [None])[0]
+    return flag in ("1", "true", "yes") and authorized(headers)
+
+def _breakdown(spans: List[Tuple[str, Dict[str, Any], float, float]]) -> List[Dict[str, Any]]:
+    agg: Dict[str, List[float]] = {}
+    for name, labels, _, secs in spans:
+        key = name + "".join(f" {k}={v}" for k, v in sorted(labels.items()))
+        a = agg.setdefault(key, [0, 0.0])
+        a[0] += 1
+        a[1] += secs
+    return [{"span": k, "calls": n, "ms": round(s * 1000, 3)}
+            for k, (n, s) in sorted(agg.items(), key=lambda kv: -kv[1][1])]
+
+def _record(pid: int, scope, reason: str, status: int, t0: float, t1: float,
+            spans: List[Tuple[str, Dict[str, Any], float, float]]) -> None:
+    stacks = Counter(_SAMPLER.window(t0, t1))
+    _RING.append({
+        "id": pid,
+        "reason": reason,
+        "method": scope["method"],
+        "path": scope["path"],
+        "query": scope.get("query_string", b"").decode("latin-1"),
+        "status": status,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round((t1 - t0) * 1000, 3),
+        # spans can overlap (gathered feeds), so their sum may exceed duration_ms
+        "breakdown": _breakdown(spans),
+        "spans": [{"span": n, "labels": l, "offset_ms": round((s - t0) * 1000, 3),
+                   "ms": round(d * 1000, 3)}
+                  for n, l, s, d in spans],
+        "samples": sum(stacks.values()),
+        "stacks": stacks,
+    })
+    metrics.inc("profiles_captured_total", reason=reason)
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Newest first, without stacks/spans."""
+    keep = ("id", "reason", "method", "path", "query", "status", "started_at", "duration_ms",
+            "samples")
+    return [{k: p[k] for k in keep} for p in reversed(_RING)]
+
+def get_profile(pid: int, top: int = 50) -> Optional[Dict[str, Any]]:
+    for p in _RING:
+        if p["id"] == pid:
+            out = dict(p)
+            out["stacks"] = [{"stack": s, "samples": n} for s, n in p["stacks"].most_common(top)]
+            return out
+    return None
+
+def folded(pid: int) -> Optional[str]:
+    """Brendan Gregg folded format (flamegraph.pl, speedscope)."""
+    for p in _RING:
+        if p["id"] == pid:
+            return "".join(f"{s} {n}\n" for s, n in p["stacks"].items())
+    return None
+
+class ProfilingMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        # without a token nobody can read profiles or ask for one, so don't sample at all
+        if (scope["type"] != "http" or not settings.ADMIN_TOKEN
+                or scope["path"].startswith(("/admin/", "/metrics"))):
+            return await self.app(scope, receive, send)
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        requested = _wants_profile(scope, headers)
+        if not requested and settings.PROFILE_SLOW_MS <= 0:
+            return await self.app(scope, receive, send)
+
+        pid = next(_IDS) if requested else 0
+        status = {"code": 500}
+
+        async def _send(message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if requested:
+                    message = {**message, "headers": [*message.get("headers", []),
+                                                      (b"x-profile-id", str(pid).encode())]}
+            await send(message)
+
+        spans: List[Tuple[str, Dict[str, Any], float, float]] = []
+        token = metrics.SPANS.set(spans)
+        _SAMPLER.enter(fast=requested)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            t1 = time.perf_counter()
+            _SAMPLER.exit(fast=requested)
+            metrics.SPANS.reset(token)
+            if requested:
+                _record(pid, scope, "requested", status["code"], t0, t1, spans)
+            elif (t1 - t0) * 1000 >= settings.PROFILE_SLOW_MS:
+                _record(next(_IDS), scope, "slow", status["code"], t0, t1, spans)
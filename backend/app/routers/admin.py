@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+
+from ..config.settings import settings
+from .. import profiling
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Route dependency: 403 unless X-Admin-Token matches ADMIN_TOKEN (and one is set)."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403,
+                            detail="admin endpoints are disabled until ADMIN_TOKEN is set")
+    if not profiling.token_ok(x_admin_token):
+        raise HTTPException(status_code=403, detail="admin token required")
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+_GONE = "profile not found (ring buffer may have rotated)"
+
+@router.get("/profiles")
+def profiles():
+    """Captured slow/on-demand request profiles, newest first."""
+    return {"slow_ms": settings.PROFILE_SLOW_MS, "profiles": profiling.list_profiles()}
+
+@router.get("/profiles/{pid}")
+def profile(pid: int, top: int = 50, format: str = "json"):
+    """format=folded returns collapsed stacks for flamegraph.pl / speedscope."""
+    if format == "folded":
+        text = profiling.folded(pid)
+        if text is None:
+            raise HTTPException(status_code=404, detail=_GONE)
+        return PlainTextResponse(text)
+    p = profiling.get_profile(pid, top=top)
+    if p is None:
+        raise HTTPException(status_code=404, detail=_GONE)
+    return p
@@ -1,19 +1,28 @@
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Request
 from typing import Dict, Any, Optional
 
+from .. import admission
 from ..services.chat_agent import run_chat
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 @router.post("")
-def chat(payload: Dict[str, Any] = Body(...)):
+async def chat(request: Request, payload: Dict[str, Any] = Body(...)):
     """
     Body: { "message": str, "user_location": {lat,lon}?, "session_id"?: str, "photo_url"?: str }
+    Runs on the llm pool; 429 past the per-session or per-address chat limit, 503 when the pool
+    is full.
     """
     msg = payload.get("message", "")
     if not isinstance(msg, str) or not msg.strip():
         return {"reply": "Please type something.", "tool_used": None}
-    return run_chat(
+    sid = payload.get("session_id")
+    host = request.client.host if request.client else None
+    keys = admission.client_keys(host, str(sid) if sid else None)
+    admission.CHAT_LIMIT.check(*keys)
+    admission.SESSION.set(keys)
+    return await admission.run(
+        "llm", run_chat,
         message=msg.strip(),
         user_location=payload.get("user_location"),
         session_id=payload.get("session_id"),
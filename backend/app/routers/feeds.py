@@ -1,40 +1,83 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from datetime import datetime, timezone, timedelta
 from typing import Any, Dict, Optional
+from .. import admission
+from ..config.settings import settings
+from ..data.codec import wrap
+from .responses import RawJSONResponse, precompressed_async
 from ..services.feeds import (
-    fetch_usgs_quakes_geojson, fetch_nws_alerts_geojson,
-    eonet_geojson_points, firms_geojson_points, 
-    local_updates as _local_updates, global_updates as _global_updates
+    FeedUnavailable, get_snapshot,
+    local_updates as _local_updates, global_updates_source
 )
 
 router = APIRouter(prefix="/feeds", tags=["feeds"])
 
+async def _feed(request: Request, name: str):
+    try:
+        snap = await get_snapshot(name)
+    except FeedUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    # one snapshot -> one body: hashed and compressed on its first request only
+    return await precompressed_async(request, lambda: wrap("data", snap.encoded),
+                                      ("feed", name, snap.fetched_at))
+
 @router.get("/usgs")
-async def usgs():
-    return {"data": await fetch_usgs_quakes_geojson()}
+async def usgs(request: Request):
+    return await _feed(request, "usgs")
 
 @router.get("/nws")
-async def nws():
-    return {"data": await fetch_nws_alerts_geojson()}
+async def nws(request: Request):
+    return await _feed(request, "nws")
 
 @router.get("/eonet")
-async def eonet():
-    return {"data": await eonet_geojson_points()}
+async def eonet(request: Request):
+    return await _feed(request, "eonet")
 
 @router.get("/firms")
-async def firms():
+async def firms(request: Request):
     # Return pointified features for map markers
-    return {"data": await firms_geojson_points()}
+    return await _feed(request, "firms")
 
 # Convenience endpoints parallel to your previous design
 updates = APIRouter(prefix="/updates", tags=["updates"])
 
 @updates.get("/local")
 async def local_updates(lat: float, lon: float, radius_miles: float = 25.0,
-                        max_age_hours: int = 48, limit: int = 100):
-    return await _local_updates(lat, lon, radius_miles, max_age_hours, limit)
+                        max_age_hours: int = 48, limit: int = 100, collapse: bool = True):
+    # collapse: one row per incident (its newest report) instead of every duplicate report
+    body = await _local_updates(lat, lon, radius_miles, max_age_hours, limit, collapse)
+    return RawJSONResponse(body)
 
 @updates.get("/global")
-async def global_updates(limit: int = 200, max_age_hours: Optional[int] = None):
-    return await _global_updates(limit, max_age_hours)
+async def global_updates(request: Request, limit: int = 200, max_age_hours: Optional[int] = None,
+                         collapse: bool = True):
+    # a poll with nothing new is answered from the version alone, without rebuilding the body
+    version, build = await global_updates_source(limit, max_age_hours, collapse)
+    return await precompressed_async(request, build, version)
+
+@updates.get("/timeline")
+@admission.limited("db")
+def timeline(bbox: Optional[str] = Query(None, description="minLon,minLat,maxLon,maxLat"),
+             from_: Optional[datetime] = Query(None, alias="from"), to: Optional[datetime] = None,
+             bucket: str = "hour", source: Optional[str] = None, category: Optional[str] = None):
+    """Activity per time bucket (reports + feed events) from the hourly rollups; default 48h."""
+    from ..services import rollups
+    box = None
+    if bbox:
+        try:
+            minx, miny, maxx, maxy = [float(x) for x in bbox.split(",")]
+        except Exception:
+            raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+        box = (minx, miny, maxx, maxy)
+    end = to or datetime.now(timezone.utc)
+    start = from_ or end - timedelta(hours=settings.MAX_AGE_HOURS)
+    end, start = (t if t.tzinfo else t.replace(tzinfo=timezone.utc) for t in (end, start))
+    if start >= end:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    try:
+        body = rollups.timeline(box, start, end, rollups.parse_bucket(bucket), source, category)
+        return RawJSONResponse(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 router.include_router(updates)
@@ -1,14 +1,22 @@
 # apps/api/routes/geo.py
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import Optional
-from ..services.tracts import get_tracts_by_bbox
+from .. import admission
+from ..data import codec
+from ..services.tracts import data_version, get_tracts_by_bbox
+from .responses import precompressed
 
 router = APIRouter(prefix="/geo", tags=["geo"])
 
 @router.get("/tracts")
-def tracts(bbox: str = Query(..., description="minLon,minLat,maxLon,maxLat")):
+@admission.limited("gis")
+def tracts(request: Request, bbox: str = Query(..., description="minLon,minLat,maxLon,maxLat")):
     try:
         minx, miny, maxx, maxy = [float(x) for x in bbox.split(",")]
     except Exception:
         raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
-    return get_tracts_by_bbox((minx, miny, maxx, maxy))
+    box = (minx, miny, maxx, maxy)
+    # tract data is static once loaded, so a repeated viewport is served from the cache
+    version = data_version()
+    return precompressed(request, lambda: codec.dumps(get_tracts_by_bbox(box)),
+                         ("tracts", version, box) if version else None)
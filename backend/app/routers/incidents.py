@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from .. import admission
+from .responses import RawJSONResponse
+from ..services.incidents import incident_detail, list_incidents
+
+router = APIRouter(prefix="/incidents", tags=["incidents"])
+
+@router.get("")
+@admission.limited("db")
+def incidents(bbox: Optional[str] = Query(None, description="minLon,minLat,maxLon,maxLat"),
+              category: Optional[str] = None, max_age_hours: Optional[int] = None,
+              limit: int = Query(500, ge=1, le=5000)):
+    box = None
+    if bbox:
+        try:
+            minx, miny, maxx, maxy = [float(x) for x in bbox.split(",")]
+        except Exception:
+            raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+        box = (minx, miny, maxx, maxy)
+    return RawJSONResponse(list_incidents(box, category, max_age_hours, limit))
+
+@router.get("/{iid}")
+@admission.limited("db")
+def incident(iid: int, limit: int = Query(50, ge=1, le=1000)):
+    feat = incident_detail(iid, limit)
+    if feat is None:
+        raise HTTPException(status_code=404, detail="unknown incident")
+    return feat
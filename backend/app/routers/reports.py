@@ -1,12 +1,89 @@
-from fastapi import APIRouter
-from ..data.store import get_feature_collection, clear_reports
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+import asyncio, io, tempfile
+from typing import List, Optional
+from .. import admission
+from ..config.settings import settings
+from ..data.store import get_feature_collection_bytes, clear_reports, data_version
+from ..services.bulk import FORMATS, import_reports, export_reports
+from .admin import require_admin
+from .responses import precompressed
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+_MEDIA = {"ndjson": "application/x-ndjson", "geojson": "application/geo+json", "csv": "text/csv"}
+_SPOOL_CHUNK = 1024 * 1024  # body bytes gathered per spool write
+
 @router.get("")
-def reports():
-    return get_feature_collection()
+@admission.limited("db")
+def reports(request: Request, collapse: bool = True,
+            bbox: Optional[str] = Query(None, description="minLon,minLat,maxLon,maxLat")):
+    """
+    All reports (or those in bbox); with collapse (default) one per incident, its newest, carrying
+    incident_reports.
+    """
+    box = None
+    if bbox:
+        try:
+            minx, miny, maxx, maxy = [float(x) for x in bbox.split(",")]
+        except Exception:
+            raise HTTPException(status_code=400, detail="bbox must be minLon,minLat,maxLon,maxLat")
+        box = (minx, miny, maxx, maxy)
+    # new reports raise the max id and deletes bump the generation, so this names the body
+    version = ("reports", collapse, box, data_version())
+    return precompressed(request, lambda: get_feature_collection_bytes(collapse, box), version)
 
 @router.post("/clear")
+@admission.limited("db")
 def clear_reports_api():
     return clear_reports()
+
+@router.post("/bulk", dependencies=[Depends(require_admin)])
+async def bulk_import(request: Request, format: str = Query("ndjson"), classify: bool = False,
+                      batch_size: int = Query(5000, ge=100, le=50000)):
+    """
+    Body: raw GeoJSON FeatureCollection, NDJSON (Feature or {lat,lon,text,...} per line) or CSV.
+    Needs X-Admin-Token. The body (at most BULK_IMPORT_MAX_BYTES) is spooled to disk while it
+    arrives, then inserted in batched transactions on the db pool.
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    limit = settings.BULK_IMPORT_MAX_BYTES
+    too_large = HTTPException(status_code=413, detail=f"body over {limit} bytes")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise too_large
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    try:
+        received = flushed = 0
+        pending: List[bytes] = []
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > limit:
+                raise too_large
+            pending.append(chunk)
+            if received - flushed >= _SPOOL_CHUNK:
+                # past max_size the spool is a real file: keep its writes off the event loop
+                await asyncio.to_thread(spool.write, b"".join(pending))
+                pending.clear()
+                flushed = received
+        await asyncio.to_thread(spool.write, b"".join(pending))
+        spool.seek(0)
+        fh = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        try:
+            # live indexes stay: dropping them would turn concurrent queries into full scans
+            return await admission.run("db", import_reports, fh, format, classify=classify,
+                                       batch_size=batch_size, rebuild_indexes=False)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        spool.close()
+
+@router.get("/export", dependencies=[Depends(require_admin)])
+def bulk_export(format: str = Query("ndjson")):
+    """Streams the whole reports table; needs X-Admin-Token."""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    return StreamingResponse(
+        export_reports(format), media_type=_MEDIA[format],
+        headers={"Content-Disposition": f'attachment; filename="reports.{format}"'})
@@ -0,0 +1,45 @@
+from typing import Any, Callable, Hashable, Optional
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+from ..data import codec
+from ..precompress import BODIES
+
+class RawJSONResponse(Response):
+    """Response for bodies that are already JSON bytes (skips jsonable_encoder)."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return bytes(content)
+        return codec.dumps(content)
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-addressed files: they never change, so clients cache them a year."""
+    async def get_response(self, path: str, scope) -> Response:
+        resp = await super().get_response(path, scope)
+        if resp.status_code in (200, 304):
+            resp.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return resp
+
+def precompressed(request: Request, build: Callable[[], bytes],
+                  version: Optional[Hashable] = None) -> Response:
+    """
+    JSON body with a strong ETag, compressed per Accept-Encoding from the shared cache (see
+    precompress.py); 304 when If-None-Match names it. Clients must revalidate (no-cache), so a
+    poll costs a 304 until the data changes.
+    """
+    res = BODIES.resolve(version, build, request.headers.get("if-none-match"),
+                         request.headers.get("accept-encoding"))
+    headers = {"ETag": res.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if res.status == 304:
+        return Response(status_code=304, headers=headers)
+    if res.encoding:
+        headers["Content-Encoding"] = res.encoding
+    return Response(res.body, media_type="application/json", headers=headers)
+
+async def precompressed_async(request: Request, build: Callable[[], bytes],
+                              version: Optional[Hashable] = None) -> Response:
+    """precompressed() for async routes: hashing and compression run in the threadpool."""
+    return await run_in_threadpool(precompressed, request, build, version)
@@ -1,25 +1,37 @@
-from fastapi import APIRouter, UploadFile, File, Request, HTTPException
-import os
-from uuid import uuid4
+from fastapi import APIRouter, Request, HTTPException
 from ..config.settings import settings
+from ..services.uploads import store_photo, UploadTooLarge, InvalidImage, BadUpload
 
 router = APIRouter(prefix="/upload", tags=["uploads"])
 
-@router.post("/photo")
-async def upload_photo(request: Request, file: UploadFile = File(...)):
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="Only image files are allowed.")
-    ext = os.path.splitext(file.filename or "")[1].lower() or ".jpg"
-    if ext not in [".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"]:
-        ext = ".jpg"
+# the body is parsed by services/uploads.py as it streams in, so describe the form for the docs
+# by hand
+_PHOTO_FORM = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object", "required": ["file"],
+    "properties": {"file": {"type": "string", "format": "binary"}},
+}}}}}
 
-    data = await file.read()
-    if len(data) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="Image too large (max 5MB).")
-
-    name = f"{uuid4().hex}{ext}"
-    (settings.UPLOADS_DIR / name).write_bytes(data)
+@router.post("/photo", openapi_extra=_PHOTO_FORM)
+async def upload_photo(request: Request):
+    """
+    Returns {"url": WebP display copy, "thumb_url", "original_url", "path"}.
+    Names are content-addressed, so uploading the same image twice returns the same URLs.
+    """
+    try:
+        names = await store_photo(request)
+    except UploadTooLarge:
+        mb = settings.MAX_UPLOAD_BYTES // (1024 * 1024)
+        raise HTTPException(status_code=413, detail=f"Image too large (max {mb}MB).")
+    except BadUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except InvalidImage:
+        raise HTTPException(status_code=400, detail="Could not decode image.")
 
     base = str(request.base_url).rstrip("/")
-    url = f"{base}/uploads/{name}"
-    return {"ok": True, "url": url, "path": f"/uploads/{name}"}
+    return {
+        "ok": True,
+        "url": f"{base}/uploads/{names['display']}",
+        "path": f"/uploads/{names['display']}",
+        "thumb_url": f"{base}/uploads/{names['thumb']}",
+        "original_url": f"{base}/uploads/{names['original']}",
+    }
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+from .responses import RawJSONResponse
+from ..config.settings import settings
+from ..services import geofence
+
+router = APIRouter(prefix="/watch", tags=["watch"])
+
+class WatchBody(BaseModel):
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    radius_miles: Optional[float] = None
+    polygon: Optional[Dict[str, Any]] = None   # GeoJSON Polygon/MultiPolygon instead of a circle
+    max_age_hours: int = settings.MAX_AGE_HOURS
+    limit: int = 100
+
+@router.post("")
+async def create_watch(body: WatchBody):
+    """Register a watch area; the response is the first page of matches plus the watch id."""
+    try:
+        lat, lon, km, poly = geofence.parse_area(body.lat, body.lon, body.radius_miles,
+                                                 body.polygon)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return RawJSONResponse(await geofence.subscribe(lat, lon, km, poly, body.max_age_hours,
+                                                    body.limit))
+
+@router.get("/{wid}")
+async def poll_watch(wid: str, limit: int = 100):
+    """Matches queued since the last poll (each event at most once)."""
+    body = await geofence.poll(wid, limit)
+    if body is None:
+        raise HTTPException(status_code=404, detail="unknown or expired watch; register again")
+    return RawJSONResponse(body)
+
+@router.delete("/{wid}")
+def delete_watch(wid: str):
+    return {"ok": geofence.ENGINE.remove(wid)}
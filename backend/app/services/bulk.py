@@ -0,0 +1,222 @@
+# apps/api/services/bulk.py
+"""
+Bulk report import/export.
+
+Inputs are read incrementally (one line / one feature at a time) and written with
+store.bulk_insert in batched transactions, so memory stays flat for multi-million-row files.
+"""
+from __future__ import annotations
+import csv, io, json
+from datetime import datetime, timezone
+from typing import Any, Dict, IO, Iterable, Iterator, Literal, Optional, Tuple
+
+from dateutil import parser as dtparser
+
+from ..data import codec
+from ..data.store import bulk_insert, iter_report_rows, _row_to_feature
+
+Format = Literal["ndjson", "geojson", "csv"]
+FORMATS = ("ndjson", "geojson", "csv")
+
+_LAT_KEYS = ("lat", "latitude", "LAT", "LATITUDE")
+_LON_KEYS = ("lon", "lng", "longitude", "LON", "LONGITUDE")
+_TIME_KEYS = ("reported_at", "created_at", "time", "timestamp")
+_CORE_KEYS = {"type", "text", "rid", "id", "props_json", *_LAT_KEYS, *_LON_KEYS}
+
+# ---------- readers ----------
+
+def _iter_ndjson(fh: IO[str]) -> Iterator[Optional[Dict[str, Any]]]:
+    for line in fh:
+        line = line.strip()
+        if line:
+            try:
+                yield codec.loads(line)
+            except ValueError:
+                yield None  # counted as skipped, like unusable rows of the other formats
+
+def _iter_csv(fh: IO[str]) -> Iterator[Dict[str, Any]]:
+    yield from csv.DictReader(fh)
+
+def _iter_geojson(fh: IO[str], chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the members of a FeatureCollection's "features" array without loading the document.
+    Only the current feature (plus one read chunk) is held in memory.
+    """
+    dec = json.JSONDecoder()
+    buf = ""
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, eof
+        if eof:
+            return False
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf += chunk
+        return True
+
+    # seek to the opening bracket of "features"
+    while True:
+        k = buf.find('"features"')
+        if k >= 0:
+            b = buf.find("[", k)
+            if b >= 0:
+                buf = buf[b + 1:]
+                break
+        if not fill():
+            return
+    pos = 0
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buf):
+            buf, pos = "", 0
+            if not fill():
+                return
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = dec.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # feature split across chunks; keep the tail and read more
+            buf, pos = buf[pos:], 0
+            if not fill():
+                raise ValueError("truncated GeoJSON feature")
+            continue
+        yield obj
+        pos = end
+        if pos > chunk_size:
+            buf, pos = buf[pos:], 0
+
+_READERS = {"ndjson": _iter_ndjson, "geojson": _iter_geojson, "csv": _iter_csv}
+
+# ---------- normalization ----------
+
+def _first(d: Dict[str, Any], keys: Iterable[str]) -> Any:
+    for k in keys:
+        v = d.get(k)
+        if v not in (None, ""):
+            return v
+    return None
+
+def _iso_utc(v: Any) -> str:
+    if isinstance(v, (int, float)):
+        # epoch seconds or milliseconds
+        t = datetime.fromtimestamp(v / 1000 if v > 1e11 else v, tz=timezone.utc)
+    else:
+        t = dtparser.isoparse(str(v))
+        t = t.replace(tzinfo=timezone.utc) if not t.tzinfo else t.astimezone(timezone.utc)
+    return t.isoformat()
+
+def _record_to_row(rec: Dict[str, Any],
+                   classify: bool) -> Optional[Tuple[float, float, str, str, str]]:
+    """Feature or flat record -> store row (lat, lon, text, props_json, created_at); None if bad."""
+    if rec.get("type") == "Feature":
+        g = rec.get("geometry") or {}
+        if g.get("type") != "Point":
+            return None
+        lon, lat = g["coordinates"][:2]
+        props = dict(rec.get("properties") or {})
+    else:
+        lat, lon = _first(rec, _LAT_KEYS), _first(rec, _LON_KEYS)
+        props = {k: v for k, v in rec.items() if k not in _CORE_KEYS and v not in (None, "")}
+        if rec.get("props_json"):
+            # round-trip of our own CSV export
+            try:
+                props = {**codec.loads(rec["props_json"]), **props}
+            except ValueError:
+                props["raw_props"] = rec["props_json"]
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+
+    text = str(_first(rec, ("text",)) or props.pop("text", None) or props.get("title")
+               or "User report")
+    ts = _first(props, _TIME_KEYS) or _first(rec, _TIME_KEYS)
+    try:
+        created_at = _iso_utc(ts) if ts is not None else datetime.now(timezone.utc).isoformat()
+    except (ValueError, OverflowError):
+        created_at = datetime.now(timezone.utc).isoformat()
+    for k in ("created_at", "time", "timestamp", "type", "rid", "id"):
+        props.pop(k, None)
+    props["reported_at"] = created_at
+    props.setdefault("source", "import")
+
+    if classify and not props.get("category"):
+        from ..agents.classifier import classify_report_text, CATEGORY_TO_ICON
+        cls = classify_report_text(text)
+        props.update({
+            "title": props.get("title") or cls.label,
+            "category": cls.category,
+            "emoji": CATEGORY_TO_ICON.get(cls.category, "3d-info"),
+            "severity": props.get("severity") or cls.severity,
+            "confidence": cls.confidence,
+        })
+    return (lat, lon, text, codec.dumps(props).decode(), created_at)
+
+def import_reports(fh: IO[str], fmt: Format, *, classify: bool = False, batch_size: int = 5000,
+                   rebuild_indexes: bool = False) -> Dict[str, Any]:
+    """
+    Stream records from a text file object into the reports table. rebuild_indexes drops the
+    secondary indexes for the load (see store.bulk_insert): only for offline loads, since queries
+    running meanwhile fall back to full scans.
+    """
+    if fmt not in _READERS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    skipped = 0
+
+    def rows() -> Iterator[tuple]:
+        nonlocal skipped
+        for rec in _READERS[fmt](fh):
+            row = _record_to_row(rec, classify) if isinstance(rec, dict) else None
+            if row is None:
+                skipped += 1
+                continue
+            yield row
+
+    inserted = bulk_insert(rows(), batch_size=batch_size, rebuild_indexes=rebuild_indexes)
+    return {"ok": True, "inserted": inserted, "skipped": skipped}
+
+# ---------- export ----------
+
+_CSV_FIELDS = ["id", "lat", "lon", "text", "props_json", "created_at"]
+
+def export_reports(fmt: Format, batch_size: int = 5000) -> Iterator[bytes]:
+    """Yield the whole reports table as encoded chunks (one per batch)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if fmt == "csv":
+        sio = io.StringIO()
+        w = csv.writer(sio)
+        w.writerow(_CSV_FIELDS)
+        n = 0
+        for r in iter_report_rows(batch_size):
+            w.writerow(r)
+            n += 1
+            if n % batch_size == 0:
+                yield sio.getvalue().encode()
+                sio.seek(0); sio.truncate()
+        yield sio.getvalue().encode()
+        return
+
+    if fmt == "geojson":
+        yield b'{"type":"FeatureCollection","features":['
+    parts: list[bytes] = []
+    first = True
+    sep = b"\n" if fmt == "ndjson" else b","
+    tail = b"\n" if fmt == "ndjson" else b""
+    for r in iter_report_rows(batch_size):
+        parts.append(codec.dumps(_row_to_feature(r)))
+        if len(parts) >= batch_size:
+            yield (b"" if first or fmt == "ndjson" else sep) + sep.join(parts) + tail
+            parts, first = [], False
+    if parts:
+        yield (b"" if first or fmt == "ndjson" else sep) + sep.join(parts) + tail
+    if fmt == "geojson":
+        yield b"]}"
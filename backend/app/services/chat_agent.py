@@ -1,6 +1,37 @@
+import logging
 from typing import Dict, Any, Optional
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
-from ..agents.graph import APP
+
+from ..config.settings import settings
+from .. import metrics
+from ..agents.intents import NearbyIntent, match_nearby, render_nearby
+from .reports import find_reports_near
+
+log = logging.getLogger(__name__)
+
+def _remember(sid: str, message: str, reply: str) -> None:
+    """Append a fast-path exchange to the session so follow-ups ("widen the search") see it."""
+    from langchain_core.messages import HumanMessage, AIMessage
+    from ..agents.graph import get_app
+    try:
+        get_app().update_state({"configurable": {"thread_id": sid}},
+                               {"messages": [HumanMessage(content=message),
+                                             AIMessage(content=reply)]},
+                               as_node="agent")
+    except Exception as e:
+        log.warning("could not record fast-path turn in session %s: %s", sid, e)
+
+def _answer_nearby(intent: NearbyIntent, message: str, sid: str) -> Dict[str, Any]:
+    """Same response shape as an agent turn that called find_reports_near, minus two LLM calls."""
+    with metrics.timed("chat_seconds", route="fastpath"):
+        results = find_reports_near(intent.lat, intent.lon, intent.radius_km,
+                                    settings.DEFAULT_LIMIT,
+                                    max_age_hours=settings.MAX_AGE_HOURS, collapse=True)
+        reply = render_nearby(intent, results, settings.MAX_AGE_HOURS)
+        _remember(sid, message, reply)
+    metrics.inc("chat_route_total", route="fastpath")
+    return {"reply": reply, "tool_used": "find_reports_near",
+            "tool_result": {"ok": True, "count": len(results), "results": results},
+            "session_id": sid}
 
 def run_chat(message: str,
              user_location: Optional[Dict[str, float]] = None,
@@ -8,9 +39,18 @@ def run_chat(message: str,
              photo_url: Optional[str] = None) -> Dict[str, Any]:
     from uuid import uuid4
     sid = session_id or str(uuid4())
+    if settings.CHAT_FASTPATH:
+        intent = match_nearby(message, user_location, photo_url)
+        if intent is not None:
+            return _answer_nearby(intent, message, sid)
+    metrics.inc("chat_route_total", route="agent")
+    # langchain/langgraph load here, not at router import (see main.py API_ROLE)
+    from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+    from ..agents.graph import get_app
     init = {"messages": [HumanMessage(content=message)], "user_location": user_location, "photo_url": photo_url}
     cfg = {"configurable": {"thread_id": sid}}
-    final = APP.invoke(init, config=cfg)
+    with metrics.timed("chat_seconds", route="agent"):
+        final = get_app().invoke(init, config=cfg)
 
     reply, tool_used, tool_result = "", None, None
     for m in final["messages"]:
@@ -1,9 +1,19 @@
-import asyncio
+import asyncio, logging, time
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, List, Iterable, Tuple
+from typing import (
+    Any, Callable, Awaitable, Dict, Hashable, Optional, List, Iterable, Sequence, Set, Tuple,
+)
 from dateutil import parser as dtparser
 
+from ..config.settings import settings
+from .. import metrics
+from ..singleflight import SingleFlight
+from ..data import codec
 from ..data.geo import haversine_km
+from .geoindex import GeomIndex, display_point, to_shape
+from . import geofence
+from .zones import fill_zone_geometries
 from .fetchers import (
     fetch_usgs_quakes_geojson, fetch_nws_alerts_geojson,
     fetch_eonet_events_geojson, fetch_firms_hotspots_geojson
@@ -23,7 +33,7 @@ def _flatten_lonlats(coords: Any) -> List[Tuple[float, float]]:
     return out
 
 def _centroid_from_geom(geom: Dict[str, Any]) -> Optional[Tuple[float, float]]:
-    """Return (lon, lat) for any geometry by taking a simple average of all coords."""
+    """(lon, lat) for any geometry: true area centroid, vertex average if shapely rejects it."""
     if not geom or "type" not in geom:
         return None
     gtype = geom.get("type")
@@ -33,7 +43,11 @@ def _centroid_from_geom(geom: Dict[str, Any]) -> Optional[Tuple[float, float]]:
     if gtype == "Point" and isinstance(coords, (list, tuple)) and len(coords) >= 2:
         return (float(coords[0]), float(coords[1]))
 
-    # Generic centroid for Polygon/MultiPolygon/LineString/etc.
+    shp = to_shape(geom)
+    if shp is not None:
+        lat, lon = display_point(shp)
+        return (lon, lat)
+
     pts = _flatten_lonlats(coords)
     if not pts:
         return None
@@ -84,8 +98,9 @@ def _quake_to_update(f: Dict[str, Any]) -> Dict[str, Any] | None:
 def _eonet_to_update(f: Dict[str, Any]) -> Dict[str, Any] | None:
     p = f.get("properties", {}) or {}
     g = f.get("geometry", {}) or {}
-    if g.get("type") != "Point": return None
-    lon, lat = g["coordinates"][:2]
+    cen = _centroid_from_geom(g)
+    if not cen: return None
+    lon, lat = cen
     title = p.get("title") or p.get("category") or "Event"
     cat = (p.get("category") or (p.get("categories") or [{}])[0].get("title") or "").lower()
     if "wildfire" in cat: emoji = "🔥"
@@ -97,7 +112,9 @@ def _eonet_to_update(f: Dict[str, Any]) -> Dict[str, Any] | None:
     elif any(k in cat for k in ["ice","snow","blizzard"]): emoji = "❄️"
     elif any(k in cat for k in ["dust","smoke","haze"]): emoji = "🌫️"
     else: emoji = "⚠️"
-    time_iso = p.get("time") or p.get("updated") or datetime.now(timezone.utc).isoformat()
+    # EONET v3 puts each geometry's time in `date`
+    time_iso = (p.get("time") or p.get("date") or p.get("updated")
+                or datetime.now(timezone.utc).isoformat())
     return {"kind": "eonet", "title": title, "emoji": emoji, "time": time_iso,
             "lat": float(lat), "lon": float(lon), "sourceUrl": p.get("link") or p.get("url"), "raw": p}
 
@@ -111,95 +128,308 @@ def _firms_to_update(f: Dict[str, Any]) -> Dict[str, Any] | None:
     return {"kind": "fire", "title": "Fire hotspot", "emoji": "🔥", "time": time_iso,
             "lat": float(lat), "lon": float(lon), "severity": sev, "sourceUrl": None, "raw": p}
 
-def _within(lat: float, lon: float, u: Dict[str, Any], radius_km: float) -> bool:
-    return haversine_km((lat, lon), (u["lat"], u["lon"])) <= radius_km
-
-def _is_recent(iso: str | None, max_age_hours: int) -> bool:
-    if not iso: return False
+def _parse_ts(iso: str | None) -> Optional[float]:
+    if not iso: return None
     try:
         t = dtparser.isoparse(iso)
         if not t.tzinfo: t = t.replace(tzinfo=timezone.utc)
     except Exception:
-        return False
-    return (datetime.now(timezone.utc) - t).total_seconds() <= max_age_hours * 3600
-
-async def _gather_feeds():
-    results = await asyncio.gather(
-        fetch_usgs_quakes_geojson(), fetch_nws_alerts_geojson(),
-        fetch_eonet_events_geojson(), fetch_firms_hotspots_geojson(),
-        return_exceptions=True
-    )
-    def ok(x): return {"features": []} if isinstance(x, Exception) or not x else x
-    return {"usgs": ok(results[0]), "nws": ok(results[1]), "eonet": ok(results[2]), "firms": ok(results[3])}
-
-async def local_updates(lat: float, lon: float, radius_miles: float, max_age_hours: int, limit: int):
+        return None
+    return t.timestamp()
+
+@dataclass
+class FeedSnapshot:
+    """
+    One upstream fetch, normalized and encoded once and shared by every request until it expires.
+    Columns are lists for snapshots built in this process, or views into a mapped file published
+    by the ingestion owner when FEED_SHARED is on (see services/feedshare.py).
+    """
+    name: str
+    fetched_at: float                    # time.time() of the upstream fetch
+    encoded: bytes                       # payload served by /feeds/<name>
+    encoded_updates: Sequence[bytes]     # one encoded /updates row per position
+    times: Sequence[str]                 # u["time"] per row (newest-first sort key)
+    lats: Sequence[float]
+    lons: Sequence[float]
+    ts: Sequence[Optional[float]]        # parsed u["time"] (epoch seconds); None/NaN when unknown
+    keys: Sequence[str]                  # upstream identity per row (see _row_key)
+    index: Optional[GeomIndex] = None    # polygon areas (NWS/EONET); other rows match on lat/lon
+
+    def __len__(self) -> int:
+        return len(self.encoded_updates)
+
+    def key(self, i: int) -> str:
+        """Identity of row i across refreshes (rollup dedup, watch alerts): feed and upstream id."""
+        return f"{self.name}:{self.keys[i]}"
+
+    def near(self, lat: float, lon: float, radius_km: float) -> List[int]:
+        """Positions of updates whose area covers (lat, lon) or whose point is within radius_km."""
+        hits = self.index.near(lat, lon, radius_km) if self.index else set()
+        indexed = self.index.positions if self.index else frozenset()
+        out: List[int] = []
+        for i in range(len(self)):
+            if i in indexed:
+                if i in hits:
+                    out.append(i)
+            elif haversine_km((lat, lon), (self.lats[i], self.lons[i])) <= radius_km:
+                out.append(i)
+        return out
+
+def _fresh(ts: Optional[float], cutoff: float) -> bool:
+    return ts is not None and ts >= cutoff  # NaN (unknown time in a mapped file) compares False
+
+log = logging.getLogger(__name__)
+
+_SNAPSHOTS: Dict[str, FeedSnapshot] = {}
+_REFRESH = SingleFlight("feed_refresh")
+_BACKGROUND: Set[asyncio.Task] = set()  # rollup tasks, referenced until they finish
+_FAILED_AT: Dict[str, float] = {}       # feed -> time of its last failed refresh
+
+class FeedUnavailable(RuntimeError):
+    """No snapshot to serve yet (shared mode, before the ingestion owner's first publish)."""
+
+def _feed_specs() -> Dict[str, Tuple[Callable[[], Awaitable[Dict[str, Any]]],
+                                     Callable[[Dict[str, Any]], Dict[str, Any]],
+                                     Callable[[Dict[str, Any]], List[Tuple[Dict[str, Any], Any]]]]]:
+    """name -> (fetch raw, raw -> /feeds payload, raw -> [(update, area geometry or None)])."""
+    def pick(conv):
+        return lambda fc: [(u, None) for f in (fc.get("features") or []) if (u := conv(f))]
+    return {
+        "usgs": (fetch_usgs_quakes_geojson, lambda fc: fc, pick(_quake_to_update)),
+        "nws": (_fetch_nws_with_zones, lambda fc: fc, _nws_updates_with_geoms),
+        "eonet": (fetch_eonet_events_geojson, _eonet_points, _eonet_updates_with_geoms),
+        "firms": (fetch_firms_hotspots_geojson, _firms_points, pick(_firms_to_update)),
+    }
+
+FEED_NAMES = ("usgs", "nws", "eonet", "firms")
+
+def _row_key(name: str, u: Dict[str, Any]) -> str:
+    """
+    Upstream identity of a normalized row, the same on every refresh. Falls back to time and
+    position, which only works for rows whose time comes from upstream.
+    """
+    p = u.get("raw") or {}
+    pos = f"{float(u['lat']):.4f},{float(u['lon']):.4f}"
+    key: Any = None
+    if name == "usgs" and p.get("net") and p.get("code"):
+        key = f"{p['net']}{p['code']}"
+    elif name == "nws":
+        key = p.get("@id") or p.get("id")
+    elif name == "eonet" and p.get("id"):
+        # the GeoJSON endpoint repeats an event once per dated geometry
+        key = f"{p['id']}:{p.get('date') or ''}"
+    elif name == "firms" and p.get("acq_date"):
+        key = f"{pos}:{p['acq_date']}:{p.get('acq_time') or ''}"
+    if key:
+        return str(key)
+    return f"{u.get('time') or ''}:{pos}"
+
+def build_snapshot(name: str, raw: Dict[str, Any] | None) -> FeedSnapshot:
+    _, to_payload, to_updates = _feed_specs()[name]
+    raw = raw or {"features": []}
+    with metrics.timed("upstream_parse_seconds", feed=name):
+        data = to_payload(raw)
+        pairs = to_updates(raw)
+        updates = [u for u, _ in pairs]
+        geoms = [g for _, g in pairs]
+        snap = FeedSnapshot(
+            name=name, fetched_at=time.time(), encoded=codec.dumps(data),
+            encoded_updates=[codec.dumps(u) for u in updates],
+            times=[u.get("time") or "" for u in updates],
+            lats=[float(u["lat"]) for u in updates], lons=[float(u["lon"]) for u in updates],
+            ts=[_parse_ts(u.get("time")) for u in updates],
+            keys=[_row_key(name, u) for u in updates],
+            index=GeomIndex(geoms) if any(g is not None for g in geoms) else None,
+        )
+    metrics.gauge("feed_snapshot_bytes", "Encoded size of the current feed payload").set(
+        len(snap.encoded), feed=name)
+    metrics.gauge("feed_snapshot_updates", "Normalized updates in the current snapshot").set(
+        len(updates), feed=name)
+    return snap
+
+async def get_snapshot(name: str, wait: bool = True) -> FeedSnapshot:
+    """
+    Cached snapshot for one feed, refreshed after FEED_TTL_SECONDS.
+    A failed refresh keeps serving the previous snapshot, without retrying for
+    FEED_RETRY_SECONDS; with none cached the error propagates.
+    In shared mode, wait=False raises FeedUnavailable right away when nothing is published.
+    """
+    if settings.FEED_SHARED:
+        # only the ingestion owner talks to upstream. Right after startup its first publish is
+        # worth waiting for; after that a missing file means its fetches fail, so don't wait
+        from .feedshare import load_published, startup_grace, wait_published
+        grace = startup_grace() if wait else 0.0
+        shared = await wait_published(name, grace) if grace > 0 else load_published(name)
+        if shared is None:
+            raise FeedUnavailable(f"{name} snapshot has not been published yet")
+        metrics.cache_result("feed_snapshot", True)
+        return shared
+    snap = _SNAPSHOTS.get(name)
+    now = time.time()
+    # during an upstream outage, don't make every request wait out the fetch timeout again
+    if snap is not None and (now - snap.fetched_at < settings.FEED_TTL_SECONDS
+                 or now - _FAILED_AT.get(name, 0.0) < settings.FEED_RETRY_SECONDS):
+        metrics.cache_result("feed_snapshot", True)
+        return snap
+    metrics.cache_result("feed_snapshot", False)
+    # every request that finds the feed expired awaits the same fetch + build
+    return await _REFRESH.do_async(name, _refresh_snapshot, name)
+
+async def _refresh_snapshot(name: str) -> FeedSnapshot:
+    snap = _SNAPSHOTS.get(name)
+    fetch = _feed_specs()[name][0]
+    try:
+        raw = await fetch()
+    except Exception as e:
+        if snap is not None:
+            _FAILED_AT[name] = time.time()
+            log.warning("feed %s refresh failed, serving the previous snapshot: %r", name, e)
+            return snap
+        raise
+    _FAILED_AT.pop(name, None)
+    snap = build_snapshot(name, raw)
+    _SNAPSHOTS[name] = snap
+    geofence.on_feed_snapshot(snap)
+    # counting runs behind the request that triggered the refresh
+    task = asyncio.create_task(record_rollups(snap))
+    _BACKGROUND.add(task)
+    task.add_done_callback(_BACKGROUND.discard)
+    return snap
+
+async def record_rollups(snap: FeedSnapshot) -> None:
+    """Count the snapshot's new rows into the activity rollups; never fails the refresh."""
+    from . import rollups
+    try:
+        await asyncio.to_thread(rollups.record_snapshot, snap)
+    except Exception as e:
+        log.warning("rollup of %s snapshot failed: %r", snap.name, e)
+
+async def _gather_snapshots() -> List[FeedSnapshot]:
+    # a feed with nothing to serve is left out rather than waited for
+    results = await asyncio.gather(*(get_snapshot(n, wait=False) for n in FEED_NAMES),
+                                   return_exceptions=True)
+    return [r for r in results if isinstance(r, FeedSnapshot)]
+
+def _updates_body(rows: List[Tuple[str, bytes]], limit: int) -> bytes:
+    """rows = (time, encoded update); newest first, truncated to limit."""
+    rows.sort(key=lambda x: x[0], reverse=True)
+    n = min(len(rows), limit)
+    return (b'{"count":' + str(n).encode()
+            + b',"updates":' + codec.join_array(b for _, b in rows[:n]) + b"}")
+
+async def local_updates(lat: float, lon: float, radius_miles: float, max_age_hours: int, limit: int,
+                        collapse: bool = True) -> bytes:
+    """
+    JSON bytes for {"count", "updates"}: reports (one per incident with collapse) + feed events
+    within radius_miles of (lat, lon).
+    """
     from ..data.store import find_reports_near
     km = float(radius_miles) * 1.609344
-    near_reports = find_reports_near(lat, lon, radius_km=km, limit=limit, max_age_hours=max_age_hours)
-    updates: List[Dict[str, Any]] = [_report_to_update(f) for f in near_reports]
-    feeds = await _gather_feeds()
-
-    for f in (feeds["usgs"].get("features") or []):
-        u = _quake_to_update(f)
-        if u and _is_recent(u["time"], max_age_hours) and _within(lat, lon, u, km):
-            updates.append(u)
-    for u in _nws_to_updates(feeds["nws"]):
-        if _is_recent(u["time"], max_age_hours) and _within(lat, lon, u, km):
-            updates.append(u)
-    for f in (feeds["eonet"].get("features") or []):
-        u = _eonet_to_update(f)
-        if u and _is_recent(u["time"], max_age_hours) and _within(lat, lon, u, km):
-            updates.append(u)
-    for f in (feeds["firms"].get("features") or []):
-        u = _firms_to_update(f)
-        if u and _is_recent(u["time"], max_age_hours) and _within(lat, lon, u, km):
-            updates.append(u)
+    near_reports = await asyncio.to_thread(find_reports_near, lat, lon, radius_km=km, limit=limit,
+                                           max_age_hours=max_age_hours, collapse=collapse)
+    rows: List[Tuple[str, bytes]] = []
+    with metrics.timed("updates_stage_seconds", scope="local", stage="reports_encode"):
+        for f in near_reports:
+            u = _report_to_update(f)
+            rows.append((u["time"] or "", codec.dumps(u)))
 
-    updates.sort(key=lambda x: x["time"] or "", reverse=True)
-    return {"count": min(len(updates), limit), "updates": updates[:limit]}
+    cutoff = time.time() - max_age_hours * 3600
+    snaps = await _gather_snapshots()
+    with metrics.timed("updates_stage_seconds", scope="local", stage="feed_scan"):
+        for snap in snaps:
+            for i in snap.near(lat, lon, km):
+                if _fresh(snap.ts[i], cutoff):
+                    rows.append((snap.times[i], snap.encoded_updates[i]))
+    with metrics.timed("updates_stage_seconds", scope="local", stage="assemble"):
+        return _updates_body(rows, limit)
 
 def _nws_to_updates(fc: Dict[str, Any]) -> list[Dict[str, Any]]:
-    out: list[Dict[str, Any]] = []
+    return [u for u, _ in _nws_updates_with_geoms(fc)]
+
+def _nws_updates_with_geoms(fc: Dict[str, Any]) -> list[Tuple[Dict[str, Any], Any]]:
+    """(update, shapely geometry) per alert; lat/lon is the area centroid used for the marker."""
+    out: list[Tuple[Dict[str, Any], Any]] = []
     for f in (fc.get("features") or []):
         p = f.get("properties", {}) or {}
-        g = f.get("geometry", {}) or {}
-        coords = None
-        if g.get("type") == "Polygon":
-            poly = g["coordinates"][0]
-            if poly:
-                lats = [c[1] for c in poly]; lons = [c[0] for c in poly]
-                coords = (sum(lats)/len(lats), sum(lons)/len(lons))
-        elif g.get("type") == "Point":
-            coords = (g["coordinates"][1], g["coordinates"][0])
-        if not coords:
+        shp = to_shape(f.get("geometry"))
+        if shp is None:
             continue
+        lat, lon = display_point(shp)
         sev = p.get("severity") or "Unknown"
         issued = p.get("effective") or p.get("onset") or p.get("sent") or datetime.now(timezone.utc).isoformat()
-        out.append({"kind": "nws", "title": p.get("event") or "NWS Alert", "emoji": "⚠️",
-                    "time": issued, "lat": float(coords[0]), "lon": float(coords[1]),
-                    "severity": sev, "sourceUrl": p.get("@id") or p.get("id"), "raw": p})
+        out.append(({"kind": "nws", "title": p.get("event") or "NWS Alert", "emoji": "⚠️",
+                     "time": issued, "lat": float(lat), "lon": float(lon),
+                     "severity": sev, "sourceUrl": p.get("@id") or p.get("id"), "raw": p},
+                    shp if shp.geom_type != "Point" else None))
+    return out
+
+def _eonet_updates_with_geoms(fc: Dict[str, Any]) -> list[Tuple[Dict[str, Any], Any]]:
+    out: list[Tuple[Dict[str, Any], Any]] = []
+    for f in (fc.get("features") or []):
+        u = _eonet_to_update(f)
+        if not u:
+            continue
+        shp = to_shape(f.get("geometry"))
+        out.append((u, shp if shp is not None and shp.geom_type != "Point" else None))
     return out
 
-async def global_updates(limit: int, max_age_hours: Optional[int]):
-    from ..data.store import get_feature_collection
-    fc = get_feature_collection()
-    reports = fc.get("features") or []
-    rep_updates = [_report_to_update(f) for f in reports]
-    feeds = await _gather_feeds()
-    nws_updates = _nws_to_updates(feeds["nws"])
-    quake_updates = [_ for f in (feeds["usgs"].get("features") or []) if (_ := _quake_to_update(f))]
-    eonet_updates = [_ for f in (feeds["eonet"].get("features") or []) if (_ := _eonet_to_update(f))]
-    firms_updates = [_ for f in (feeds["firms"].get("features") or []) if (_ := _firms_to_update(f))]
-
-    updates = rep_updates + nws_updates + quake_updates + eonet_updates + firms_updates
+async def _fetch_nws_with_zones() -> Dict[str, Any]:
+    fc = await fetch_nws_alerts_geojson()
+    try:
+        return await fill_zone_geometries(fc)
+    except Exception:
+        return fc  # zone lookups are best-effort; alerts with real geometry are unaffected
+
+def _report_update_row(f: Dict[str, Any]) -> Tuple[str, Optional[float], bytes]:
+    """(time, parsed time, encoded update) for a report; cached per report by the store."""
+    u = _report_to_update(f)
+    return u["time"] or "", _parse_ts(u["time"]), codec.dumps(u)
+
+async def global_updates(limit: int, max_age_hours: Optional[int], collapse: bool = True) -> bytes:
+    """
+    JSON bytes for {"count", "updates"}: all reports (one per incident with collapse) + all feed
+    events, newest first.
+    """
+    snaps = await _gather_snapshots()
+    return await asyncio.to_thread(global_updates_body, snaps, limit, max_age_hours, collapse)
+
+async def global_updates_source(limit: int, max_age_hours: Optional[int],
+                                collapse: bool = True) -> Tuple[Hashable, Callable[[], bytes]]:
+    """
+    (version, build) for the global updates body. The body only changes with the reports' data
+    version, a feed snapshot or, with max_age_hours, the cutoff (bucketed to the minute).
+    """
+    from ..data.store import data_version
+    snaps = await _gather_snapshots()
+    reports = await asyncio.to_thread(data_version)
+    version: Tuple[Any, ...] = ("updates", limit, max_age_hours, collapse, reports,
+                                tuple((s.name, s.fetched_at) for s in snaps))
     if max_age_hours is not None:
-        updates = [u for u in updates if _is_recent(u["time"], max_age_hours)]
-    updates.sort(key=lambda x: x["time"] or "", reverse=True)
-    return {"count": min(len(updates), limit), "updates": updates[:limit]}
+        version += (int(time.time()) // 60,)
+    return version, lambda: global_updates_body(snaps, limit, max_age_hours, collapse)
 
-async def eonet_geojson_points() -> Dict[str, Any]:
+def global_updates_body(snaps: List[FeedSnapshot], limit: int, max_age_hours: Optional[int],
+                        collapse: bool = True) -> bytes:
+    """Blocking part of global_updates: report rows are encoded once per report and reused."""
+    from ..data.store import get_report_updates
+    cutoff = time.time() - max_age_hours * 3600 if max_age_hours is not None else None
+    rows: List[Tuple[str, bytes]] = []
+    with metrics.timed("updates_stage_seconds", scope="global", stage="reports_encode"):
+        for t, ts, b in get_report_updates(_report_update_row, collapse):
+            if cutoff is not None and not _fresh(ts, cutoff):
+                continue
+            rows.append((t, b))
+    with metrics.timed("updates_stage_seconds", scope="global", stage="feed_scan"):
+        for snap in snaps:
+            for t, b, ts in zip(snap.times, snap.encoded_updates, snap.ts):
+                if cutoff is not None and not _fresh(ts, cutoff):
+                    continue
+                rows.append((t, b))
+    with metrics.timed("updates_stage_seconds", scope="global", stage="assemble"):
+        return _updates_body(rows, limit)
+
+def _eonet_points(fc: Dict[str, Any]) -> Dict[str, Any]:
     """Always return Point features for EONET (polygon events -> centroid)."""
-    fc = await fetch_eonet_events_geojson() or {}
     features = []
     for f in (fc.get("features") or []):
         g = f.get("geometry") or {}
@@ -218,9 +448,8 @@ async def eonet_geojson_points() -> Dict[str, Any]:
         features.append(_mk_point_feature(lon, lat, props))
     return {"type": "FeatureCollection", "features": features}
 
-async def firms_geojson_points() -> Dict[str, Any]:
+def _firms_points(fc: Dict[str, Any]) -> Dict[str, Any]:
     """Always return Point features for FIRMS (skip invalid rows)."""
-    fc = await fetch_firms_hotspots_geojson() or {}
     features = []
     for f in (fc.get("features") or []):
         g = f.get("geometry") or {}
@@ -241,3 +470,9 @@ async def firms_geojson_points() -> Dict[str, Any]:
         }
         features.append(_mk_point_feature(lon, lat, props))
     return {"type": "FeatureCollection", "features": features}
+
+async def eonet_geojson_points() -> Dict[str, Any]:
+    return codec.loads((await get_snapshot("eonet")).encoded)
+
+async def firms_geojson_points() -> Dict[str, Any]:
+    return codec.loads((await get_snapshot("firms")).encoded)
@@ -0,0 +1,140 @@
+"""
+Cross-worker feed snapshots (FEED_SHARED=1).
+
+Every worker runs ingest_loop(); whichever one holds an exclusive flock on
+FEED_SHARED_DIR/ingest.lock is the ingestion owner. The owner fetches each feed once per
+FEED_TTL_SECONDS, builds the snapshot and publishes it as FEED_SHARED_DIR/<feed>.snap
+(data/snapfile.py, replaced atomically). All workers, the owner included, serve from a
+read-only mmap of the newest file, so N workers share one copy in the page cache and one
+upstream fetch schedule. If the owner dies its lock is released and another worker takes over.
+"""
+from __future__ import annotations
+import asyncio, fcntl, logging, math, os, time
+from pathlib import Path
+from typing import Dict, IO, Optional, Tuple
+
+from shapely import from_wkb
+
+from ..config.settings import settings
+from .. import metrics
+from ..data import snapfile
+from .feeds import FEED_NAMES, FeedSnapshot, _feed_specs, build_snapshot, record_rollups
+from .geoindex import GeomIndex
+from . import geofence
+
+log = logging.getLogger(__name__)
+
+# feed -> (generation key on disk, snapshot view over it)
+_MAPPED: Dict[str, Tuple[Tuple[int, int], FeedSnapshot]] = {}
+# owner only: feed -> time of the last failed fetch, so a dead upstream is retried once per
+# FEED_RETRY_SECONDS
+_FAILED_AT: Dict[str, float] = {}
+# readers wait for a first publish only within FEED_SHARED_WAIT_SECONDS of this process starting
+_STARTED = time.monotonic()
+
+def _dir() -> Path:
+    d = Path(settings.FEED_SHARED_DIR)
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+def _path(name: str) -> Path:
+    return _dir() / f"{name}.snap"
+
+def publish(snap: FeedSnapshot) -> None:
+    geoms = [b""] * len(snap)
+    if snap.index is not None:
+        for i, g in snap.index.items():
+            geoms[i] = g.wkb
+    snapfile.write(
+        _path(snap.name), fetched_at=snap.fetched_at, lats=snap.lats, lons=snap.lons,
+        ts=[math.nan if t is None else t for t in snap.ts],
+        times=[t.encode() for t in snap.times], keys=[k.encode() for k in snap.keys],
+        items=snap.encoded_updates,
+        geoms=geoms, payload=snap.encoded,
+    )
+
+def _from_file(name: str, f: snapfile.SnapshotFile) -> FeedSnapshot:
+    index = None
+    if any(len(g) for g in f.geoms):
+        index = GeomIndex([from_wkb(bytes(g)) if len(g) else None for g in f.geoms])
+    return FeedSnapshot(name=name, fetched_at=f.fetched_at, encoded=f.payload,
+                        encoded_updates=f.items, times=f.times, lats=f.lat, lons=f.lon, ts=f.ts,
+                        keys=f.keys, index=index)
+
+def load_published(name: str) -> Optional[FeedSnapshot]:
+    """Newest published snapshot for `name`, remapped only when the file on disk was replaced."""
+    path = _path(name)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    cached = _MAPPED.get(name)
+    if cached and cached[0] == (st.st_ino, st.st_mtime_ns):
+        return cached[1]
+    f = snapfile.SnapshotFile(path)
+    snap = _from_file(name, f)
+    _MAPPED[name] = (f.key, snap)
+    geofence.on_feed_snapshot(snap)
+    metrics.inc("feed_snapshot_remaps_total", feed=name)
+    return snap
+
+def startup_grace() -> float:
+    """Seconds left of the startup window in which a missing snapshot is waited for."""
+    return max(0.0, settings.FEED_SHARED_WAIT_SECONDS - (time.monotonic() - _STARTED))
+
+async def wait_published(name: str, timeout: float) -> Optional[FeedSnapshot]:
+    deadline = time.monotonic() + timeout
+    while (snap := load_published(name)) is None and time.monotonic() < deadline:
+        await asyncio.sleep(0.25)
+    return snap
+
+def _try_lock() -> Optional[IO]:
+    fh = open(_dir() / "ingest.lock", "a+")
+    try:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fh.close()
+        return None
+    fh.seek(0)
+    fh.truncate()
+    fh.write(str(os.getpid()))
+    fh.flush()
+    return fh
+
+async def _refresh(name: str) -> None:
+    now = time.time()
+    fetched = snapfile.peek_fetched_at(_path(name))
+    if fetched is not None and now - fetched < settings.FEED_TTL_SECONDS:
+        return
+    if now - _FAILED_AT.get(name, 0.0) < settings.FEED_RETRY_SECONDS:
+        return
+    try:
+        raw = await _feed_specs()[name][0]()
+        snap = await asyncio.to_thread(build_snapshot, name, raw)
+        await asyncio.to_thread(publish, snap)
+    except Exception as e:
+        _FAILED_AT[name] = now
+        log.warning("feed %s refresh failed, keeping the published snapshot: %r", name, e)
+        return
+    _FAILED_AT.pop(name, None)
+    await record_rollups(snap)  # only the owner counts, readers just map the file
+
+async def ingest_loop(poll_seconds: float = 1.0, takeover_seconds: float = 5.0) -> None:
+    """Try to become the ingestion owner; once owner, keep every feed within FEED_TTL_SECONDS."""
+    lock: Optional[IO] = None
+    owner = metrics.gauge("feed_ingest_owner",
+                          "1 if this worker fetches upstream feeds for all workers")
+    owner.set(0)
+    try:
+        while True:
+            if lock is None:
+                lock = _try_lock()
+                if lock is not None:
+                    log.info("pid %d is now the feed ingestion owner", os.getpid())
+                    owner.set(1)
+            if lock is not None:
+                await asyncio.gather(*(_refresh(n) for n in FEED_NAMES))
+            await asyncio.sleep(poll_seconds if lock is not None else takeover_seconds)
+    finally:
+        if lock is not None:
+            lock.close()
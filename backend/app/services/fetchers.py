@@ -4,11 +4,15 @@ import asyncio
 import random
 import httpx
 
-
-# Keep URLs simple & stable; you can lift to config/env later.
-USGS_ALL_HOUR = "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/all_hour.geojson"
-NWS_ALERTS_ACTIVE = "https://api.weather.gov/alerts/active"
-EONET_EVENTS_GEOJSON = "https://eonet.gsfc.nasa.gov/api/v3/events/geojson?status=open&days=7"
+from ..config.settings import settings
+from ..metrics import timed
+from ..singleflight import coalesce
+
+# Upstream URLs live in settings so load tests can point them at a local stub.
+# Concurrent callers of one fetcher share the request already in flight (@coalesce).
+USGS_ALL_HOUR = settings.USGS_URL
+NWS_ALERTS_ACTIVE = settings.NWS_ALERTS_URL
+EONET_EVENTS_GEOJSON = settings.EONET_URL
 DATASETS = ["VIIRS_NOAA20_NRT", "VIIRS_SNPP_NRT"]
 
 
@@ -47,18 +51,24 @@ async def fetch_json_once(
         r.raise_for_status()
         return r.json()
 
+@coalesce("upstream_fetch")
+@timed("upstream_fetch_seconds", feed="usgs")
 async def fetch_usgs_quakes_geojson():
     async with httpx.AsyncClient(timeout=10) as client:
         r = await client.get(USGS_ALL_HOUR, headers={"Accept":"application/geo+json"})
         r.raise_for_status()
         return r.json()
 
+@coalesce("upstream_fetch")
+@timed("upstream_fetch_seconds", feed="nws")
 async def fetch_nws_alerts_geojson():
     async with httpx.AsyncClient(timeout=10) as client:
         r = await client.get(NWS_ALERTS_ACTIVE, headers={"Accept":"application/geo+json"})
         r.raise_for_status()
         return r.json()
 
+@coalesce("upstream_fetch")
+@timed("upstream_fetch_seconds", feed="eonet")
 async def fetch_eonet_events_geojson():
     return await fetch_json_once(
         EONET_EVENTS_GEOJSON,
@@ -77,7 +87,7 @@ def _get_num(d: dict, *keys):
     raise KeyError("no numeric value")
 
 async def _fetch_firms_csv_rows(key: str, dataset: str, hours: int = 1) -> list[dict]:
-    url = f"https://firms.modaps.eosdis.nasa.gov/api/area/csv/{key}/{dataset}/world/{hours}"
+    url = f"{settings.FIRMS_API_BASE}/{key}/{dataset}/world/{hours}"
     async with httpx.AsyncClient(timeout=20) as client:
         r = await client.get(url, headers={"Accept": "text/csv", "User-Agent": "PulseMap/1.0"})
         text = r.text or ""
@@ -100,6 +110,8 @@ async def _fetch_firms_csv_rows(key: str, dataset: str, hours: int = 1) -> list[
 
     return rows
 
+@coalesce("upstream_fetch")
+@timed("upstream_fetch_seconds", feed="firms")
 async def fetch_firms_hotspots_geojson():
     """
     NASA FIRMS: returns GeoJSON FeatureCollection (Points).
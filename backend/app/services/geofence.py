@@ -0,0 +1,279 @@
+"""
+Server-side watch areas for proximity alerts.
+
+A client registers a circle (center + radius) or a polygon once (POST /watch) and then polls
+GET /watch/{id}, which only drains what is new for it. Watches sit in an STRtree over their
+bounding boxes; each new report, and each row a feed refresh adds, is matched against all
+watches with one bulk tree query plus exact tests on the candidates. Every watch keeps a
+bounded queue keyed by event, so an event is delivered once even if it is published again.
+
+Watches live in process memory. With several uvicorn workers, route a client's polls to the
+worker that created its watch (sticky sessions), or re-register on 404.
+"""
+from __future__ import annotations
+import asyncio, math, threading, time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, TYPE_CHECKING
+from uuid import uuid4
+
+from shapely import STRtree
+from shapely.geometry import Point
+from shapely.geometry.base import BaseGeometry
+from shapely.prepared import prep
+
+from ..config.settings import settings
+from .. import admission, metrics
+from ..data import codec
+from ..data.geo import haversine_km
+from .geoindex import bbox_around, to_shape, within_km
+
+if TYPE_CHECKING:
+    from .feeds import FeedSnapshot
+
+@dataclass
+class Event:
+    key: str                             # dedup key: "incident:<id>", "report:<rid>" or
+                                         # "<feed>:<upstream id>" (FeedSnapshot.key)
+    time: str                            # sort key, as in /updates
+    ts: Optional[float]                  # epoch seconds, None if unknown
+    lat: float
+    lon: float
+    area: Optional[BaseGeometry]         # NWS/EONET polygon, None for point events
+    encoded: bytes                       # the /updates row
+
+@dataclass
+class Watch:
+    id: str
+    lat: float                           # center (circle) or bounding-circle center (polygon)
+    lon: float
+    radius_km: float
+    polygon: Optional[BaseGeometry]
+    max_age_hours: int
+    last_seen: float = field(default_factory=time.monotonic)
+    queue: "OrderedDict[str, Tuple[str, bytes]]" = field(default_factory=OrderedDict)
+    delivered: "OrderedDict[str, None]" = field(default_factory=OrderedDict)
+
+    def __post_init__(self) -> None:
+        self._prepared = prep(self.polygon) if self.polygon is not None else None
+
+    @property
+    def envelope(self) -> BaseGeometry:
+        if self.polygon is not None:
+            return self.polygon
+        return bbox_around(self.lat, self.lon, self.radius_km)
+
+    def matches(self, ev: Event, now: float) -> bool:
+        if ev.ts is None or not ev.ts >= now - self.max_age_hours * 3600:
+            return False
+        if self._prepared is not None:
+            if ev.area is not None:
+                return self._prepared.intersects(ev.area)
+            return self._prepared.covers(Point(ev.lon, ev.lat))
+        if ev.area is not None:
+            return within_km(ev.area, self.lat, self.lon, self.radius_km)
+        return haversine_km((self.lat, self.lon), (ev.lat, ev.lon)) <= self.radius_km
+
+    def offer(self, ev: Event) -> bool:
+        """Queue ev unless this watch already has it queued or delivered."""
+        if ev.key in self.queue or ev.key in self.delivered:
+            return False
+        self.queue[ev.key] = (ev.time, ev.encoded)
+        while len(self.queue) > settings.WATCH_QUEUE_MAX:
+            self.queue.popitem(last=False)  # oldest undelivered first
+        return True
+
+    def drain(self, limit: int) -> List[Tuple[str, bytes]]:
+        rows = sorted(self.queue.items(), key=lambda kv: kv[1][0], reverse=True)[:max(1, limit)]
+        for key, _ in rows:
+            del self.queue[key]
+            self.delivered[key] = None
+        while len(self.delivered) > 4 * settings.WATCH_QUEUE_MAX:
+            self.delivered.popitem(last=False)
+        self.last_seen = time.monotonic()
+        return [v for _, v in rows]
+
+class GeofenceEngine:
+    def __init__(self) -> None:
+        self._watches: Dict[str, Watch] = {}
+        self._lock = threading.Lock()
+        self._tree: Optional[STRtree] = None
+        self._tree_ids: List[str] = []
+        self._dirty = False
+        self._swept = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._watches)
+
+    def _check_room(self) -> None:
+        """Raise admission.Overloaded while WATCH_MAX_ACTIVE watches are live (lock held)."""
+        if len(self._watches) >= settings.WATCH_MAX_ACTIVE:
+            self._sweep(force=True)
+        if len(self._watches) >= settings.WATCH_MAX_ACTIVE:
+            oldest = min(w.last_seen for w in self._watches.values())
+            wait = oldest + settings.WATCH_TTL_SECONDS - time.monotonic()
+            raise admission.Overloaded("watch", max(1, math.ceil(wait)))
+
+    def check_room(self) -> None:
+        with self._lock:
+            self._check_room()
+
+    def add(self, w: Watch) -> None:
+        with self._lock:
+            self._check_room()
+            self._watches[w.id] = w
+            self._dirty = True
+            self._sweep()
+        metrics.gauge("watches_active", "Registered geofence watches").set(len(self._watches))
+
+    def remove(self, wid: str) -> bool:
+        with self._lock:
+            found = self._watches.pop(wid, None) is not None
+            self._dirty = self._dirty or found
+        metrics.gauge("watches_active", "Registered geofence watches").set(len(self._watches))
+        return found
+
+    def get(self, wid: str) -> Optional[Watch]:
+        return self._watches.get(wid)
+
+    def drain(self, w: Watch, limit: int) -> List[Tuple[str, bytes]]:
+        with self._lock:
+            return w.drain(limit)
+
+    def _sweep(self, force: bool = False) -> None:
+        """Drop watches nobody has polled for WATCH_TTL_SECONDS (called with the lock held)."""
+        now = time.monotonic()
+        if not force and now - self._swept < 30:
+            return
+        self._swept = now
+        stale = [wid for wid, w in self._watches.items()
+                 if now - w.last_seen > settings.WATCH_TTL_SECONDS]
+        for wid in stale:
+            del self._watches[wid]
+        self._dirty = self._dirty or bool(stale)
+
+    def _index(self) -> Optional[STRtree]:
+        if self._dirty:
+            self._tree_ids = list(self._watches)
+            envelopes = [self._watches[w].envelope for w in self._tree_ids]
+            self._tree = STRtree(envelopes) if envelopes else None
+            self._dirty = False
+        return self._tree
+
+    def publish(self, events: List[Event]) -> int:
+        """Match a batch of events against every watch; returns how many matches were queued."""
+        if not events or not self._watches:
+            return 0
+        now = time.time()
+        queued = 0
+        with metrics.timed("geofence_match_seconds"), self._lock:
+            self._sweep()
+            tree = self._index()
+            if tree is None:
+                return 0
+            geoms = [ev.area if ev.area is not None else Point(ev.lon, ev.lat) for ev in events]
+            ev_idx, w_idx = tree.query(geoms, predicate="intersects")
+            for e, k in zip(ev_idx.tolist(), w_idx.tolist()):
+                w = self._watches.get(self._tree_ids[k])
+                if w is not None and w.matches(events[e], now) and w.offer(events[e]):
+                    queued += 1
+        metrics.inc("watch_matches_total", queued)
+        return queued
+
+ENGINE = GeofenceEngine()
+
+# feed -> event keys in the last snapshot seen, so a refresh only publishes rows it added
+_FEED_KEYS: Dict[str, Set[str]] = {}
+
+def _feed_events(snap: "FeedSnapshot", positions: Iterable[int]) -> List[Event]:
+    areas = dict(snap.index.items()) if snap.index is not None else {}
+    out: List[Event] = []
+    for i in positions:
+        ts = snap.ts[i]
+        # bytes() so a queued row doesn't pin a replaced mmap'd snapshot file
+        out.append(Event(key=snap.key(i), time=snap.times[i],
+                         # NaN marks unknown in mapped files
+                         ts=None if ts is None or ts != ts else ts,
+                         lat=snap.lats[i], lon=snap.lons[i], area=areas.get(i),
+                         encoded=bytes(snap.encoded_updates[i])))
+    return out
+
+def on_feed_snapshot(snap: "FeedSnapshot") -> None:
+    """Publish rows that were not in the previous snapshot of this feed."""
+    keys = [snap.key(i) for i in range(len(snap))]
+    prev = _FEED_KEYS.get(snap.name)
+    _FEED_KEYS[snap.name] = set(keys)
+    if not len(ENGINE):
+        return
+    fresh = (i for i, k in enumerate(keys) if prev is None or k not in prev)
+    ENGINE.publish(_feed_events(snap, fresh))
+
+def _report_event(feature: Dict[str, Any]) -> Event:
+    from .feeds import _report_to_update, _parse_ts
+    u = _report_to_update(feature)
+    iid = u["raw"].get("incident_id")
+    # one alert per incident, not one per duplicate report of it
+    key = f"incident:{iid}" if iid else f"report:{u['rid']}"
+    return Event(key=key, time=u["time"] or "", ts=_parse_ts(u["time"]),
+                 lat=u["lat"], lon=u["lon"], area=None, encoded=codec.dumps(u))
+
+def on_report(feature: Dict[str, Any]) -> None:
+    ENGINE.publish([_report_event(feature)])
+
+def _body(w: Watch, rows: List[Tuple[str, bytes]]) -> bytes:
+    return (b'{"id":' + codec.dumps(w.id) + b',"count":' + str(len(rows)).encode()
+            + b',"pending":' + str(len(w.queue)).encode()
+            + b',"updates":' + codec.join_array(b for _, b in rows) + b"}")
+
+def parse_area(lat: Optional[float], lon: Optional[float], radius_miles: Optional[float],
+               polygon: Optional[Dict[str, Any]],
+               ) -> Tuple[float, float, float, Optional[BaseGeometry]]:
+    """(lat, lon, radius_km, polygon) for a watch; raises ValueError on bad input."""
+    max_miles = settings.WATCH_MAX_RADIUS_KM / 1.609344
+    if polygon is not None:
+        g = to_shape(polygon)
+        if g is None or g.geom_type not in ("Polygon", "MultiPolygon"):
+            raise ValueError("polygon must be a GeoJSON Polygon or MultiPolygon")
+        c = g.centroid
+        minx, miny, maxx, maxy = g.bounds
+        corners = ((minx, miny), (minx, maxy), (maxx, miny), (maxx, maxy))
+        r = max(haversine_km((c.y, c.x), (y, x)) for x, y in corners)
+        if r > settings.WATCH_MAX_RADIUS_KM:
+            raise ValueError(f"polygon must fit within {max_miles:.0f} miles of its center")
+        return c.y, c.x, r, g
+    if lat is None or lon is None:
+        raise ValueError("lat/lon or polygon required")
+    km = float(radius_miles if radius_miles is not None else 2.0) * 1.609344
+    if not (0 < km <= settings.WATCH_MAX_RADIUS_KM):
+        raise ValueError(f"radius must be in (0, {max_miles:.0f}] miles")
+    return float(lat), float(lon), km, None
+
+async def subscribe(lat: float, lon: float, radius_km: float, polygon: Optional[BaseGeometry],
+                    max_age_hours: int, limit: int) -> bytes:
+    """Register a watch, seed it with what already matches (one scan), return the first page."""
+    from .feeds import _gather_snapshots
+    from ..data.store import find_reports_near
+    ENGINE.check_room()  # before the scan; add() checks again
+    w = Watch(id=uuid4().hex, lat=lat, lon=lon, radius_km=radius_km, polygon=polygon,
+              max_age_hours=max_age_hours)
+    now = time.time()
+    near = await asyncio.to_thread(find_reports_near, lat, lon, radius_km=radius_km,
+                                   limit=settings.WATCH_QUEUE_MAX, max_age_hours=max_age_hours,
+                                   collapse=True)
+    seed = [_report_event(f) for f in near]
+    for snap in await _gather_snapshots():
+        seed += _feed_events(snap, snap.near(lat, lon, radius_km))
+    for ev in seed:
+        if w.matches(ev, now):
+            w.offer(ev)
+    ENGINE.add(w)
+    return _body(w, w.drain(limit))
+
+async def poll(wid: str, limit: int) -> Optional[bytes]:
+    """New matches for a watch (None if unknown or expired); refreshes feeds whose TTL ran out."""
+    from .feeds import _gather_snapshots
+    w = ENGINE.get(wid)
+    if w is None:
+        return None
+    await _gather_snapshots()  # cheap while fresh; an expired feed refresh publishes its new rows
+    return _body(w, ENGINE.drain(w, limit))
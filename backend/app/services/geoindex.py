@@ -0,0 +1,71 @@
+# apps/api/services/geoindex.py
+from __future__ import annotations
+from math import cos, radians
+from typing import Any, Dict, Iterator, Optional, Sequence, Set, Tuple
+from shapely import STRtree
+from shapely.geometry import Point, box, shape
+from shapely.geometry.base import BaseGeometry
+from shapely.ops import nearest_points
+
+from ..data.geo import haversine_km
+
+KM_PER_DEG_LAT = 111.32
+
+def to_shape(geom: Dict[str, Any] | None) -> Optional[BaseGeometry]:
+    """GeoJSON geometry -> valid shapely geometry (None if missing/unusable)."""
+    if not geom or not geom.get("type"):
+        return None
+    try:
+        g = shape(geom)
+        if not g.is_valid:
+            g = g.buffer(0)
+    except Exception:
+        return None
+    return None if g.is_empty else g
+
+def display_point(g: BaseGeometry) -> tuple[float, float]:
+    """(lat, lon) for a marker: the area centroid, or a point inside the shape if it lies outside."""
+    c = g.centroid
+    if g.geom_type in ("Polygon", "MultiPolygon") and not g.covers(c):
+        c = g.representative_point()
+    return (c.y, c.x)
+
+def bbox_around(lat: float, lon: float, radius_km: float) -> BaseGeometry:
+    """Lon/lat box that contains every point within radius_km of (lat, lon)."""
+    dlat = radius_km / KM_PER_DEG_LAT
+    dlon = radius_km / (KM_PER_DEG_LAT * max(cos(radians(lat)), 0.01))
+    return box(lon - dlon, lat - dlat, lon + dlon, lat + dlat)
+
+def within_km(g: BaseGeometry, lat: float, lon: float, radius_km: float) -> bool:
+    """True if g covers (lat, lon) or its nearest point is within radius_km."""
+    pt = Point(lon, lat)
+    if g.covers(pt):
+        return True
+    _, q = nearest_points(pt, g)
+    return haversine_km((lat, lon), (q.y, q.x)) <= radius_km
+
+class GeomIndex:
+    """
+    STRtree over the geometries of one feed snapshot.
+    Positions refer to the snapshot's update list; entries without a geometry are not indexed.
+    """
+    def __init__(self, geoms: Sequence[Optional[BaseGeometry]]):
+        self._pos = [i for i, g in enumerate(geoms) if g is not None]
+        self._geoms = [geoms[i] for i in self._pos]
+        self._tree = STRtree(self._geoms) if self._geoms else None
+        self.positions: frozenset[int] = frozenset(self._pos)
+
+    def __len__(self) -> int:
+        return len(self._geoms)
+
+    def items(self) -> Iterator[Tuple[int, BaseGeometry]]:
+        """(position, geometry) for every indexed entry."""
+        return zip(self._pos, self._geoms)
+
+    def near(self, lat: float, lon: float, radius_km: float) -> Set[int]:
+        """Positions whose geometry covers (lat, lon) or lies within radius_km of it."""
+        if self._tree is None:
+            return set()
+        # one bbox query for all candidates, then exact tests only on those
+        cand = self._tree.query(bbox_around(lat, lon, radius_km), predicate="intersects")
+        return {self._pos[k] for k in cand if within_km(self._geoms[k], lat, lon, radius_km)}
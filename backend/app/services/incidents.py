@@ -0,0 +1,68 @@
+# apps/api/services/incidents.py
+"""
+Incident consolidation for duplicate user reports.
+
+During a real event many people report the same flood or crash. A classified report joins the
+nearest incident of its category within INCIDENT_RADIUS_KM that received a report in the last
+INCIDENT_WINDOW_MINUTES (a grid-cell lookup done in the insert transaction, see
+store.add_report), or opens a new one. /reports and /updates then list one report per
+incident, the newest, whose props carry incident_id and incident_reports, and /incidents
+serves the incident layer itself.
+"""
+from __future__ import annotations
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from ..config.settings import settings
+from ..data import codec
+from ..data.store import find_incidents, get_incident
+
+# requests for help and unclassified text are individual by nature, never merge them
+_NEVER_MERGE = ("help.", "other.")
+
+def incident_key(props: Dict[str, Any]) -> Optional[Tuple[str, float, int]]:
+    """(category, radius_km, window_minutes) to consolidate a report with these props, or None."""
+    if settings.INCIDENT_RADIUS_KM <= 0 or settings.INCIDENT_WINDOW_MINUTES <= 0:
+        return None
+    cat = props.get("category")
+    if not cat or cat.startswith(_NEVER_MERGE):
+        return None
+    return cat, settings.INCIDENT_RADIUS_KM, settings.INCIDENT_WINDOW_MINUTES
+
+def _feature(row: tuple, open_since: str) -> Dict[str, Any]:
+    iid, category, title, emoji, lat, lon, first_at, last_at, count, last_rid = row
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": {
+            "type": "incident", "incident_id": str(iid), "category": category,
+            "title": title or "Incident", "emoji": emoji, "report_count": count,
+            "first_at": first_at, "last_at": last_at,
+            "latest_rid": str(last_rid) if last_rid is not None else None,
+            "open": last_at >= open_since,  # still collecting reports
+        },
+    }
+
+def _open_since() -> str:
+    since = datetime.now(timezone.utc) - timedelta(minutes=settings.INCIDENT_WINDOW_MINUTES)
+    return since.isoformat()
+
+def list_incidents(bbox: Optional[Tuple[float, float, float, float]], category: Optional[str],
+                   max_age_hours: Optional[int], limit: int) -> bytes:
+    """FeatureCollection bytes of incident points, most recently updated first."""
+    since = None
+    if max_age_hours is not None:
+        since = (datetime.now(timezone.utc) - timedelta(hours=int(max_age_hours))).isoformat()
+    open_since = _open_since()
+    rows = find_incidents(bbox, category, since, limit)
+    return codec.feature_collection(codec.dumps(_feature(r, open_since)) for r in rows)
+
+def incident_detail(iid: int, limit: int) -> Optional[Dict[str, Any]]:
+    """The incident Feature with its newest `limit` reports under properties.reports."""
+    found = get_incident(iid, limit)
+    if found is None:
+        return None
+    row, reports = found
+    feat = _feature(row, _open_since())
+    feat["properties"]["reports"] = reports
+    return feat
@@ -53,4 +53,13 @@ async def get_many(ids: List[str], session_id: str):
                     "cleared": session_id in b["clear"],
                 },
             }
-    return out
\ No newline at end of file
+    return out
+
+async def prune(ids: List[str]) -> int:
+    """Drop reaction buckets for reports that no longer exist (archived/cleared)."""
+    n = 0
+    async with _LOCK:
+        for rid in ids:
+            if _REACTIONS.pop(rid, None) is not None:
+                n += 1
+    return n
@@ -1,9 +1,15 @@
 from typing import Dict, Any, List, Optional
 from ..data.store import add_report as _add, find_reports_near as _find
+from . import geofence
+from .incidents import incident_key
 
 def add_report(lat: float, lon: float, text: str, props: dict | None = None) -> Dict[str, Any]:
-    return _add(lat, lon, text, props)
+    # duplicates of an ongoing event join its incident instead of standing alone
+    feature = _add(lat, lon, text, props, incident=incident_key(props or {}))
+    geofence.on_report(feature)  # queue it for every watch area it falls in
+    return feature
 
 def find_reports_near(lat: float, lon: float, radius_km: float, limit: int,
-                      max_age_hours: Optional[int] = None) -> List[Dict[str, Any]]:
-    return _find(lat, lon, radius_km, limit, max_age_hours=max_age_hours)
+                      max_age_hours: Optional[int] = None,
+                      collapse: bool = False) -> List[Dict[str, Any]]:
+    return _find(lat, lon, radius_km, limit, max_age_hours=max_age_hours, collapse=collapse)
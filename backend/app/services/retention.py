@@ -0,0 +1,53 @@
+# apps/api/services/retention.py
+"""
+Retention pass for the reports table.
+
+Every RETENTION_INTERVAL_SECONDS, reports older than RETENTION_HOURS are moved into
+ARCHIVE_DB in batches, their cached encodings and reactions are dropped, and freed pages
+are returned with an incremental VACUUM (SQLite files created before auto_vacuum=INCREMENTAL
+need a one-off `cli vacuum-reports` first). Query paths only look at the last MAX_AGE_HOURS,
+so the hot table only needs to hold a little more than that. Activity rollups outlive the
+reports they count and are dropped after ROLLUP_RETENTION_DAYS.
+"""
+from __future__ import annotations
+import asyncio, logging
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List
+
+from ..config.settings import settings
+from ..data.store import archive_reports_before, incremental_vacuum
+from . import reactions, rollups
+
+log = logging.getLogger(__name__)
+
+def _archive_all(cutoff_iso: str) -> List[int]:
+    moved: List[int] = []
+    while True:
+        ids = archive_reports_before(cutoff_iso, str(settings.ARCHIVE_DB), settings.RETENTION_BATCH)
+        if not ids:
+            return moved
+        moved.extend(ids)
+
+async def run_retention_once(retention_hours: int | None = None) -> Dict[str, Any]:
+    hours = settings.RETENTION_HOURS if retention_hours is None else retention_hours
+    # never archive rows the live query paths can still return
+    hours = max(hours, settings.MAX_AGE_HOURS)
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+    moved = await asyncio.to_thread(_archive_all, cutoff)
+    pruned = await reactions.prune([str(i) for i in moved])
+    rollup_rows = await asyncio.to_thread(rollups.prune)
+    free_pages = await asyncio.to_thread(incremental_vacuum)
+    return {"archived": len(moved), "reactions_pruned": pruned, "rollups_pruned": rollup_rows,
+            "free_pages": free_pages, "cutoff": cutoff}
+
+async def retention_loop() -> None:
+    while True:
+        try:
+            res = await run_retention_once()
+            if res["archived"]:
+                log.info("retention: %s", res)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("retention pass failed")
+        await asyncio.sleep(settings.RETENTION_INTERVAL_SECONDS)
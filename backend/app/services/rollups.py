@@ -0,0 +1,114 @@
+# apps/api/services/rollups.py
+"""
+Hourly activity rollups for /updates/timeline.
+
+Counts per (hour, grid cell, source, category) live in the reports DB (store.rollups). Reports are
+counted in the transaction that inserts them; feed rows are counted once when a refresh first sees
+them, keyed on their upstream id (store.rollup_events remembers counted keys for
+ROLLUP_EVENT_KEY_HOURS, so repeated refreshes and several workers don't double count; rows older
+than that are not counted at all). A timeline then sums a few rollup rows per cell and hour
+instead of rescanning reports and feed snapshots, so its cost does not grow with the event count.
+Cells are ROLLUP_CELL_DEG degrees square, so a bbox is widened to the cells it touches.
+"""
+from __future__ import annotations
+import math, re
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Iterator, Optional, Tuple, TYPE_CHECKING
+
+from ..config.settings import settings
+from ..data import codec
+from ..data.store import ROLLUP_CELL_DEG, prune_rollups, record_feed_events, rollup_counts
+
+if TYPE_CHECKING:
+    from .feeds import FeedSnapshot
+
+_NAMED_BUCKETS = {"hour": 1, "day": 24, "week": 24 * 7}
+MAX_BUCKETS = 2000
+
+def _feed_category(name: str, row: bytes) -> str:
+    if name == "usgs":
+        return "earthquake"
+    if name == "firms":
+        return "wildfire"
+    u = codec.loads(row)
+    if name == "nws":
+        return u.get("title") or "NWS Alert"
+    raw = u.get("raw") or {}
+    cat = raw.get("category") or (raw.get("categories") or [{}])[0].get("title")
+    return str(cat or "other").lower()
+
+def _snapshot_events(snap: "FeedSnapshot",
+                     keep_hours: int) -> Iterator[Tuple[str, float, float, int, str, str]]:
+    # record_feed_events forgets keys older than keep_hours in the same call, so an older row
+    # would be counted again on every refresh
+    min_hour = int(datetime.now(timezone.utc).timestamp()) // 3600 - keep_hours
+    for i in range(len(snap)):
+        ts = snap.ts[i]
+        if ts is None or ts != ts:  # unknown time (NaN in mapped files) has no bucket
+            continue
+        if int(ts) // 3600 < min_hour:
+            continue
+        yield (snap.key(i), snap.lats[i], snap.lons[i], int(ts) // 3600,
+               snap.name, _feed_category(snap.name, bytes(snap.encoded_updates[i])))
+
+def record_snapshot(snap: "FeedSnapshot") -> int:
+    """Count the rows of a fresh snapshot that were not counted before; returns how many."""
+    keep = settings.ROLLUP_EVENT_KEY_HOURS
+    return record_feed_events(_snapshot_events(snap, keep), keep)
+
+def prune(now: Optional[datetime] = None) -> int:
+    now = now or datetime.now(timezone.utc)
+    before = now - timedelta(days=settings.ROLLUP_RETENTION_DAYS)
+    return prune_rollups(int(before.timestamp()) // 3600)
+
+def parse_bucket(bucket: str) -> int:
+    """'hour' | 'day' | 'week' | '<n>h' | '<n>d' -> hours per bucket; raises ValueError."""
+    b = bucket.strip().lower()
+    if b in _NAMED_BUCKETS:
+        return _NAMED_BUCKETS[b]
+    m = re.fullmatch(r"(\d+)\s*([hd])", b)
+    if not m or int(m.group(1)) < 1:
+        raise ValueError("bucket must be hour, day, week, <n>h or <n>d")
+    return int(m.group(1)) * (24 if m.group(2) == "d" else 1)
+
+def _iso_hour(hour: int) -> str:
+    return datetime.fromtimestamp(hour * 3600, tz=timezone.utc).isoformat()
+
+def timeline(bbox: Optional[Tuple[float, float, float, float]], start: datetime, end: datetime,
+             bucket_hours: int, source: Optional[str] = None,
+             category: Optional[str] = None) -> bytes:
+    """
+    JSON bytes: {from, to, bucket_hours, cell_deg, total, buckets: [{start, count, sources}],
+    categories: [{source, category, count}]}. Buckets are aligned to the epoch (days start at
+    00:00 UTC).
+    """
+    h0 = int(start.timestamp()) // 3600 // bucket_hours * bucket_hours
+    h1 = math.ceil(end.timestamp() / 3600)  # exclusive
+    n = max(1, -(-(h1 - h0) // bucket_hours))
+    if n > MAX_BUCKETS:
+        raise ValueError(f"range/bucket gives {n} buckets, max is {MAX_BUCKETS}")
+    cells = None
+    if bbox is not None:
+        minx, miny, maxx, maxy = bbox
+        cells = (math.floor(miny / ROLLUP_CELL_DEG), math.floor(maxy / ROLLUP_CELL_DEG),
+                 math.floor(minx / ROLLUP_CELL_DEG), math.floor(maxx / ROLLUP_CELL_DEG))
+
+    counts = [0] * n
+    sources: list[Dict[str, int]] = [{} for _ in range(n)]
+    cats: Dict[Tuple[str, str], int] = {}
+    for hour, src, cat, c in rollup_counts(h0, h0 + n * bucket_hours - 1, cells, source, category):
+        b = (hour - h0) // bucket_hours
+        counts[b] += c
+        sources[b][src] = sources[b].get(src, 0) + c
+        cats[(src, cat)] = cats.get((src, cat), 0) + c
+
+    out: Dict[str, Any] = {
+        "from": _iso_hour(h0), "to": _iso_hour(h0 + n * bucket_hours),
+        "bucket_hours": bucket_hours, "cell_deg": ROLLUP_CELL_DEG, "total": sum(counts),
+        "buckets": [{"start": _iso_hour(h0 + i * bucket_hours), "count": counts[i],
+                     "sources": sources[i]}
+                    for i in range(n)],
+        "categories": [{"source": s, "category": c, "count": k}
+                       for (s, c), k in sorted(cats.items(), key=lambda kv: -kv[1])],
+    }
+    return codec.dumps(out)
@@ -1,23 +1,35 @@
 # apps/api/services/tracts.py
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any, Tuple, List
-import geopandas as gpd
+from typing import Dict, Any, Tuple, List, TYPE_CHECKING
 from shapely.geometry import box, mapping
+from .. import metrics
+from ..singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    import geopandas as gpd
 
 BASE = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE / "census" 
 SHAPEFILE = DATA_DIR / "cb_2024_us_tract_500k.shp"
 
 _gdf: gpd.GeoDataFrame | None = None
+_version: str | None = None
+# a cold burst of /geo/tracts requests reads the national shapefile once, not once per request
+_LOAD = SingleFlight("tracts")
 
 def _ensure_loaded() -> None:
-    global _gdf
+    if _gdf is None:
+        _LOAD.do("shapefile", _load)
+
+def _load() -> None:
+    global _gdf, _version
     if _gdf is not None:
-        return
+        return  # loaded by a flight that finished after the caller's check
     if not SHAPEFILE.exists():
         raise FileNotFoundError(f"Tracts shapefile not found at {SHAPEFILE}")
 
+    import geopandas as gpd  # deferred: only tiles/all workers pay for the GIS stack
     gdf = gpd.read_file(SHAPEFILE).to_crs(epsg=4326)
     keep = [c for c in ("GEOID", "STATEFP", "NAME", "NAMELSAD") if c in gdf.columns]
     gdf = gdf[keep + ["geometry"]]
@@ -25,9 +37,20 @@ def _ensure_loaded() -> None:
     # optional: simplify a bit to reduce payload size
     gdf["geometry"] = gdf["geometry"].simplify(0.0005, preserve_topology=True)
 
-    # build spatial index lazily via gdf.sindex
-    _gdf = gdf
+    # build the spatial index inside the flight too; a lazy first gdf.sindex would race the same way
+    gdf.sindex
+    st = SHAPEFILE.stat()
+    _gdf, _version = gdf, f"{st.st_mtime_ns}-{st.st_size}"
+
+def warm() -> None:
+    """Load the shapefile and build the spatial index ahead of the first /geo/tracts request."""
+    _ensure_loaded()
+
+def data_version() -> str | None:
+    """Identity of the loaded tract data (None until loaded); keys cached /geo/tracts bodies."""
+    return _version
 
+@metrics.timed("tracts_query_seconds")
 def get_tracts_by_bbox(bbox: Tuple[float, float, float, float]) -> Dict[str, Any]:
     """
     bbox = (min_lon, min_lat, max_lon, max_lat)
@@ -40,7 +63,7 @@ def get_tracts_by_bbox(bbox: Tuple[float, float, float, float]) -> Dict[str, Any
     qpoly = box(minx, miny, maxx, maxy)
 
     # Use GeoPandas spatial index to get row indices (no identity headaches)
-    sindex = _gdf.sindex  # builds on first access
+    sindex = _gdf.sindex  # built by _load
     idx = list(sindex.query(qpoly, predicate="intersects"))
 
     feats: List[Dict[str, Any]] = []
@@ -59,4 +82,5 @@ def get_tracts_by_bbox(bbox: Tuple[float, float, float, float]) -> Dict[str, Any
             "properties": props
         })
 
+    metrics.observe("tracts_features", len(feats), buckets=metrics.COUNT_BUCKETS)
     return {"type": "FeatureCollection", "features": feats}
@@ -0,0 +1,217 @@
+# apps/api/services/uploads.py
+"""
+Photo upload pipeline.
+
+The multipart body is parsed as it arrives (python-multipart's streaming parser, not Starlette's
+form parsing, which spools the whole body before the route runs): the image part goes straight to
+a temp file in chunks (writes run off the event loop) and is hashed as it goes. A Content-Length
+over the limit is rejected before reading anything, and the upload is aborted as soon as the
+image passes MAX_UPLOAD_BYTES. Files are named by content hash, so re-uploads of the same image
+are free. Decoding/resizing runs in a process pool and produces an EXIF-stripped original, a WebP
+display copy and a WebP thumbnail.
+"""
+from __future__ import annotations
+import asyncio, hashlib, os, tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from ..config.settings import settings
+
+ALLOWED_EXT = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+
+class UploadTooLarge(Exception):
+    pass
+
+class InvalidImage(Exception):
+    pass
+
+class BadUpload(Exception):
+    """Not a multipart body with an image `file` part; the message is the 400 detail."""
+
+# boundaries and part headers allowed on top of MAX_UPLOAD_BYTES
+FRAMING_SLACK = 64 * 1024
+
+_POOL: Optional[ProcessPoolExecutor] = None
+
+def _pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _POOL
+
+def shutdown_pool() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+def variant_names(digest: str, ext: str) -> Dict[str, str]:
+    return {"original": f"{digest}{ext}", "display": f"{digest}.webp",
+            "thumb": f"{digest}_thumb.webp"}
+
+def _process_image(src: str, out_dir: str, digest: str, ext: str, display_px: int,
+                   thumb_px: int) -> None:
+    """Runs in a worker process: strip EXIF, write original + WebP variants."""
+    from PIL import Image, ImageOps
+
+    names = variant_names(digest, ext)
+    out = Path(out_dir)
+    try:
+        im = Image.open(src)
+        im.load()
+    except Exception as e:
+        raise InvalidImage(str(e))
+
+    def atomic_save(img, name: str, **kw) -> None:
+        # unique temp name: concurrent uploads of the same image must not share one
+        fd, tmp = tempfile.mkstemp(dir=out, prefix=f".{name}.")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                img.save(fh, **kw)
+            os.replace(tmp, out / name)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    animated = getattr(im, "is_animated", False)
+    if animated:
+        # keep animation intact; GIFs carry no EXIF
+        os.replace(src, out / names["original"])
+        frame = im.convert("RGBA")
+    else:
+        # apply the orientation tag, then re-encode without any metadata
+        frame = ImageOps.exif_transpose(im)
+        fmt = {".jpg": "JPEG", ".jpeg": "JPEG"}.get(ext, im.format or "PNG")
+        clean = frame.convert("RGB") if fmt == "JPEG" and frame.mode not in ("RGB", "L") else frame
+        atomic_save(clean, names["original"], format=fmt,
+                    **({"quality": 90} if fmt == "JPEG" else {}))
+        os.unlink(src)
+
+    if frame.mode not in ("RGB", "RGBA"):
+        frame = frame.convert("RGBA" if "A" in frame.getbands() else "RGB")
+    disp = frame.copy()
+    disp.thumbnail((display_px, display_px))
+    atomic_save(disp, names["display"], format="WEBP", quality=82, method=4)
+    thumb = frame.copy()
+    thumb.thumbnail((thumb_px, thumb_px))
+    atomic_save(thumb, names["thumb"], format="WEBP", quality=75, method=4)
+
+class _FilePart:
+    """MultipartParser callbacks that collect the bytes of one form field."""
+    def __init__(self, field: str) -> None:
+        self.field = field.encode()
+        self.headers: Dict[bytes, bytes] = {}
+        self._header = [b"", b""]
+        self.in_file = False
+        self.filename = ""
+        self.started = self.finished = False
+        self.pending: List[bytes] = []  # file bytes parsed from the last body chunk
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in (
+            "on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+            "on_headers_finished", "on_part_data", "on_part_end")}
+
+    def on_part_begin(self) -> None:
+        self.headers = {}
+        self.in_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header[0] += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header[1] += data[start:end]
+
+    def on_header_end(self) -> None:
+        self.headers[self._header[0].lower()] = self._header[1]
+        self._header = [b"", b""]
+
+    def on_headers_finished(self) -> None:
+        _, opts = parse_options_header(self.headers.get(b"content-disposition", b""))
+        if opts.get(b"name") != self.field or self.started:
+            return
+        if not self.headers.get(b"content-type", b"").startswith(b"image/"):
+            raise BadUpload("Only image files are allowed.")
+        self.filename = opts.get(b"filename", b"").decode("utf-8", "replace")
+        self.in_file = self.started = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self.in_file:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        if self.in_file:
+            self.in_file, self.finished = False, True
+
+async def _spool(request: Request, dest_dir: Path, max_bytes: int,
+                 field: str = "file") -> Tuple[str, str, str]:
+    """
+    Stream the `field` part of a multipart/form-data request to a temp file in dest_dir;
+    returns (sha256 hex, temp path, client filename).
+    """
+    ctype, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if ctype != b"multipart/form-data" or not boundary:
+        raise BadUpload("Expected a multipart/form-data body.")
+    limit = max_bytes + FRAMING_SLACK
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise UploadTooLarge()
+
+    part = _FilePart(field)
+    parser = MultipartParser(boundary, part.callbacks())
+    h = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=dest_dir, prefix=".up-")
+    received = size = 0
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > limit:
+                    raise UploadTooLarge()
+                parser.write(chunk)
+                if not part.pending:
+                    continue
+                data = b"".join(part.pending)
+                part.pending.clear()
+                size += len(data)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                h.update(data)
+                await asyncio.to_thread(fh.write, data)
+            parser.finalize()
+        if not part.finished:
+            raise BadUpload(f"Missing `{field}` image part.")
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return h.hexdigest(), tmp, part.filename
+
+async def store_photo(request: Request) -> Dict[str, str]:
+    """Returns {"original", "display", "thumb"} file names under UPLOADS_DIR."""
+    out_dir = settings.UPLOADS_DIR
+    digest, tmp, filename = await _spool(request, out_dir, settings.MAX_UPLOAD_BYTES)
+    ext = os.path.splitext(filename)[1].lower()
+    ext = ext if ext in ALLOWED_EXT else ".jpg"
+    digest = digest[:32]
+    names = variant_names(digest, ext)
+    if all((out_dir / n).exists() for n in names.values()):
+        os.unlink(tmp)  # duplicate upload
+        return names
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            _pool(), _process_image, tmp, str(out_dir), digest, ext,
+            settings.IMAGE_DISPLAY_PX, settings.IMAGE_THUMB_PX,
+        )
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    return names
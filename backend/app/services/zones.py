@@ -0,0 +1,142 @@
+# apps/api/services/zones.py
+"""
+Local NWS zone-geometry table.
+
+Many active alerts are zone-based and ship with `geometry: null`; their area is the union of the
+zones listed in `properties.affectedZones`. Zone shapes rarely change, so each one is fetched from
+api.weather.gov once, simplified, and kept in SQLite (plus an in-process dict).
+
+The NWS refresh only uses zones already known; unknown ones are fetched by a background task and
+fill their alerts from the next refresh on, so nobody waiting on a refresh waits on api.weather.gov.
+"""
+from __future__ import annotations
+import asyncio, logging, sqlite3, threading
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+from shapely.geometry import mapping
+from shapely.ops import unary_union
+
+from ..config.settings import settings
+from ..data import codec
+from .geoindex import to_shape
+
+ZONE_TTL = timedelta(days=30)
+SIMPLIFY_DEG = 0.001
+
+_CONN = sqlite3.connect(str(settings.ZONES_DB), check_same_thread=False)
+_CONN.execute("""
+CREATE TABLE IF NOT EXISTS nws_zones (
+  zone_url TEXT PRIMARY KEY,
+  geometry_json TEXT,
+  fetched_at TEXT NOT NULL
+)
+""")
+_CONN.commit()
+_DB_LOCK = threading.Lock()
+
+# zone_url -> GeoJSON geometry (None = upstream has no shape for it)
+_MEM: Dict[str, Optional[Dict[str, Any]]] = {}
+# the background zone fetch, at most one at a time
+_FETCH: Optional[asyncio.Task] = None
+
+log = logging.getLogger(__name__)
+
+def _load(urls: List[str]) -> None:
+    cutoff = (datetime.now(timezone.utc) - ZONE_TTL).isoformat()
+    with _DB_LOCK:
+        for i in range(0, len(urls), 500):
+            chunk = urls[i:i + 500]
+            q = ",".join("?" * len(chunk))
+            rows = _CONN.execute(
+                "SELECT zone_url, geometry_json FROM nws_zones"
+                f" WHERE fetched_at >= ? AND zone_url IN ({q})",
+                [cutoff, *chunk],
+            ).fetchall()
+            for url, gj in rows:
+                _MEM[url] = codec.loads(gj) if gj else None
+
+def _save(rows: List[tuple]) -> None:
+    with _DB_LOCK:
+        _CONN.executemany(
+            "INSERT OR REPLACE INTO nws_zones (zone_url, geometry_json, fetched_at)"
+            " VALUES (?,?,?)", rows
+        )
+        _CONN.commit()
+
+async def _fetch_zone(client: httpx.AsyncClient, sem: asyncio.Semaphore,
+                      url: str) -> Optional[Dict[str, Any]]:
+    async with sem:
+        r = await client.get(url, headers={"Accept": "application/geo+json",
+                                           "User-Agent": "PulseMap/1.0"})
+        r.raise_for_status()
+        g = to_shape((r.json() or {}).get("geometry"))
+    if g is None:
+        return None
+    return mapping(g.simplify(SIMPLIFY_DEG, preserve_topology=True))
+
+async def known_zone_geometries(urls: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """zone_url -> geometry for zones in memory or the zones table; never touches the network."""
+    wanted = list(dict.fromkeys(urls))
+    unknown = [u for u in wanted if u not in _MEM]
+    if unknown:
+        await asyncio.to_thread(_load, unknown)
+    return {u: _MEM[u] for u in wanted if u in _MEM}
+
+async def fetch_zone_geometries(urls: Iterable[str]) -> int:
+    """Fetch up to NWS_ZONE_FETCH_LIMIT zones not known yet; returns how many were stored."""
+    unknown = [u for u in dict.fromkeys(urls) if u not in _MEM][: settings.NWS_ZONE_FETCH_LIMIT]
+    if not unknown:
+        return 0
+    sem = asyncio.Semaphore(8)
+    async with httpx.AsyncClient(timeout=10, follow_redirects=True) as client:
+        res = await asyncio.gather(*(_fetch_zone(client, sem, u) for u in unknown),
+                                   return_exceptions=True)
+    now = datetime.now(timezone.utc).isoformat()
+    rows = []
+    for u, g in zip(unknown, res):
+        if isinstance(g, Exception):
+            continue  # try again on the next refresh
+        _MEM[u] = g
+        rows.append((u, codec.dumps(g).decode() if g else None, now))
+    if rows:
+        await asyncio.to_thread(_save, rows)
+    return len(rows)
+
+async def _fetch_in_background(urls: List[str]) -> None:
+    try:
+        await fetch_zone_geometries(urls)
+    except Exception as e:
+        log.warning("NWS zone fetch failed: %r", e)
+
+def _schedule_fetch(urls: List[str]) -> None:
+    global _FETCH
+    if _FETCH is not None and not _FETCH.done():
+        return  # whatever is still unknown afterwards is scheduled by a later refresh
+    _FETCH = asyncio.create_task(_fetch_in_background(urls))
+
+async def fill_zone_geometries(fc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy of fc in which geometry-less alerts get the union of their known affected zones; fc
+    itself is not modified (it may be shared by coalesced fetches). Unknown zones are fetched in
+    the background.
+    """
+    urls = [z for f in (fc.get("features") or []) if not f.get("geometry")
+            for z in ((f.get("properties") or {}).get("affectedZones") or [])]
+    if not urls:
+        return fc
+    geoms = await known_zone_geometries(urls)
+    missing = [u for u in dict.fromkeys(urls) if u not in geoms]
+    if missing:
+        _schedule_fetch(missing)
+    features = []
+    for f in fc.get("features") or []:
+        props = f.get("properties") or {}
+        zones = [] if f.get("geometry") else (props.get("affectedZones") or [])
+        parts = [s for z in zones if (s := to_shape(geoms.get(z))) is not None]
+        if parts:
+            props = {**(f.get("properties") or {}), "geometrySource": "zones"}
+            f = {**f, "geometry": mapping(unary_union(parts)), "properties": props}
+        features.append(f)
+    return {**fc, "features": features}
@@ -0,0 +1,112 @@
+"""
+Single-flight call coalescing.
+
+While a call for some key is in flight, later callers with the same key don't start their own:
+they wait for the running one and get its result (or its exception). This is for cold loads
+(tract shapefile, agent graph) and identical upstream fetches, where a burst of requests would
+otherwise each repeat the same expensive work.
+
+    _LOAD = SingleFlight("tracts")
+    _LOAD.do("shapefile", _load)              # sync: other threads block until the leader returns
+    await _FLIGHT.do_async("usgs", refresh)   # async: other tasks await the leader's task
+
+    @coalesce("upstream_fetch")               # key = function + arguments
+    async def fetch_usgs_quakes_geojson(): ...
+
+Nothing is cached: once the call finishes, the next caller starts a fresh one.
+"""
+from __future__ import annotations
+import asyncio, functools, inspect, threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from . import metrics
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """One in-flight call per key; `name` labels singleflight_calls_total{flight, role}."""
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+
+    def _count(self, role: str) -> None:
+        metrics.inc("singleflight_calls_total", flight=self.name, role=role)
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) unless another thread is already running it for `key`."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            self._count("follower")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        self._count("leader")
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Any], *args: Any,
+                       **kwargs: Any) -> Any:
+        """Await fn(*args, **kwargs) unless a task on this event loop already runs it for `key`."""
+        loop = asyncio.get_running_loop()
+        k = (id(loop), key)
+        task = self._tasks.get(k)
+        if task is None:
+            self._count("leader")
+            task = self._tasks[k] = loop.create_task(fn(*args, **kwargs))
+            task.add_done_callback(functools.partial(self._finished, k))
+        else:
+            self._count("follower")
+        # shield: a caller that gets cancelled (client went away) must not cancel it for the others
+        return await asyncio.shield(task)
+
+    def _finished(self, k: Tuple[int, Hashable], task: asyncio.Task) -> None:
+        if self._tasks.get(k) is task:
+            del self._tasks[k]
+        if not task.cancelled():
+            # retrieved here, so an error nobody awaited anymore isn't logged as lost
+            task.exception()
+
+def coalesce(name: str,
+             key: Optional[Callable[..., Hashable]] = None) -> Callable[[Callable], Callable]:
+    """
+    Decorator form for sync or async functions: concurrent calls with equal arguments
+    (or equal key(*args, **kwargs)) share one execution.
+    """
+    flight = SingleFlight(name)
+
+    def deco(fn: Callable) -> Callable:
+        def _key(a: tuple, kw: dict) -> Hashable:
+            return fn.__qualname__, (key(*a, **kw) if key else (a, tuple(sorted(kw.items()))))
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrap(*a, **kw):
+                return await flight.do_async(_key(a, kw), fn, *a, **kw)
+            return awrap
+
+        @functools.wraps(fn)
+        def wrap(*a, **kw):
+            return flight.do(_key(a, kw), fn, *a, **kw)
+        return wrap
+    return deco
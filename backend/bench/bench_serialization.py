@@ -0,0 +1,65 @@
+"""
+Serialization micro-benchmark: stdlib json vs orjson vs cached per-feature bytes.
+
+    python -m backend.bench.bench_serialization --rows 20000 --repeat 5
+"""
+from __future__ import annotations
+import argparse, json, random, time
+from datetime import datetime, timezone, timedelta
+from typing import Callable, List
+
+from ..app.data import codec
+from ..app.data.store import _row_to_feature
+
+def _synthetic_rows(n: int, seed: int = 7) -> List[tuple]:
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(n):
+        props = {
+            "title": "Car accident", "text": "Crash reported blocking the left lane.",
+            "category": "incident.car_accident", "emoji": "3d-car", "severity": "medium",
+            "confidence": round(rnd.random(), 2), "source": "user",
+            "reported_at": (now - timedelta(minutes=i)).isoformat(),
+        }
+        rows.append((i + 1, 38.9 + rnd.uniform(-1, 1), -77.0 + rnd.uniform(-1, 1),
+                     "User report", json.dumps(props), props["reported_at"]))
+    return rows
+
+def _time(fn: Callable[[], bytes], repeat: int) -> tuple[float, int]:
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+        size = len(out)
+    return best, size
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    rows = _synthetic_rows(args.rows)
+    cache = {r[0]: codec.dumps(_row_to_feature(r)) for r in rows}
+
+    cases = {
+        # what FastAPI did before: build dicts, encode with stdlib json
+        "stdlib json": lambda: json.dumps(
+            {"type": "FeatureCollection", "features": [_row_to_feature(r) for r in rows]}
+        ).encode(),
+        "orjson (rebuild dicts)": lambda: codec.dumps(
+            {"type": "FeatureCollection", "features": [_row_to_feature(r) for r in rows]}
+        ),
+        "cached feature bytes": lambda: codec.feature_collection(cache[r[0]] for r in rows),
+    }
+    base = None
+    print(f"{args.rows} reports, best of {args.repeat}")
+    for name, fn in cases.items():
+        secs, size = _time(fn, args.repeat)
+        base = base or secs
+        print(f"  {name:<24} {secs * 1000:9.2f} ms  {size / 1e6:7.2f} MB  x{base / secs:5.1f}")
+
+if __name__ == "__main__":
+    main()
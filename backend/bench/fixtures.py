@@ -0,0 +1,168 @@
+"""
+Feed payloads for offline benchmarks and load tests.
+
+`recorded(name)` returns a payload captured from the live upstream (see `record` below) if one
+exists in fixtures/, otherwise a synthetic payload with the same schema. `synthetic(name, n)`
+builds deterministic payloads at any size, timestamped relative to now so recency filters
+behave like production.
+
+    python -m backend.bench.fixtures record      # refresh fixtures/*.json from live upstreams
+"""
+from __future__ import annotations
+import asyncio, json, math, random
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+# feature counts seen on a normal day vs. during a large event
+SIZES = {
+    "usgs": {"realistic": 15, "surge": 2_000},
+    "nws": {"realistic": 400, "surge": 2_500},
+    "eonet": {"realistic": 150, "surge": 1_200},
+    "firms": {"realistic": 1_500, "surge": 15_000},
+}
+
+# CONUS-ish bounds so points land near the synthetic report tables
+_LAT = (25.0, 49.0)
+_LON = (-124.0, -67.0)
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _ring(rnd: random.Random, lat: float, lon: float, r_deg: float, n: int) -> List[List[float]]:
+    pts = []
+    for i in range(n):
+        a = 2 * math.pi * i / n
+        rr = r_deg * (0.6 + 0.4 * rnd.random())
+        pts.append([round(lon + rr * math.cos(a) * 1.6, 5), round(lat + rr * math.sin(a), 5)])
+    pts.append(pts[0])
+    return pts
+
+def _usgs(rnd: random.Random, n: int) -> Dict[str, Any]:
+    now = _now()
+    feats = []
+    for i in range(n):
+        t = now - timedelta(minutes=rnd.uniform(0, 60 * 24))
+        lat, lon = rnd.uniform(*_LAT), rnd.uniform(*_LON)
+        feats.append({"type": "Feature", "id": f"us{i:07d}",
+                      "properties": {"mag": round(rnd.uniform(0.5, 6.5), 1),
+                                     "place": f"{rnd.randint(1, 90)} km NW of Town {i}",
+                                     "time": int(t.timestamp() * 1000),
+                                     "updated": int(t.timestamp() * 1000),
+                                     "url": f"https://earthquake.usgs.gov/earthquakes/eventpage/us{i:07d}",
+                                     "detail": "https://earthquake.usgs.gov/fdsnws/event/1/query"
+                                               f"?eventid=us{i:07d}",
+                                     "status": "automatic", "tsunami": 0,
+                                     "sig": rnd.randint(0, 600),
+                                     "net": "us", "type": "earthquake", "title": f"M quake {i}"},
+                      "geometry": {"type": "Point",
+                                   "coordinates": [lon, lat, round(rnd.uniform(0, 30), 2)]}})
+    return {"type": "FeatureCollection", "metadata": {"count": n}, "features": feats}
+
+def _nws(rnd: random.Random, n: int) -> Dict[str, Any]:
+    now = _now()
+    feats = []
+    for i in range(n):
+        t = now - timedelta(minutes=rnd.uniform(0, 60 * 36))
+        lat, lon = rnd.uniform(*_LAT), rnd.uniform(*_LON)
+        # many real alerts are zone-based with geometry: null
+        zone_only = rnd.random() < 0.3
+        ring = _ring(rnd, lat, lon, rnd.uniform(0.05, 0.8), rnd.randint(8, 60))
+        geom = None if zone_only else {"type": "Polygon", "coordinates": [ring]}
+        aid = f"urn:oid:2.49.0.1.840.0.{i:08x}"
+        feats.append({"id": f"https://api.weather.gov/alerts/{aid}", "type": "Feature",
+                      "geometry": geom,
+                      "properties": {"@id": f"https://api.weather.gov/alerts/{aid}", "id": aid,
+                                     "areaDesc": f"County {i}",
+                                     "affectedZones": [
+                                         f"https://api.weather.gov/zones/county/XXC{i % 999:03d}"],
+                                     "sent": t.isoformat(), "effective": t.isoformat(),
+                                     "onset": t.isoformat(),
+                                     "expires": (t + timedelta(hours=6)).isoformat(),
+                                     "severity": rnd.choice(
+                                         ["Minor", "Moderate", "Severe", "Extreme", "Unknown"]),
+                                     "event": rnd.choice(["Flood Warning", "Heat Advisory",
+                                                          "Wind Advisory", "Tornado Warning"]),
+                                     "headline": "x" * 80, "description": "y" * 600,
+                                     "instruction": "z" * 200}})
+    return {"type": "FeatureCollection", "features": feats}
+
+def _eonet(rnd: random.Random, n: int) -> Dict[str, Any]:
+    now = _now()
+    feats = []
+    cats = ["Wildfires", "Severe Storms", "Volcanoes", "Floods", "Sea and Lake Ice",
+            "Dust and Haze"]
+    for i in range(n):
+        t = now - timedelta(hours=rnd.uniform(0, 24 * 7))
+        lat, lon = rnd.uniform(*_LAT), rnd.uniform(*_LON)
+        geom = ({"type": "Point", "coordinates": [lon, lat]} if rnd.random() < 0.8
+                else {"type": "Polygon", "coordinates": [_ring(rnd, lat, lon, 0.3, 12)]})
+        cat = rnd.choice(cats)
+        feats.append({"type": "Feature", "geometry": geom,
+                      "properties": {"id": f"EONET_{i}", "title": f"{cat} event {i}",
+                                     "link": f"https://eonet.gsfc.nasa.gov/api/v3/events/EONET_{i}",
+                                     "date": t.isoformat(),
+                                     "categories": [{"id": cat.lower(), "title": cat}],
+                                     "sources": [{"id": "InciWeb", "url": "https://inciweb.example"}]}})
+    return {"type": "FeatureCollection", "features": feats}
+
+def _firms(rnd: random.Random, n: int) -> Dict[str, Any]:
+    now = _now()
+    feats = []
+    for i in range(n):
+        t = now - timedelta(minutes=rnd.uniform(0, 60 * 12))
+        lat, lon = rnd.uniform(*_LAT), rnd.uniform(*_LON)
+        feats.append({"type": "Feature",
+                      "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                      "properties": {"source": "FIRMS", "dataset": "VIIRS_NOAA20_NRT",
+                                     "acq_date": t.date().isoformat(),
+                                     "acq_time": t.strftime("%H%M"),
+                                     "acq_datetime": t.isoformat(), "instrument": "VIIRS",
+                                     "confidence": rnd.choice(["l", "n", "h"]),
+                                     "frp": str(round(rnd.uniform(0.5, 80), 2)),
+                                     "daynight": rnd.choice(["D", "N"])}})
+    return {"type": "FeatureCollection", "features": feats}
+
+_GEN = {"usgs": _usgs, "nws": _nws, "eonet": _eonet, "firms": _firms}
+
+def synthetic(name: str, n: int, seed: int = 1) -> Dict[str, Any]:
+    return _GEN[name](random.Random(f"{name}:{seed}"), n)
+
+def recorded(name: str) -> Dict[str, Any]:
+    p = FIXTURE_DIR / f"{name}.json"
+    if p.exists():
+        return json.loads(p.read_text())
+    return synthetic(name, SIZES[name]["realistic"])
+
+def payload(name: str, profile: str) -> Dict[str, Any]:
+    """profile: 'recorded' | 'realistic' | 'surge'."""
+    if profile == "recorded":
+        return recorded(name)
+    return synthetic(name, SIZES[name][profile])
+
+async def _record() -> None:
+    from ..app.services.fetchers import (
+        fetch_usgs_quakes_geojson, fetch_nws_alerts_geojson,
+        fetch_eonet_events_geojson, fetch_firms_hotspots_geojson,
+    )
+    FIXTURE_DIR.mkdir(exist_ok=True)
+    for name, fn in [("usgs", fetch_usgs_quakes_geojson),
+                     ("nws", fetch_nws_alerts_geojson),
+                     ("eonet", fetch_eonet_events_geojson),
+                     ("firms", fetch_firms_hotspots_geojson)]:
+        try:
+            data = await fn()
+        except Exception as e:
+            print(f"{name}: failed ({e!r})")
+            continue
+        (FIXTURE_DIR / f"{name}.json").write_text(json.dumps(data))
+        print(f"{name}: {len(data.get('features') or [])} features")
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["record"]:
+        asyncio.run(_record())
+    else:
+        print(__doc__)
@@ -0,0 +1,93 @@
+"""
+Tiny benchmark runner: latency percentiles, throughput and peak traced memory per case,
+with JSON save/compare so a run can be gated against a stored baseline.
+"""
+from __future__ import annotations
+import gc, json, statistics, time, tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+@dataclass
+class Result:
+    name: str
+    n: int
+    ops_per_s: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    peak_kb: float
+    items: int = 0          # items handled per call (rows, features...), for items/s
+
+    @property
+    def items_per_s(self) -> float:
+        return self.items * self.ops_per_s
+
+def _pct(sorted_ms: List[float], q: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    k = min(len(sorted_ms) - 1, max(0, int(round(q * (len(sorted_ms) - 1)))))
+    return sorted_ms[k]
+
+def run(name: str, fn: Callable[[], Any], *, min_time: float = 1.0, min_runs: int = 5,
+        max_runs: int = 10_000, warmup: int = 1, items: int = 0) -> Result:
+    """Call fn repeatedly for at least min_time seconds / min_runs calls."""
+    for _ in range(warmup):
+        fn()
+    gc.collect()
+    lat: List[float] = []
+    t_start = time.perf_counter()
+    while len(lat) < max_runs and (len(lat) < min_runs or time.perf_counter() - t_start < min_time):
+        t0 = time.perf_counter()
+        fn()
+        lat.append((time.perf_counter() - t0) * 1000)
+    lat.sort()
+
+    # peak memory from a separate traced call, so tracing overhead doesn't skew latency
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total_s = sum(lat) / 1000
+    return Result(
+        name=name, n=len(lat), ops_per_s=len(lat) / total_s if total_s else 0.0,
+        p50_ms=statistics.median(lat), p95_ms=_pct(lat, 0.95), p99_ms=_pct(lat, 0.99),
+        max_ms=lat[-1], peak_kb=peak / 1024, items=items,
+    )
+
+def print_table(results: List[Result]) -> None:
+    print(f"{'case':<44}{'n':>6}{'ops/s':>10}{'items/s':>12}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak KB':>11}")
+    for r in results:
+        ips = f"{r.items_per_s:,.0f}" if r.items else "-"
+        print(f"{r.name:<44}{r.n:>6}{r.ops_per_s:>10.1f}{ips:>12}{r.p50_ms:>10.3f}"
+              f"{r.p95_ms:>10.3f}{r.p99_ms:>10.3f}{r.peak_kb:>11.0f}")
+
+def save(results: List[Result], path: Path, meta: Optional[Dict[str, Any]] = None) -> None:
+    doc = {"meta": meta or {}, "results": [asdict(r) for r in results]}
+    path.write_text(json.dumps(doc, indent=2))
+
+def compare(results: List[Result], baseline_path: Path, threshold: float) -> bool:
+    """
+    Print p50/peak deltas vs a saved run. Returns False if any case got slower (p50)
+    or hungrier (peak memory) than baseline by more than `threshold` (0.2 = 20%).
+    """
+    base = {r["name"]: r for r in json.loads(baseline_path.read_text())["results"]}
+    ok = True
+    print(f"\n{'case':<44}{'p50 base':>10}{'p50 now':>10}{'delta':>9}{'peak delta':>12}")
+    for r in results:
+        b = base.get(r.name)
+        if not b:
+            print(f"{r.name:<44}{'-':>10}{r.p50_ms:>10.3f}{'new':>9}")
+            continue
+        d = (r.p50_ms - b["p50_ms"]) / b["p50_ms"] if b["p50_ms"] else 0.0
+        m = (r.peak_kb - b["peak_kb"]) / b["peak_kb"] if b["peak_kb"] else 0.0
+        bad = d > threshold or m > threshold
+        ok = ok and not bad
+        print(f"{r.name:<44}{b['p50_ms']:>10.3f}{r.p50_ms:>10.3f}{d:>+9.1%}{m:>+12.1%}"
+              f"{'  REGRESSION' if bad else ''}")
+    return ok
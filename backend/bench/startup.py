@@ -0,0 +1,85 @@
+"""
+Cold-start and memory footprint of the API process.
+
+    python -m backend.bench.startup                  # API_ROLE=all
+    python -m backend.bench.startup --roles all,feeds,tiles --runs 5
+    python -m backend.bench.startup --warm           # include the background agent/tract warm-up
+
+Each run is a fresh interpreter against a scratch DATA_DIR. Reported per role:
+- import_ms: `import backend.app.main`
+- ready_ms: import + lifespan startup + first GET /health answered
+- rss_mb: resident set size right after /health
+- heavy: which of the LLM/GIS stacks ended up imported
+"""
+from __future__ import annotations
+import argparse, json, os, statistics, subprocess, sys, tempfile
+from pathlib import Path
+from typing import Dict, List
+
+HEAVY = ("langchain_core", "langgraph", "langchain_openai", "openai",
+         "geopandas", "pyogrio", "fiona")
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import backend.app.main as m
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(m.app) as c:
+    c.get("/health").raise_for_status()
+    t2 = time.perf_counter()
+    rss = 0
+    for line in open("/proc/self/status"):
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1]) / 1024
+    heavy = [h for h in HEAVY if h in sys.modules]
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "ready_ms": (t2 - t0) * 1000,
+                  "rss_mb": rss, "heavy": heavy}))
+"""
+
+def _env(tmp: Path, role: str, warm: bool) -> Dict[str, str]:
+    root = str(Path(__file__).resolve().parents[2])
+    env = {**os.environ,
+           "API_ROLE": role,
+           "WARM_SUBSYSTEMS": "1" if warm else "0",
+           "DATA_DIR": str(tmp / "data"), "UPLOADS_DIR": str(tmp / "data" / "uploads"),
+           "REPORTS_DB": str(tmp / "data" / "pulsemaps_reports.db"),
+           "SESSIONS_DB": str(tmp / "data" / "sessions.db"),
+           "ARCHIVE_DB": str(tmp / "data" / "archive.db"),
+           "ZONES_DB": str(tmp / "data" / "zones.db"),
+           "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "bench"),
+           "RETENTION_HOURS": "0",
+           "PYTHONPATH": os.pathsep.join([root, os.environ.get("PYTHONPATH", "")])}
+    return env
+
+def measure(role: str, runs: int, warm: bool = False) -> Dict:
+    out: List[Dict] = []
+    for _ in range(runs):
+        tmp = Path(tempfile.mkdtemp(prefix="pulsemap-startup-"))
+        code = f"HEAVY = {HEAVY!r}\n" + _CHILD
+        p = subprocess.run([sys.executable, "-c", code], env=_env(tmp, role, warm), cwd=str(tmp),
+                           capture_output=True, text=True)
+        if p.returncode != 0:
+            raise SystemExit(f"role={role} failed:\n{p.stderr[-2000:]}")
+        out.append(json.loads(p.stdout.strip().splitlines()[-1]))
+    med = lambda k: statistics.median(r[k] for r in out)
+    return {"role": role, "runs": runs, "import_ms": med("import_ms"), "ready_ms": med("ready_ms"),
+            "rss_mb": med("rss_mb"), "heavy": out[-1]["heavy"]}
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--roles", default="all")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--warm", action="store_true")
+    ap.add_argument("--json", help="also write results here")
+    args = ap.parse_args()
+    res = [measure(r, args.runs, args.warm) for r in args.roles.split(",")]
+    print(f"{'role':<8}{'import ms':>11}{'ready ms':>11}{'rss MB':>9}  heavy modules")
+    for r in res:
+        print(f"{r['role']:<8}{r['import_ms']:>11.0f}{r['ready_ms']:>11.0f}{r['rss_mb']:>9.1f}"
+              f"  {', '.join(r['heavy']) or '-'}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(res, indent=2))
+
+if __name__ == "__main__":
+    main()
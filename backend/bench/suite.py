@@ -0,0 +1,182 @@
+"""
+Offline benchmark suite for the backend hot paths.
+
+    python -m backend.bench.suite                         # default sizes
+    python -m backend.bench.suite --full                  # adds 1M-row report table and surge feeds
+    python -m backend.bench.suite --only store.near --save bench.json
+    python -m backend.bench.suite --compare bench.json --threshold 0.2   # exit 1 on regression
+
+Nothing here touches the network or the real data/ directory: the app is pointed at a temp
+DATA_DIR, feed snapshots are built from bench fixtures, and tracts come from a synthetic grid
+when the census shapefile isn't present.
+"""
+from __future__ import annotations
+import argparse, asyncio, os, platform, random, sys, tempfile
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from . import harness
+from .fixtures import payload
+
+# viewport bboxes around Washington, DC, roughly Google Maps zoom 6 / 10 / 14
+TRACT_VIEWS = {
+    "z6": (-84.0, 35.0, -70.0, 42.5),
+    "z10": (-77.45, 38.65, -76.6, 39.15),
+    "z14": (-77.06, 38.88, -77.0, 38.91),
+}
+CENTER = (38.9, -77.03)
+
+def _isolate() -> Path:
+    """Point settings at a scratch dir before any app module is imported."""
+    tmp = Path(tempfile.mkdtemp(prefix="pulsemap-bench-"))
+    for k in ("DATA_DIR", "UPLOADS_DIR"):
+        os.environ[k] = str(tmp / "data" if k == "DATA_DIR" else tmp / "data" / "uploads")
+    for k, f in (("REPORTS_DB", "pulsemaps_reports.db"), ("SESSIONS_DB", "sessions.db"),
+                 ("ARCHIVE_DB", "archive.db"), ("ZONES_DB", "zones.db")):
+        os.environ[k] = str(tmp / "data" / f)
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ["FEED_TTL_SECONDS"] = str(10 ** 9)
+    os.environ["RETENTION_HOURS"] = "0"
+    return tmp
+
+def _report_rows(n: int, seed: int = 3) -> List[tuple]:
+    """Reports spread over CONUS, ~5% clustered around CENTER, timestamps over the last 4 days."""
+    from ..app.data import codec
+    rnd = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(n):
+        if rnd.random() < 0.05:
+            lat, lon = CENTER[0] + rnd.gauss(0, 0.2), CENTER[1] + rnd.gauss(0, 0.2)
+        else:
+            lat, lon = rnd.uniform(25, 49), rnd.uniform(-124, -67)
+        ts = (now - timedelta(minutes=rnd.uniform(0, 60 * 96))).isoformat()
+        props = {"title": "Flooding", "category": "road.flood", "emoji": "3d-flood",
+                 "severity": "medium",
+                 "confidence": 0.8, "source": "user", "reported_at": ts}
+        rows.append((lat, lon, f"report {i}", codec.dumps(props).decode(), ts))
+    return rows
+
+def _load_reports(n: int) -> None:
+    from ..app.data import store
+    store.clear_reports()
+    store.bulk_insert(_report_rows(n), batch_size=20_000)
+
+def _synthetic_tracts(cell_deg: float = 0.06):
+    """Grid of square 'tracts' over the mid-Atlantic, same columns as the census file."""
+    import geopandas as gpd
+    from shapely.geometry import box
+    minx, miny, maxx, maxy = -84.0, 35.0, -70.0, 42.5
+    geoms, ids = [], []
+    x = minx
+    i = 0
+    while x < maxx:
+        y = miny
+        while y < maxy:
+            geoms.append(box(x, y, x + cell_deg, y + cell_deg))
+            ids.append(f"{i:011d}")
+            i += 1
+            y += cell_deg
+        x += cell_deg
+    return gpd.GeoDataFrame({"GEOID": ids, "STATEFP": "11", "NAME": ids, "NAMELSAD": ids},
+                            geometry=geoms, crs="EPSG:4326")
+
+def _cases(args) -> List[Tuple[str, Callable[[], object], int]]:
+    from ..app.data import store
+    from ..app.services import feeds
+
+    loop = asyncio.new_event_loop()
+    cases: List[Tuple[str, Callable[[], object], int]] = []
+    profiles = ["recorded", "realistic"] + (["surge"] if args.full else [])
+
+    # normalizers
+    for name in ("usgs", "nws", "eonet", "firms"):
+        for prof in profiles:
+            fc = payload(name, prof)
+            n = len(fc.get("features") or [])
+            to_updates = feeds._feed_specs()[name][2]
+            cases.append((f"normalize.{name}[{prof}]", lambda fc=fc, f=to_updates: f(fc), n))
+            cases.append((f"snapshot.{name}[{prof}]",
+                          lambda fc=fc, nm=name: feeds.build_snapshot(nm, fc), n))
+
+    # report table + feed-merging endpoints, per table size
+    sizes = [int(s) for s in args.sizes.split(",")]
+    if args.full and 1_000_000 not in sizes:
+        sizes.append(1_000_000)
+    snap_prof = "surge" if args.full else "realistic"
+
+    def setup_snapshots() -> None:
+        for name in ("usgs", "nws", "eonet", "firms"):
+            feeds._SNAPSHOTS[name] = feeds.build_snapshot(name, payload(name, snap_prof))
+
+    for n in sizes:
+        def prep(n=n) -> None:
+            _load_reports(n)
+            setup_snapshots()
+        label = f"{n // 1000}k" if n < 1_000_000 else f"{n // 1_000_000}M"
+        cases.append((f"@prep[{label}]", prep, 0))
+        cases.append((f"store.row_to_feature[{label}]",
+                      lambda: [store._row_to_feature(r)
+                               for r in store.STORE.page_reports(0, 1000)], 1000))
+        cases.append((f"store.near.5km[{label}]",
+                      lambda: store.find_reports_near(*CENTER, 5.0, 20, 48), 0))
+        cases.append((f"store.near.40km[{label}]",
+                      lambda: store.find_reports_near(*CENTER, 40.0, 100, 48), 0))
+        if n <= 100_000:  # full-table paths; pointless at 1M
+            cases.append((f"store.feature_collection[{label}]", store.get_feature_collection, n))
+            cases.append((f"store.feature_collection_bytes[{label}]",
+                          store.get_feature_collection_bytes, n))
+            cases.append((f"updates.global[{label}]",
+                          lambda: loop.run_until_complete(feeds.global_updates(200, 48)), 0))
+        cases.append((f"updates.local[{label}]",
+                      lambda: loop.run_until_complete(
+                          feeds.local_updates(*CENTER, 25.0, 48, 100)), 0))
+
+    # tracts
+    try:
+        from ..app.services import tracts
+        if not tracts.SHAPEFILE.exists():
+            tracts._gdf = _synthetic_tracts()
+        for z, bbox in TRACT_VIEWS.items():
+            cases.append((f"tracts.bbox[{z}]", lambda b=bbox: tracts.get_tracts_by_bbox(b), 0))
+    except ImportError as e:
+        print(f"skipping tracts: {e}", file=sys.stderr)
+    return cases
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="bench")
+    ap.add_argument("--sizes", default="1000,10000,100000", help="report table sizes")
+    ap.add_argument("--full", action="store_true",
+                    help="add surge feed payloads and a 1M-row table")
+    ap.add_argument("--only", default="", help="comma-separated case-name prefixes")
+    ap.add_argument("--min-time", type=float, default=0.5, help="seconds per case")
+    ap.add_argument("--save", type=Path, help="write results JSON")
+    ap.add_argument("--compare", type=Path, help="baseline JSON from --save")
+    ap.add_argument("--threshold", type=float, default=0.2, help="allowed regression for --compare")
+    args = ap.parse_args(argv)
+    _isolate()
+    only = [p for p in args.only.split(",") if p]
+    results: List[harness.Result] = []
+    for name, fn, items in _cases(args):
+        if name.startswith("@prep"):
+            # preparation steps always run, they just aren't measured
+            fn()
+            continue
+        if only and not any(name.startswith(p) for p in only):
+            continue
+        r = harness.run(name, fn, min_time=args.min_time, items=items)
+        results.append(r)
+        print(f"  {name:<44} p50 {r.p50_ms:9.3f} ms", file=sys.stderr)
+
+    harness.print_table(results)
+    meta = {"python": platform.python_version(), "machine": platform.machine(),
+            "time": datetime.now(timezone.utc).isoformat(), "sizes": args.sizes, "full": args.full}
+    if args.save:
+        harness.save(results, args.save, meta)
+    if args.compare:
+        return 0 if harness.compare(results, args.compare, args.threshold) else 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,178 @@
+"""
+Open-loop traffic driver: Poisson arrivals at a target RPS, a weighted mix of user flows,
+tail latencies per endpoint.
+
+    python -m backend.loadtest.drive --base http://127.0.0.1:8000 --rps 50 --duration 60 \
+        --mix map=0.25,local=0.4,chat=0.1,report=0.05,react=0.2
+"""
+from __future__ import annotations
+import argparse, asyncio, json, random, time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+DEFAULT_MIX = {"map": 0.25, "local": 0.40, "chat": 0.10, "report": 0.05, "react": 0.20}
+
+# users cluster around a few metros so local queries overlap like real traffic
+METROS = [(38.9, -77.03), (40.71, -74.0), (34.05, -118.24), (41.88, -87.63), (29.76, -95.37)]
+REPORT_TEXTS = ["Car crash blocking the left lane", "Flooded underpass, water rising",
+                "Road blocked by police", "I heard gunshots near the park",
+                "Construction closing two lanes"]
+
+class Recorder:
+    def __init__(self) -> None:
+        self.lat: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.status: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, client: httpx.AsyncClient, label: str, method: str, url: str,
+                   **kw) -> Optional[httpx.Response]:
+        t0 = time.perf_counter()
+        try:
+            r = await client.request(method, url, **kw)
+        except Exception:
+            self.errors[label] += 1
+            self.lat[label].append((time.perf_counter() - t0) * 1000)
+            return None
+        self.lat[label].append((time.perf_counter() - t0) * 1000)
+        self.status[label][r.status_code] += 1
+        if r.status_code >= 400:
+            self.errors[label] += 1
+        return r
+
+    def report(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        out: Dict[str, Dict[str, float]] = {}
+        for label, xs in sorted(self.lat.items()):
+            xs = sorted(xs)
+            q = lambda p: xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))]
+            out[label] = {"n": len(xs), "rps": len(xs) / elapsed, "err": self.errors[label],
+                          "p50": q(0.5), "p95": q(0.95), "p99": q(0.99), "max": xs[-1]}
+        return out
+
+def _user(rnd: random.Random) -> Dict[str, float]:
+    lat, lon = rnd.choice(METROS)
+    return {"lat": lat + rnd.gauss(0, 0.08), "lon": lon + rnd.gauss(0, 0.08)}
+
+def _flows(rec: Recorder, client: httpx.AsyncClient, rnd: random.Random,
+           rids: List[str]) -> Dict[str, Callable[[], Awaitable[None]]]:
+    async def map_load() -> None:
+        # what the web app fetches on first paint
+        u = _user(rnd)
+        bbox = f"{u['lon'] - 0.05},{u['lat'] - 0.03},{u['lon'] + 0.05},{u['lat'] + 0.03}"
+        await asyncio.gather(
+            rec.call(client, "GET /reports", "GET", "/reports"),
+            rec.call(client, "GET /feeds/nws", "GET", "/feeds/nws"),
+            rec.call(client, "GET /feeds/usgs", "GET", "/feeds/usgs"),
+            rec.call(client, "GET /feeds/eonet", "GET", "/feeds/eonet"),
+            rec.call(client, "GET /feeds/firms", "GET", "/feeds/firms"),
+            rec.call(client, "GET /updates/global", "GET", "/updates/global",
+                     params={"limit": 200}),
+            rec.call(client, "GET /geo/tracts", "GET", "/geo/tracts", params={"bbox": bbox}),
+        )
+
+    async def local() -> None:
+        u = _user(rnd)
+        r = await rec.call(client, "GET /updates/local", "GET", "/updates/local",
+                           params={**u, "radius_miles": 25, "limit": 100})
+        if r is not None and r.status_code == 200:
+            for it in (r.json().get("updates") or [])[:5]:
+                if it.get("rid"):
+                    rids.append(str(it["rid"]))
+            del rids[:-500]
+
+    async def chat() -> None:
+        await rec.call(client, "POST /chat", "POST", "/chat", json={
+            "message": rnd.choice(["What's happening near me?", "Any reports around here?"]),
+            "user_location": _user(rnd), "session_id": f"lt-{rnd.randrange(10_000)}"})
+
+    async def report() -> None:
+        r = await rec.call(client, "POST /chat (add_report)", "POST", "/chat", json={
+            "message": rnd.choice(REPORT_TEXTS), "user_location": _user(rnd),
+            "session_id": f"lt-{rnd.randrange(10_000)}"})
+        if r is not None and r.status_code == 200:
+            feat = ((r.json().get("tool_result") or {}).get("feature") or {})
+            rid = (feat.get("properties") or {}).get("rid")
+            if rid:
+                rids.append(str(rid))
+
+    async def react() -> None:
+        sid = f"lt-{rnd.randrange(10_000)}"
+        if not rids:
+            return await local()
+        rid = rnd.choice(rids)
+        await rec.call(client, "POST /reports/{rid}/react", "POST", f"/reports/{rid}/react",
+                       json={"action": rnd.choice(["verify", "clear"]), "value": True,
+                             "session_id": sid})
+        await rec.call(client, "GET /reports/reactions", "GET", "/reports/reactions",
+                       params={"ids": ",".join(rnd.sample(rids, min(5, len(rids)))),
+                               "session_id": sid})
+
+    return {"map": map_load, "local": local, "chat": chat, "report": report, "react": react}
+
+async def drive(base: str, rps: float, duration: float, mix: Dict[str, float], *,
+                max_in_flight: int = 1000, seed: int = 0, timeout: float = 60.0) -> Dict:
+    rnd = random.Random(seed)
+    rec = Recorder()
+    rids: List[str] = []
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    async with httpx.AsyncClient(base_url=base, timeout=timeout, limits=limits) as client:
+        flows = _flows(rec, client, rnd, rids)
+        names = list(mix)
+        weights = [mix[n] for n in names]
+        in_flight: set[asyncio.Task] = set()
+        dropped = 0
+        started = time.perf_counter()
+        next_at = started
+        while (now := time.perf_counter()) - started < duration:
+            if now < next_at:
+                await asyncio.sleep(next_at - now)
+            next_at += rnd.expovariate(rps)
+            if len(in_flight) >= max_in_flight:
+                # open loop: never let a slow server throttle the arrival rate silently
+                dropped += 1
+                continue
+            t = asyncio.create_task(flows[rnd.choices(names, weights)[0]]())
+            in_flight.add(t)
+            t.add_done_callback(in_flight.discard)
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+    return {"elapsed_s": elapsed, "target_rps": rps, "dropped": dropped,
+            "endpoints": rec.report(elapsed)}
+
+def print_report(res: Dict) -> None:
+    print(f"\n{res['elapsed_s']:.1f}s at target {res['target_rps']} flows/s,"
+          f" dropped {res['dropped']}")
+    print(f"{'endpoint':<30}{'n':>7}{'req/s':>8}{'err':>6}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, s in res["endpoints"].items():
+        print(f"{label:<30}{s['n']:>7}{s['rps']:>8.1f}{s['err']:>6}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}{s['max']:>10.1f}")
+
+def parse_mix(s: str) -> Dict[str, float]:
+    if not s:
+        return dict(DEFAULT_MIX)
+    out = {k: float(v) for k, v in (kv.split("=") for kv in s.split(","))}
+    unknown = set(out) - set(DEFAULT_MIX)
+    if unknown:
+        raise SystemExit(f"unknown flows: {', '.join(sorted(unknown))}")
+    return out
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--rps", type=float, default=20.0, help="user flows started per second")
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--mix", default="",
+                    help="e.g. map=0.2,local=0.5,chat=0.1,report=0.05,react=0.15")
+    ap.add_argument("--max-in-flight", type=int, default=1000)
+    ap.add_argument("--json", help="also write the result JSON here")
+    args = ap.parse_args()
+    res = asyncio.run(drive(args.base, args.rps, args.duration, parse_mix(args.mix),
+                            max_in_flight=args.max_in_flight))
+    print_report(res)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(res, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+One-shot load test: stub upstreams + API with the fake LLM + traffic driver.
+
+    python -m backend.loadtest.run --rps 30 --duration 60 --upstream-latency-ms 200 \
+        --upstream-failure-rate 0.05 --llm-token-ms 15 --workers 2
+
+Everything runs against a scratch DATA_DIR; nothing leaves the machine.
+"""
+from __future__ import annotations
+import argparse, asyncio, json, os, subprocess, sys, tempfile, time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+from .drive import drive, parse_mix, print_report
+from .stub_upstreams import upstream_env
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"process exited early while waiting for {url}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"timed out waiting for {url}")
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rps", type=float, default=20.0)
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--mix", default="")
+    ap.add_argument("--api-port", type=int, default=8790)
+    ap.add_argument("--stub-port", type=int, default=8791)
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn workers for the API")
+    ap.add_argument("--no-feed-sharing", action="store_true",
+                    help="every worker fetches feeds itself")
+    ap.add_argument("--profile", default="realistic", choices=["recorded", "realistic", "surge"])
+    ap.add_argument("--upstream-latency-ms", type=float, default=100.0)
+    ap.add_argument("--upstream-jitter-ms", type=float, default=50.0)
+    ap.add_argument("--upstream-failure-rate", type=float, default=0.0)
+    ap.add_argument("--llm-first-token-ms", type=float, default=300.0)
+    ap.add_argument("--llm-token-ms", type=float, default=10.0)
+    ap.add_argument("--json", help="write the result JSON here")
+    args = ap.parse_args()
+
+    data_dir = Path(tempfile.mkdtemp(prefix="pulsemap-load-"))
+    stub_base = f"http://127.0.0.1:{args.stub_port}"
+    api_base = f"http://127.0.0.1:{args.api_port}"
+    env: Dict[str, str] = {
+        **os.environ,
+        **upstream_env(stub_base),
+        "DATA_DIR": str(data_dir),
+        "UPLOADS_DIR": str(data_dir / "uploads"),
+        "REPORTS_DB": str(data_dir / "pulsemaps_reports.db"),
+        "SESSIONS_DB": str(data_dir / "sessions.db"),
+        "ARCHIVE_DB": str(data_dir / "archive.db"),
+        "ZONES_DB": str(data_dir / "zones.db"),
+        "FEED_SHARED_DIR": str(data_dir / "feeds"),
+        # with several workers, let one of them own upstream fetching (services/feedshare.py)
+        "FEED_SHARED": "1" if args.workers > 1 and not args.no_feed_sharing else "0",
+        "LLM_PROVIDER": "fake",
+        "OPENAI_API_KEY": "loadtest",
+        "FAKE_LLM_FIRST_TOKEN_MS": str(args.llm_first_token_ms),
+        "FAKE_LLM_TOKEN_LATENCY_MS": str(args.llm_token_ms),
+        # every simulated user comes from 127.0.0.1: measure latency, not the rate limits
+        "CHAT_RATE_PER_MINUTE": "0", "CHAT_ADDR_RATE_PER_MINUTE": "0",
+        "REPORT_RATE_PER_MINUTE": "0", "REPORT_ADDR_RATE_PER_MINUTE": "0",
+        "PYTHONPATH": os.pathsep.join([str(Path(__file__).resolve().parents[2]),
+                                       os.environ.get("PYTHONPATH", "")]),
+    }
+    procs: List[subprocess.Popen] = []
+    try:
+        stub = subprocess.Popen(
+            [sys.executable, "-m", "backend.loadtest.stub_upstreams", "--port", str(args.stub_port),
+             "--profile", args.profile, "--latency-ms", str(args.upstream_latency_ms),
+             "--jitter-ms", str(args.upstream_jitter_ms),
+             "--failure-rate", str(args.upstream_failure_rate)],
+            env=env, stdout=subprocess.DEVNULL)
+        procs.append(stub)
+        _wait_ready(f"{stub_base}/_stats", stub)
+
+        # run the API from the scratch dir so nothing it writes lands in the repo
+        api = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--port", str(args.api_port),
+             "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+            env=env, cwd=str(data_dir))
+        procs.append(api)
+        _wait_ready(f"{api_base}/health", api)
+
+        res = asyncio.run(drive(api_base, args.rps, args.duration, parse_mix(args.mix)))
+        res["upstream_stub"] = httpx.get(f"{stub_base}/_stats", timeout=30).json()
+        print_report(res)
+        print(f"upstream stub: {res['upstream_stub']}")
+        if args.json:
+            Path(args.json).write_text(json.dumps(res, indent=2))
+    finally:
+        for p in reversed(procs):
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Local stand-in for the USGS / NWS / EONET / FIRMS upstreams, serving bench fixtures.
+
+    python -m backend.loadtest.stub_upstreams --port 8801 --latency-ms 150 --jitter-ms 100 \
+        --failure-rate 0.02
+
+Point the API at it with the env printed on startup (USGS_URL, NWS_ALERTS_URL, ...).
+"""
+from __future__ import annotations
+import argparse, asyncio, copy, csv, io, random
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from ..bench.fixtures import payload
+
+def upstream_env(base: str) -> Dict[str, str]:
+    """Settings overrides that route every fetcher to a stub at `base`."""
+    return {
+        "USGS_URL": f"{base}/usgs",
+        "NWS_ALERTS_URL": f"{base}/nws/alerts/active",
+        "EONET_URL": f"{base}/eonet",
+        "FIRMS_API_BASE": f"{base}/firms",
+    }
+
+def _firms_csv(fc: Dict[str, Any]) -> str:
+    sio = io.StringIO()
+    w = csv.writer(sio)
+    w.writerow(["latitude", "longitude", "acq_date", "acq_time", "instrument", "confidence",
+                "frp", "daynight"])
+    for f in fc["features"]:
+        lon, lat = f["geometry"]["coordinates"][:2]
+        p = f["properties"]
+        w.writerow([lat, lon, p["acq_date"], p["acq_time"], p["instrument"], p["confidence"],
+                    p["frp"], p["daynight"]])
+    return sio.getvalue()
+
+def create_app(profile: str = "realistic", latency_ms: float = 0.0, jitter_ms: float = 0.0,
+               failure_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="PulseMap upstream stub")
+    rnd = random.Random(seed)
+    data = {name: payload(name, profile) for name in ("usgs", "nws", "eonet", "firms")}
+    firms_csv = _firms_csv(data["firms"])
+    stats = {"requests": 0, "failures": 0}
+
+    @app.middleware("http")
+    async def chaos(request: Request, call_next):
+        stats["requests"] += 1
+        delay = latency_ms + (rnd.uniform(0, jitter_ms) if jitter_ms else 0.0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if failure_rate and request.url.path != "/_stats" and rnd.random() < failure_rate:
+            stats["failures"] += 1
+            return PlainTextResponse("stub failure", status_code=503)
+        return await call_next(request)
+
+    @app.get("/usgs")
+    def usgs():
+        return data["usgs"]
+
+    @app.get("/nws/alerts/active")
+    def nws(request: Request):
+        base = str(request.base_url).rstrip("/")
+        fc = copy.deepcopy(data["nws"])
+        for f in fc["features"]:
+            p = f["properties"]
+            p["affectedZones"] = [z.replace("https://api.weather.gov", base)
+                                  for z in p.get("affectedZones") or []]
+        return fc
+
+    @app.get("/zones/{kind}/{zid}")
+    def zone(kind: str, zid: str):
+        # deterministic small square per zone id
+        h = sum(ord(c) for c in zid)
+        lat, lon = 30 + (h % 17), -120 + (h % 50)
+        ring = [[lon, lat], [lon + 0.5, lat], [lon + 0.5, lat + 0.5], [lon, lat + 0.5], [lon, lat]]
+        return {"type": "Feature", "id": zid,
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+                "properties": {"id": zid, "type": kind}}
+
+    @app.get("/eonet")
+    def eonet():
+        return data["eonet"]
+
+    @app.get("/firms/{key}/{dataset}/world/{hours}")
+    def firms(key: str, dataset: str, hours: int):
+        return Response(firms_csv, media_type="text/csv")
+
+    @app.get("/_stats")
+    def _stats():
+        return JSONResponse(stats)
+
+    return app
+
+def main() -> None:
+    import uvicorn
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8801)
+    ap.add_argument("--profile", default="realistic", choices=["recorded", "realistic", "surge"])
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--failure-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    base = f"http://{args.host}:{args.port}"
+    for k, v in upstream_env(base).items():
+        print(f"{k}={v}")
+    uvicorn.run(create_app(args.profile, args.latency_ms, args.jitter_ms, args.failure_rate),
+                host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -104,7 +104,20 @@ export function useChat(
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify(payload),
     })
-      .then((r) => r.json())
+      .then((r) => {
+        // 429: this session is over its chat limit; 503: the server shed the request under load
+        if (r.status === 429 || r.status === 503) {
+          const wait = r.headers.get("Retry-After");
+          const when = wait ? `in ${wait} seconds` : "shortly";
+          return {
+            reply:
+              r.status === 429
+                ? `You're sending messages quickly. Please try again ${when}.`
+                : `I'm handling a lot of requests right now. Please try again ${when}.`,
+          };
+        }
+        return r.json();
+      })
       .catch(() => ({ reply: "Something went wrong." }));
 
     await typeOut(res.reply || "(no reply)");
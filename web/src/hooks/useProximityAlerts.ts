@@ -1,8 +1,34 @@
 // hooks/useProximityAlerts.ts
 import * as React from "react";
 import type { UpdateItem } from "../lib/types";
-import { UPDATES_LOCAL_URL } from "../lib/constants";
+import { WATCH_URL } from "../lib/constants";
 
+const POLL_MS = 30_000;
+
+// resolve a usable rid (works even if backend forgot to surface rid at top level)
+const resolveRid = (u: any) =>
+  u?.rid ||
+  u?.raw?.rid ||
+  u?.raw?.id ||
+  u?.id ||
+  u?._id ||
+  u?.raw?._id ||
+  u?.raw?.uuid;
+
+// Only user reports with an id we can react to
+const onlyReports = (listRaw: any[]) =>
+  listRaw
+    .filter((u) => u?.kind === "report")
+    .map((u) => {
+      const rid = resolveRid(u);
+      return rid ? { ...u, rid } : null;
+    })
+    .filter(Boolean) as UpdateItem[];
+
+/**
+ * Registers a server-side watch around myLL once (POST /watch) and then polls it
+ * (GET /watch/{id}); each poll returns only what is new for this watch.
+ */
 export function useProximityAlerts(
   myLL: [number, number] | null,
   opts: { radiusMiles?: number; limit?: number; maxAgeHours?: number } = {}
@@ -13,70 +39,84 @@ export function useProximityAlerts(
   const [loading, setLoading] = React.useState(false);
   const [error, setError] = React.useState<string | null>(null);
 
-  // request id to ignore stale responses
-  const reqIdRef = React.useRef(0);
+  const watchIdRef = React.useRef<string | null>(null);
+  // bumped whenever the watch is replaced, so responses for an old one are ignored
+  const genRef = React.useRef(0);
 
-  const refetch = React.useCallback(async () => {
+  const merge = React.useCallback(
+    (fresh: UpdateItem[], replace: boolean) =>
+      setNearby((prev) => {
+        const seen = new Set(fresh.map((u) => u.rid));
+        const rest = replace ? [] : prev.filter((u) => !seen.has(u.rid));
+        return [...fresh, ...rest].slice(0, limit);
+      }),
+    [limit]
+  );
+
+  const register = React.useCallback(async () => {
     if (!myLL) return;
     const [lat, lon] = myLL;
+    const gen = ++genRef.current;
+    const res = await fetch(WATCH_URL, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        lat,
+        lon,
+        radius_miles: radiusMiles,
+        max_age_hours: maxAgeHours,
+        limit: 50,
+      }),
+    });
+    if (!res.ok) throw new Error(`watch failed (${res.status})`);
+    const data = await res.json();
+    if (gen !== genRef.current) return;
+    watchIdRef.current = data.id;
+    merge(onlyReports(data.updates || []), true);
+  }, [myLL, radiusMiles, maxAgeHours, merge]);
+
+  const refetch = React.useCallback(async () => {
+    if (!myLL) return;
     setLoading(true);
     setError(null);
-
-    const myId = ++reqIdRef.current;
-    const ctrl = new AbortController();
-
+    const gen = genRef.current;
     try {
-      const url = `${UPDATES_LOCAL_URL}?lat=${lat}&lon=${lon}&radius_miles=${radiusMiles}&limit=${limit}&max_age_hours=${maxAgeHours}`;
-      const res = await fetch(url, { signal: ctrl.signal });
+      const wid = watchIdRef.current;
+      if (!wid) {
+        await register();
+        return;
+      }
+      const res = await fetch(`${WATCH_URL}/${wid}?limit=50`);
+      if (res.status === 404) {
+        // expired or served by another worker: register again
+        watchIdRef.current = null;
+        await register();
+        return;
+      }
       const data = await res.json();
-
-      const listRaw: any[] = Array.isArray(data)
-        ? data
-        : Array.isArray(data?.items)
-        ? data.items
-        : Array.isArray(data?.updates)
-        ? data.updates
-        : Array.isArray((data as any)?.results)
-        ? (data as any).results
-        : [];
-
-      // resolve a usable rid (works even if backend forgot to surface rid at top level)
-      const resolveRid = (u: any) =>
-        u?.rid ||
-        u?.raw?.rid ||
-        u?.raw?.id ||
-        u?.id ||
-        u?._id ||
-        u?.raw?._id ||
-        u?.raw?.uuid;
-
-      if (myId !== reqIdRef.current) return; // stale
-      // Only user reports with an id we can react to
-      const normalized = listRaw
-        .filter((u) => u?.kind === "report")
-        .map((u) => {
-          const rid = resolveRid(u);
-          return rid ? { ...u, rid } : null;
-        })
-        .filter(Boolean) as UpdateItem[];
-      console.log("nearby fetch URL", url);
-      console.log("nearby raw data", data);
-      console.log("nearby normalized", normalized);
-      setNearby(normalized.slice(0, limit));
+      if (gen !== genRef.current) return; // stale
+      merge(onlyReports(data.updates || []), false);
     } catch (e: any) {
-      if (e?.name !== "AbortError")
-        setError(e?.message || "Failed to load nearby alerts");
+      setError(e?.message || "Failed to load nearby alerts");
     } finally {
-      if (myId === reqIdRef.current) setLoading(false);
+      setLoading(false);
     }
-
-    return () => ctrl.abort();
-  }, [myLL, radiusMiles, limit, maxAgeHours]);
+  }, [myLL, register, merge]);
 
   React.useEffect(() => {
+    if (!myLL) return;
+    watchIdRef.current = null;
     refetch();
+    const t = window.setInterval(refetch, POLL_MS);
+    return () => {
+      window.clearInterval(t);
+      const wid = watchIdRef.current;
+      watchIdRef.current = null;
+      genRef.current++;
+      if (wid) fetch(`${WATCH_URL}/${wid}`, { method: "DELETE" }).catch(() => {});
+    };
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [refetch, myLL?.[0], myLL?.[1]]);
+  }, [myLL?.[0], myLL?.[1], radiusMiles, maxAgeHours]);
 
   return { nearby, loading, error, refetch, setNearby };
 }
@@ -16,3 +16,4 @@ export const REACT_URL = `${API_BASE}/reports`;
 
 export const UPDATES_LOCAL_URL = `${API_BASE}/updates/local`;
 export const UPDATES_GLOBAL_URL = `${API_BASE}/updates/global`;
+export const WATCH_URL = `${API_BASE}/watch`;